@@ -0,0 +1,138 @@
+"""
+attribution.py
+Delay attribution: how many of the delivery days each delay source is
+responsible for (no Streamlit).
+
+When several delays overlap on parallel paths, "which nodes are late" does
+not answer "who caused the slip": removing either of two equal delays on
+parallel branches saves nothing, yet together they cost the full slip. The
+Shapley value splits the slip fairly: each source gets its average marginal
+impact over all orders in which the sources could be switched on, and the
+shares always add up to the total slip.
+
+  - up to `exact_limit` sources: every subset is evaluated (2^k schedules),
+  - beyond that: random orders are sampled (with their reverses, to cancel
+    most of the noise), k + 1 schedules per order.
+
+Either way the schedules are evaluated in batches with forward_pass_batch;
+sampled orders go through in chunks of about BATCH_CELLS scheduled cells,
+so memory stays flat and 40 delays on a 2000-node network are attributed
+with the defaults in well under a second.
+"""
+
+from math import factorial
+
+import numpy as np
+
+from schedule_engine import forward_pass_batch
+from delay_rules import resolve_active, scenario_durations
+from profiling import count, timed
+
+SAMPLES = 128  # sampled orders; half of them are reverses of the other half
+BATCH_CELLS = 2_000_000  # schedules x nodes per forward pass of sampled orders
+
+
+def shapley_values(k, evaluate, samples=SAMPLES, seed=0, exact_limit=10, chunk=64):
+    """
+    Shapley value of each of k sources for a value function evaluated in batch:
+    evaluate(masks) takes a (rows, k) boolean array (which sources are on)
+    and returns one value per row. Sampled orders are evaluated `chunk`
+    orders ((k + 1) rows each) at a time.
+    Returns (values, method) with method 'exact' or 'sampled'.
+    """
+    if k == 0:
+        return np.zeros(0), 'exact'
+
+    if k <= exact_limit:
+        subsets = np.arange(2 ** k)
+        masks = ((subsets[:, None] >> np.arange(k)) & 1).astype(bool)
+        value = np.asarray(evaluate(masks), dtype=float)
+        size = masks.sum(axis=1)
+        # weight of a subset S not containing i: |S|! (k - |S| - 1)! / k!
+        weight = np.array([factorial(s) * factorial(k - s - 1) / factorial(k) for s in range(k)])
+        values = np.empty(k)
+        for i in range(k):
+            without = subsets[~masks[:, i]]
+            values[i] = (weight[size[without]] * (value[without | (1 << i)] - value[without])).sum()
+        count('attribution_schedules', len(masks))
+        return values, 'exact'
+
+    rng = np.random.default_rng(seed)
+    half = max(1, samples // 2)
+    orders = np.array([rng.permutation(k) for _ in range(half)])
+    orders = np.concatenate([orders, orders[:, ::-1]])
+    position = np.argsort(orders, axis=1)          # position[m, i] = when source i is switched on
+    steps = np.arange(k + 1)
+    chunk = max(1, chunk)
+    total = np.zeros(k)
+    for begin in range(0, len(orders), chunk):
+        block = position[begin:begin + chunk]
+        masks = block[:, None, :] < steps[None, :, None]   # (orders, k + 1, k): prefixes of each order
+        value = np.asarray(evaluate(masks.reshape(-1, k)), dtype=float).reshape(len(block), k + 1)
+        marginal = np.diff(value, axis=1)          # marginal[m, p] belongs to source orders[m, p]
+        total += np.take_along_axis(marginal, block, axis=1).sum(axis=0)
+    count('attribution_schedules', len(orders) * (k + 1))
+    return total / len(orders), 'sampled'
+
+
+def _attribute(k, evaluate, samples, seed, exact_limit, nodes):
+    """Shapley shares plus each source's standalone impact and the total slip."""
+    chunk = BATCH_CELLS // max(1, (k + 1) * nodes)
+    values, method = shapley_values(k, evaluate, samples, seed, exact_limit, chunk)
+    corners = np.vstack([np.zeros(k, dtype=bool), np.ones(k, dtype=bool), np.eye(k, dtype=bool)])
+    corner_values = np.asarray(evaluate(corners), dtype=float)
+    return {
+        'contribution': values,
+        'standalone': corner_values[2:] - corner_values[0],
+        'slip': float(corner_values[1] - corner_values[0]),
+        'method': method,
+    }
+
+
+@timed('attribute_node_delays')
+def attribute_node_delays(graph, base_durations, delays, samples=SAMPLES, seed=0, exact_limit=10):
+    """
+    Attribution of the project-end slip to per-node added delays.
+    `delays` is {node index: added duration}; returns a dict with 'sources'
+    (the node indices), 'contribution' (Shapley share of the slip),
+    'standalone' (slip if only that delay happened), 'slip' and 'method'.
+    """
+    sources = list(delays)
+    base = np.asarray(base_durations, dtype=float)
+    added = np.zeros((len(sources), len(base)))
+    for row, node in enumerate(sources):
+        added[row, node] = delays[node]
+
+    def evaluate(masks):
+        _, finish = forward_pass_batch(graph, base + masks.astype(float) @ added)
+        return finish.max(axis=1)
+
+    result = _attribute(len(sources), evaluate, samples, seed, exact_limit, len(base))
+    result['sources'] = sources
+    return result
+
+
+@timed('attribute_rule_delays')
+def attribute_rule_delays(compiled_rules, graph, base_durations, rule_keys, samples=SAMPLES, seed=0, exact_limit=10,
+                          decimals=None):
+    """
+    Attribution of the project-end slip to selected delay rules (e.g. the
+    checked DELAY_DEFINITIONS). Triggered and correlated rules follow the
+    rule that set them off, so their effect is credited to it. `decimals`
+    rounds durations the way the plan does. Returns the same dict as
+    attribute_node_delays with 'sources' = rule_keys.
+    """
+    columns = [compiled_rules['keys'].index(key) for key in rule_keys]
+
+    def evaluate(masks):
+        selected = np.zeros((len(masks), len(compiled_rules['keys'])), dtype=bool)
+        selected[:, columns] = masks
+        durations = scenario_durations(compiled_rules, base_durations, resolve_active(compiled_rules, selected))
+        if decimals is not None:
+            durations = np.round(durations, decimals)
+        _, finish = forward_pass_batch(graph, durations)
+        return finish.max(axis=1)
+
+    result = _attribute(len(columns), evaluate, samples, seed, exact_limit, len(base_durations))
+    result['sources'] = list(rule_keys)
+    return result
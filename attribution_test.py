@@ -0,0 +1,107 @@
+"""
+attribution_test.py
+Backend tests for delay attribution (attribution.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import copy
+import random
+
+import numpy as np
+
+from attribution import shapley_values, attribute_node_delays
+from schedule_engine import compile_graph
+
+
+def test_parallel_delays_share_the_slip():
+    # A and B run in parallel into C; both are delayed by 5 -> each alone costs
+    # nothing, together they cost 5: Shapley gives 2.5 each
+    graph = compile_graph(['A', 'B', 'C'], [[], [], ['A', 'B']])
+    result = attribute_node_delays(graph, [10, 10, 1], {0: 5, 1: 5})
+    assert result['method'] == 'exact' and result['slip'] == 5
+    assert np.allclose(result['contribution'], [2.5, 2.5])
+    assert np.allclose(result['standalone'], [5, 5])
+
+    # A delay absorbed by float gets nothing
+    result = attribute_node_delays(graph, [10, 4, 1], {0: 3, 1: 2})
+    assert np.allclose(result['contribution'], [3, 0])
+
+
+def test_sampled_matches_exact():
+    rng = random.Random(8)
+    n = 200
+    ids = [f'N{i}' for i in range(n)]
+    graph = compile_graph(ids, [[f'N{p}' for p in rng.sample(range(i), min(i, 2))] for i in range(n)])
+    durations = [rng.randint(1, 10) for _ in range(n)]
+    delays = {i: rng.randint(1, 15) for i in rng.sample(range(n), 9)}
+
+    exact = attribute_node_delays(graph, durations, delays)
+    sampled = attribute_node_delays(graph, durations, delays, samples=2000, exact_limit=0)
+    assert exact['method'] == 'exact' and sampled['method'] == 'sampled'
+    assert np.isclose(sampled['contribution'].sum(), exact['slip'])
+    assert np.abs(sampled['contribution'] - exact['contribution']).max() < 0.1 * max(exact['slip'], 1)
+
+
+def test_dozens_of_delays():
+    # timed in perf_benchmark.py ('attribution 40 delays 2k')
+    rng = random.Random(9)
+    n = 2000
+    ids = [f'N{i}' for i in range(n)]
+    graph = compile_graph(ids, [[f'N{p}' for p in rng.sample(range(max(0, i - 40), i), min(i, 2))] for i in range(n)])
+    durations = [rng.randint(1, 10) for _ in range(n)]
+    delays = {i: rng.randint(1, 20) for i in rng.sample(range(n), 40)}
+
+    result = attribute_node_delays(graph, durations, delays)
+    assert result['method'] == 'sampled' and result['slip'] > 0
+    assert np.isclose(result['contribution'].sum(), result['slip'])
+    # a delay never makes delivery earlier: no share is negative
+    assert (result['contribution'] >= -1e-9).all() and (result['standalone'] >= 0).all()
+
+
+def test_chunks_do_not_change_the_result():
+    rng = random.Random(4)
+    weights = np.array([rng.uniform(0, 5) for _ in range(15)])
+
+    def evaluate(masks):
+        return np.maximum(masks @ weights, 10.0 * masks[:, 0])
+    whole, _ = shapley_values(15, evaluate, samples=60, exact_limit=0, chunk=1000)
+    for chunk in (1, 7, 30):
+        values, _ = shapley_values(15, evaluate, samples=60, exact_limit=0, chunk=chunk)
+        assert np.allclose(values, whole)
+
+
+def test_value_function_interface():
+    # Symmetric "glove game": value 1 only if source 0 and any of 1, 2 are on
+    def evaluate(masks):
+        return (masks[:, 0] & (masks[:, 1] | masks[:, 2])).astype(float)
+    values, _ = shapley_values(3, evaluate)
+    assert np.allclose(values, [2 / 3, 1 / 6, 1 / 6])
+
+
+def test_model_tables():
+    from pyramid_model import INITIAL_NODES, attribute_delivery_slip
+    from supply_chain_model import BASELINE_TASKS, DELAY_DEFINITIONS, attribute_simulated_delay, calculate_simulated_plan
+
+    nodes = copy.deepcopy(INITIAL_NODES)
+    nodes['Panel_Assy']['delay'] = 40
+    rows = attribute_delivery_slip(nodes)
+    assert rows[0]['Agent'] == 'Panel Assembly' and rows[0]['Share of Slip (Days)'] == 40
+
+    inputs = {key: True for key in DELAY_DEFINITIONS}
+    rows = attribute_simulated_delay(BASELINE_TASKS, inputs)
+    slip = calculate_simulated_plan(BASELINE_TASKS, inputs)[2] - calculate_simulated_plan(BASELINE_TASKS, {})[2]
+    assert abs(sum(row['Share of Slip (Weeks)'] for row in rows) - slip) < 0.1 * len(rows)
+
+
+if __name__ == "__main__":
+    print("### DELAY ATTRIBUTION BACKEND TEST ###")
+
+    test_parallel_delays_share_the_slip()
+    test_sampled_matches_exact()
+    test_dozens_of_delays()
+    test_chunks_do_not_change_the_result()
+    test_value_function_interface()
+    test_model_tables()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,136 @@
+"""
+crashing.py
+Time-cost tradeoff ("crashing") solver for recovering a delayed delivery
+(no Streamlit).
+
+Each node can be shortened by up to crash_limits[i] time units at
+crash_costs[i] per unit. solve_crashing finds a cheap set of reductions
+that brings the project end back to a target (normally the baseline
+delivery day), using the classic incremental critical-path heuristic:
+
+  1. Schedule, and keep only the critical subnetwork (zero float, tight links).
+  2. Find its cheapest cut: a set of crashable nodes that every critical
+     path passes through. This is a min-cut on the node-split graph, and
+     its capacity is the cost per unit of shortening.
+  3. Shorten that cut by the largest step that keeps the critical set valid
+     (gap to target, remaining crash capacity, smallest positive float or
+     link slack), then repeat.
+
+Each step costs one forward/backward pass plus a max-flow on the critical
+subnetwork only, so it stays fast on thousands of nodes. Steps are exact
+for finish-to-start links; with SS/FF/SF links every step is checked with
+a forward pass and nodes that do not pull the end in are skipped.
+"""
+
+from schedule_engine import forward_pass, backward_pass, FS, SS, FF
+from profiling import count, timed
+from startup_cache import lazy_import
+
+nx = lazy_import('networkx')  # max-flow only runs when a recovery plan is asked for
+
+
+def _link_slack(graph, start, finish, e, j):
+    """How much later the predecessor side of link e could move before pushing node j."""
+    i = graph['pred_idx'][e]
+    kind = graph['link_type'][e]
+    lag = graph['lag'][e]
+    if kind == FS:
+        return start[j] - (finish[i] + lag)
+    if kind == SS:
+        return start[j] - (start[i] + lag)
+    if kind == FF:
+        return finish[j] - (finish[i] + lag)
+    return finish[j] - (start[i] + lag)
+
+
+def _cheapest_cut(graph, start, finish, total_float, remaining, crash_costs, project_start, end, eps):
+    """
+    Min-cost cut through the critical subnetwork.
+    Returns (cut node indices, smallest positive link slack), or (None, ...)
+    if every critical path is made only of nodes that cannot be crashed.
+    """
+    pred_ptr, pred_idx = graph['pred_ptr'], graph['pred_idx']
+    critical = [i for i in range(len(start)) if abs(total_float[i]) <= eps]
+
+    G = nx.DiGraph()
+    G.add_node('S')
+    G.add_node('T')
+    min_link_slack = float('inf')
+    for j in critical:
+        if remaining[j] > eps:
+            G.add_edge(('in', j), ('out', j), capacity=crash_costs[j])
+        else:
+            G.add_edge(('in', j), ('out', j))  # no capacity attribute = infinite
+        tight_pred = False
+        for e in range(pred_ptr[j], pred_ptr[j + 1]):
+            i = pred_idx[e]
+            if abs(total_float[i]) > eps:
+                continue
+            slack = _link_slack(graph, start, finish, e, j)
+            if slack <= eps:
+                G.add_edge(('out', i), ('in', j))
+                tight_pred = True
+            elif slack < min_link_slack:
+                min_link_slack = slack
+        if not tight_pred and abs(start[j] - project_start) <= eps:
+            G.add_edge('S', ('in', j))
+        if abs(finish[j] - end) <= eps:
+            G.add_edge(('out', j), 'T')
+
+    try:
+        cut_value, (reachable, _) = nx.minimum_cut(G, 'S', 'T')
+    except nx.NetworkXUnbounded:
+        return None, min_link_slack
+    cut = [j for j in critical if ('in', j) in reachable and ('out', j) not in reachable]
+    return cut, min_link_slack
+
+
+@timed('solve_crashing')
+def solve_crashing(graph, durations, crash_limits, crash_costs, target_end, project_start=0, max_iterations=10000):
+    """
+    Cheapest duration reductions that bring the project end to target_end.
+
+    Returns a dict with 'crash' ({node index: units shortened}), 'cost',
+    'end' (project end after crashing), 'met' (target reached) and
+    'iterations'. The inputs are not modified.
+    """
+    eps = 1e-9
+    durations = list(durations)
+    remaining = list(crash_limits)
+    crash = {}
+    cost = 0.0
+
+    start, finish = forward_pass(graph, durations, project_start)
+    end = max(finish, default=project_start)
+    iterations = 0
+    while end > target_end + eps and iterations < max_iterations:
+        iterations += 1
+        late_start, _ = backward_pass(graph, durations, finish, end)
+        total_float = [late_start[i] - start[i] for i in range(len(start))]
+
+        cut, min_link_slack = _cheapest_cut(graph, start, finish, total_float, remaining, crash_costs, project_start, end, eps)
+        if not cut:
+            break
+
+        min_float = min((f for f in total_float if f > eps), default=float('inf'))
+        step = min(end - target_end, min(remaining[j] for j in cut), min_float, min_link_slack)
+
+        for j in cut:
+            durations[j] -= step
+        new_start, new_finish = forward_pass(graph, durations, project_start)
+        new_end = max(new_finish)
+        if new_end >= end - eps:
+            # These nodes do not pull the end in (e.g. only SS-linked); skip them
+            for j in cut:
+                durations[j] += step
+                remaining[j] = 0
+            continue
+
+        for j in cut:
+            remaining[j] -= step
+            crash[j] = crash.get(j, 0) + step
+            cost += step * crash_costs[j]
+        start, finish, end = new_start, new_finish, new_end
+    count('crash_iterations', iterations)
+
+    return {'crash': crash, 'cost': cost, 'end': end, 'met': end <= target_end + eps, 'iterations': iterations}
@@ -0,0 +1,83 @@
+"""
+crashing_test.py
+Backend tests for the expediting (crashing) solver (crashing.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import copy
+import random
+
+from schedule_engine import compile_graph, forward_pass
+from crashing import solve_crashing
+
+
+def test_cheapest_cut_beats_crashing_the_merge():
+    # A (10) and B (9) run in parallel into D (5). Winning back 3 days:
+    # D alone costs 3 x 150 = 450; A for 1 day then A+B for 2 days costs 360.
+    graph = compile_graph(['A', 'B', 'D'], [[], [], ['A', 'B']])
+    result = solve_crashing(graph, [10, 9, 5], crash_limits=[5, 5, 3], crash_costs=[100, 30, 150], target_end=12)
+
+    assert result['met'] and result['end'] == 12
+    assert result['crash'] == {0: 3, 1: 2}
+    assert result['cost'] == 360
+
+
+def test_limits_reached_reports_best_end():
+    graph = compile_graph(['A', 'B'], [[], ['A']])
+    result = solve_crashing(graph, [10, 10], crash_limits=[2, 1], crash_costs=[10, 10], target_end=10)
+    assert not result['met'] and result['end'] == 17
+
+
+def test_ss_link_nodes_are_skipped():
+    # B only waits for A's start, so shortening A does not help
+    graph = compile_graph(['A', 'B'], [[], [{'id': 'A', 'type': 'SS', 'lag': 2}]])
+    result = solve_crashing(graph, [10, 20], crash_limits=[5, 4], crash_costs=[1, 50], target_end=19)
+    assert result['met'] and result['crash'] == {1: 3}
+
+
+def test_pyramid_recovery_back_to_baseline():
+    from pyramid_model import INITIAL_NODES, calculate_schedule, plan_recovery
+
+    nodes = copy.deepcopy(INITIAL_NODES)
+    nodes['Panel_Assy']['delay'] = 40
+    rows, result = plan_recovery(nodes, target_end=1171)
+    assert result['met'] and result['end'] == 1171
+
+    for row in rows:
+        assert row['Days Expedited'] <= row['Of Max']
+    assert calculate_schedule(nodes)['Delivery']['end_day'] == 1211  # inputs untouched
+
+
+def test_thousands_of_nodes():
+    # timed in perf_benchmark.py ('crashing 3000 nodes')
+    rng = random.Random(2)
+    n = 3000
+    ids = [f'N{i}' for i in range(n)]
+    prereqs = [[f'N{p}' for p in rng.sample(range(max(0, i - 50), i), min(i, 2))] for i in range(n)]
+    durations = [rng.randint(1, 20) for _ in range(n)]
+    crash_limits = [d // 4 for d in durations]
+    graph = compile_graph(ids, prereqs)
+    _, finish = forward_pass(graph, durations)
+    end = max(finish)
+
+    result = solve_crashing(graph, durations, crash_limits, [rng.randint(1, 9) for _ in range(n)], end - 30)
+    assert result['met'] and result['end'] <= end - 30
+    # the crashed durations, within their limits, really finish by the target
+    crashed = list(durations)
+    for i, units in result['crash'].items():
+        assert 0 < units <= crash_limits[i]
+        crashed[i] -= units
+    assert max(forward_pass(graph, crashed)[1]) == result['end']
+
+
+if __name__ == "__main__":
+    print("### CRASHING SOLVER BACKEND TEST ###")
+
+    test_cheapest_cut_beats_crashing_the_merge()
+    test_limits_reached_reports_best_end()
+    test_ss_link_nodes_are_skipped()
+    test_pyramid_recovery_back_to_baseline()
+    test_thousands_of_nodes()
+
+    print("\nAll tests completed.")
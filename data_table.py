@@ -0,0 +1,80 @@
+"""
+data_table.py
+Server-side sorting, filtering and paging for the detailed data table (no
+Streamlit).
+
+Sending a whole schedule to the browser costs seconds and hundreds of MB at
+50k rows, and sorting it again on every rerun is wasted work. node_table
+builds the table once per scenario, column by column, together with a
+stable sort order for every sortable column. A view is then only index
+arithmetic: table_rows filters the precomputed order with boolean masks,
+and table_page slices out the rows of one page, so only those rows are
+ever turned into a DataFrame and sent.
+"""
+
+import numpy as np
+
+from profiling import count, timed
+from startup_cache import lazy_import
+
+pd = lazy_import('pandas')
+
+TABLE_COLUMNS = ['label', 'type', 'duration', 'delay', 'start_day', 'end_day', 'total_float']
+SORT_COLUMNS = ['end_day', 'start_day', 'total_float', 'delay', 'duration', 'label']
+DELAY_STATUS = ('All', 'Delayed', 'Not Delayed')
+
+
+@timed('node_table')
+def node_table(nodes_data):
+    """
+    Table of scheduled pyramid nodes (after calculate_schedule /
+    apply_schedule): {'frame': DataFrame indexed by node ID with
+    TABLE_COLUMNS, 'order': {column: row positions in ascending order}}.
+    """
+    node_ids = list(nodes_data)
+    nodes = [nodes_data[node_id] for node_id in node_ids]
+    frame = pd.DataFrame({
+        'label': [node['label'] for node in nodes],
+        'type': [node['type'] for node in nodes],
+        'duration': [node['duration'] for node in nodes],
+        'delay': [node.get('delay', 0) for node in nodes],
+        'start_day': [node['start_day'] for node in nodes],
+        'end_day': [node['end_day'] for node in nodes],
+        'total_float': [node['total_float'] for node in nodes],
+    }, index=pd.Index(node_ids, name='node'))
+    order = {column: np.argsort(frame[column].to_numpy(), kind='stable') for column in SORT_COLUMNS}
+    return {'frame': frame, 'order': order}
+
+
+def table_rows(table, sort_by='end_day', descending=False, types=None, delay_status='All', max_float=None):
+    """
+    Row positions of a table view: sorted by `sort_by` and filtered by node
+    type (a list; None = all), delay status (one of DELAY_STATUS) and
+    total float (at most `max_float`; None = any).
+    """
+    frame = table['frame']
+    keep = np.ones(len(frame), dtype=bool)
+    if types is not None:
+        keep &= frame['type'].isin(types).to_numpy()
+    if delay_status == 'Delayed':
+        keep &= frame['delay'].to_numpy() > 0
+    elif delay_status == 'Not Delayed':
+        keep &= frame['delay'].to_numpy() <= 0
+    if max_float is not None:
+        keep &= frame['total_float'].to_numpy() <= max_float
+
+    order = table['order'][sort_by]
+    if descending:
+        order = order[::-1]
+    return order[keep[order]]
+
+
+def table_page(table, rows, page=1, page_size=100):
+    """The DataFrame rows of one page (1-based) of a table view."""
+    start = (page - 1) * page_size
+    count('table_rows_sent', len(rows[start:start + page_size]))
+    return table['frame'].iloc[rows[start:start + page_size]]
+
+
+def page_count(rows, page_size=100):
+    return max(1, -(-len(rows) // page_size))
@@ -0,0 +1,61 @@
+"""
+data_table_test.py
+Backend tests for the paged detailed data table (data_table.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import copy
+import random
+
+from data_table import node_table, table_rows, table_page, page_count
+
+
+def test_initial_nodes_view():
+    from pyramid_model import INITIAL_NODES, calculate_schedule
+
+    nodes = copy.deepcopy(INITIAL_NODES)
+    nodes['Panel_Assy']['delay'] = 40
+    table = node_table(calculate_schedule(nodes))
+
+    rows = table_rows(table)
+    assert len(rows) == len(INITIAL_NODES)
+    assert list(table_page(table, rows, 1, 100)['end_day']) == sorted(node['end_day'] for node in calculate_schedule(nodes).values())
+    assert list(table_page(table, table_rows(table, delay_status='Delayed')).index) == ['Panel_Assy']
+    critical = table_page(table, table_rows(table, 'start_day', max_float=0))
+    assert (critical['total_float'] == 0).all() and critical['start_day'].is_monotonic_increasing
+    assert table_page(table, table_rows(table, 'delay', descending=True), 1, 1).index[0] == 'Panel_Assy'
+
+
+def test_large_schedule_pages():
+    # timed in perf_benchmark.py ('data table build 50k', 'data table page 50k')
+    rng = random.Random(4)
+    n = 50000
+    nodes = {}
+    for i in range(n):
+        start = rng.randint(0, 2000)
+        nodes[f'N{i}'] = {'label': f'Node {i}', 'type': rng.choice(['Hull', 'Outfitting', 'Machinery']),
+                          'duration': 10, 'delay': rng.choice([0, 0, 0, 5]), 'start_day': start,
+                          'end_day': start + 10, 'total_float': rng.randint(0, 50)}
+
+    table = node_table(nodes)
+    rows = table_rows(table, 'total_float', types=['Hull'], delay_status='Not Delayed', max_float=10)
+    page = table_page(table, rows, 3, 100)
+
+    expected = [node_id for node_id, node in nodes.items()
+                if node['type'] == 'Hull' and node['delay'] == 0 and node['total_float'] <= 10]
+    assert len(rows) == len(expected) and page_count(rows, 100) == -(-len(expected) // 100)
+    assert len(page) == 100 and set(page.index) <= set(expected)
+    assert (page['type'] == 'Hull').all() and (page['delay'] == 0).all() and page['total_float'].max() <= 10
+    assert page['total_float'].is_monotonic_increasing
+    # page 3 continues where page 2 stopped
+    assert page['total_float'].iloc[0] >= table_page(table, rows, 2, 100)['total_float'].iloc[-1]
+
+
+if __name__ == "__main__":
+    print("### DATA TABLE BACKEND TEST ###")
+
+    test_initial_nodes_view()
+    test_large_schedule_pages()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,174 @@
+"""
+delay_rules.py
+Rules engine for delay definitions (no Streamlit).
+
+A rule says WHICH tasks it hits (selectors) and HOW (effects):
+
+    'port_strike': {
+        'name': 'Regional Port Strike',
+        'match': r'^T3',                     # regex on task IDs
+        'category': 'Supply Chain (Steel)',  # and/or task Category
+        'type': 'Procurement',               # and/or node type (pyramid model)
+        'task_id': ['T3A', 'T3B'],           # and/or explicit IDs (original style)
+        'weeks': 2,                          # additive, in the project's time unit
+        'multiplier': 1.1,                   # scales the base duration
+        'triggers': ['customs_backlog'],     # chained rules that fire with this one
+        'requires': ['design_flaw'],         # only fires if these are active too
+        'group': 'baltic_ports',             # correlated: any member fires them all
+    }
+
+Selectors combine as AND. Rules are compiled once into per-node effect
+vectors (rules x nodes matrices), so evaluating any number of scenarios is a
+few matrix products with no per-task rule matching.
+"""
+
+import re
+
+import numpy as np
+
+from profiling import count
+
+# Selector key -> field on the task/node record
+SELECTOR_FIELDS = {'category': 'Category', 'type': 'type'}
+
+
+def _as_list(value):
+    return value if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _select_nodes(rule, node_ids, node_records):
+    """Indices of the nodes a rule's selectors match (all selectors must match)."""
+    selectors = [key for key in ('task_id', 'match', *SELECTOR_FIELDS) if key in rule]
+    if not selectors:
+        raise ValueError(f"Delay rule '{rule.get('name')}' has no selector")
+
+    selected = []
+    pattern = re.compile(rule['match']) if 'match' in rule else None
+    wanted_ids = set(_as_list(rule['task_id'])) if 'task_id' in rule else None
+    wanted_fields = {key: set(_as_list(rule[key])) for key in SELECTOR_FIELDS if key in rule}
+    for i, (node_id, record) in enumerate(zip(node_ids, node_records)):
+        if wanted_ids is not None and node_id not in wanted_ids:
+            continue
+        if pattern is not None and not pattern.search(node_id):
+            continue
+        if any(record.get(SELECTOR_FIELDS[key]) not in values for key, values in wanted_fields.items()):
+            continue
+        selected.append(i)
+    return selected
+
+
+def compile_rules(rules, node_ids, node_records, unit='weeks'):
+    """
+    Compiles a {key: rule} dict against a project's nodes.
+
+    node_ids:      list of node IDs (defines the column order)
+    node_records:  the task/node dicts, same order (used by field selectors)
+    unit:          key holding the additive effect ('weeks' or 'days')
+    """
+    keys = list(rules)
+    position = {key: r for r, key in enumerate(keys)}
+    n_rules, n_nodes = len(keys), len(node_ids)
+
+    add = np.zeros((n_rules, n_nodes))
+    log_mult = np.zeros((n_rules, n_nodes))
+    triggers = np.zeros((n_rules, n_rules), dtype=bool)
+    requires = np.zeros((n_rules, n_rules), dtype=bool)
+    targets = []
+
+    groups = {}
+    for r, key in enumerate(keys):
+        rule = rules[key]
+        selected = _select_nodes(rule, node_ids, node_records)
+        targets.append(selected)
+        add[r, selected] = rule.get(unit, 0)
+        log_mult[r, selected] = np.log(rule.get('multiplier', 1.0))
+
+        for field, matrix in (('triggers', triggers), ('requires', requires)):
+            for other in rule.get(field, []):
+                if other not in position:
+                    raise ValueError(f"Delay rule '{key}' {field} unknown rule '{other}'")
+                matrix[r, position[other]] = True
+        if 'group' in rule:
+            groups.setdefault(rule['group'], []).append(r)
+
+    # Correlated events: every member of a group triggers every other member
+    for members in groups.values():
+        for r in members:
+            triggers[r, members] = True
+    np.fill_diagonal(triggers, False)
+
+    return {
+        'keys': keys,
+        'rules': rules,
+        'unit': unit,
+        'node_ids': list(node_ids),
+        'add': add,
+        'log_mult': log_mult,
+        'triggers': triggers,
+        'requires': requires,
+        'targets': targets,
+    }
+
+
+def selection_matrix(compiled, delay_inputs):
+    """Turns a {rule_key: bool} dict (the sidebar checkboxes) into a 1 x rules row."""
+    return np.array([[bool(delay_inputs.get(key)) for key in compiled['keys']]])
+
+
+def resolve_active(compiled, selected):
+    """
+    Expands selected rules through trigger chains, correlation groups and
+    `requires` conditions. `selected` is a (scenarios x rules) boolean array.
+
+    This is the least fixed point of
+        active = (selected | triggered_by(active)) & requirements_met(active)
+    computed for all scenarios at once; it settles in at most `rules` steps.
+    """
+    selected = np.atleast_2d(np.asarray(selected, dtype=bool))
+    triggers = compiled['triggers'].astype(np.int32)
+    requires_t = compiled['requires'].T.astype(np.int32)
+    has_requirements = compiled['requires'].any(axis=1)
+
+    active = np.zeros_like(selected)
+    for iteration in range(1, len(compiled['keys']) + 2):
+        reached = selected | ((active.astype(np.int32) @ triggers) > 0)
+        missing = ((~active).astype(np.int32) @ requires_t) > 0
+        new_active = reached & ~(missing & has_requirements)
+        if np.array_equal(new_active, active):
+            break
+        active = new_active
+    count('rule_fixed_point_iterations', iteration)
+    return active
+
+
+def scenario_durations(compiled, base_durations, active):
+    """
+    Durations for every scenario: base * product(multipliers) + sum(additions).
+    `active` is (scenarios x rules); returns (scenarios x nodes).
+    """
+    active = np.atleast_2d(active).astype(float)
+    base = np.asarray(base_durations, dtype=float)
+    # Multipliers are summed in log space; rounding cancels the exp/log round-off
+    multiplier = np.round(np.exp(active @ compiled['log_mult']), 9)
+    return base * multiplier + active @ compiled['add']
+
+
+def effect_log(compiled, active_row, node_labels):
+    """
+    Event log rows ({'Event', 'Impact', 'Stage Affected'}) for one scenario,
+    ordered by node, then by rule definition order.
+    """
+    unit = compiled['unit']
+    entries = []
+    for r in np.flatnonzero(active_row):
+        rule = compiled['rules'][compiled['keys'][r]]
+        for i in compiled['targets'][r]:
+            if rule.get(unit):
+                entries.append((i, r, f"+{rule[unit]} {unit}"))
+            if 'multiplier' in rule:
+                entries.append((i, r, f"x{rule['multiplier']} duration"))
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+    return [
+        {'Event': compiled['rules'][compiled['keys'][r]]['name'], 'Impact': impact, 'Stage Affected': node_labels[i]}
+        for i, r, impact in entries
+    ]
@@ -0,0 +1,137 @@
+"""
+delay_rules_test.py
+Backend tests for the delay rules engine (delay_rules.py): selectors,
+trigger chains, correlation groups, conditional rules and batch evaluation.
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import numpy as np
+
+from delay_rules import compile_rules, selection_matrix, resolve_active, scenario_durations, effect_log
+
+TASKS = [
+    {'ID': 'T1', 'Task': 'Design', 'Duration': 20, 'Category': 'Planning'},
+    {'ID': 'T3A', 'Task': 'Steel Shipping', 'Duration': 6, 'Category': 'Supply Chain (Steel)'},
+    {'ID': 'T3B', 'Task': 'Engine Shipping', 'Duration': 2, 'Category': 'Supply Chain (Engine)'},
+    {'ID': 'T4', 'Task': 'Hull Fabrication', 'Duration': 20, 'Category': 'Construction (FIN)'},
+    {'ID': 'T5', 'Task': 'Engine Installation', 'Duration': 8, 'Category': 'Construction (FIN)'},
+]
+TASK_IDS = [task['ID'] for task in TASKS]
+
+RULES = {
+    'port_strike': {'name': 'Port Strike', 'match': r'^T3', 'weeks': 2},
+    'steel_only': {'name': 'Steel Port Closed', 'match': r'^T3', 'category': 'Supply Chain (Steel)', 'weeks': 1},
+    'design_flaw': {'name': 'Design Flaw', 'task_id': 'T1', 'weeks': 10, 'triggers': ['rework']},
+    'rework': {'name': 'Rework', 'category': 'Construction (FIN)', 'multiplier': 1.5, 'requires': ['design_flaw']},
+    'labour': {'name': 'Labour Shortage', 'task_id': ['T4', 'T5'], 'multiplier': 1.25, 'group': 'yard'},
+    'crane': {'name': 'Crane Failure', 'task_id': 'T4', 'weeks': 3, 'group': 'yard'},
+}
+
+
+def compiled():
+    return compile_rules(RULES, TASK_IDS, TASKS, unit='weeks')
+
+
+def durations_for(selection):
+    rules = compiled()
+    active = resolve_active(rules, selection_matrix(rules, selection))
+    return dict(zip(TASK_IDS, scenario_durations(rules, [t['Duration'] for t in TASKS], active)[0]))
+
+
+def test_selectors():
+    rules = compiled()
+    by_key = dict(zip(rules['keys'], rules['targets']))
+    assert by_key['port_strike'] == [1, 2]
+    assert by_key['steel_only'] == [1]
+    assert by_key['rework'] == [3, 4]
+
+
+def test_trigger_chain_and_requires():
+    durations = durations_for({'design_flaw': True})
+    assert durations['T1'] == 30
+    assert durations['T4'] == 30 and durations['T5'] == 12
+
+    # A conditional rule selected on its own does nothing
+    durations = durations_for({'rework': True})
+    assert durations['T4'] == 20
+
+
+def test_correlation_group():
+    durations = durations_for({'crane': True})
+    assert durations['T4'] == 20 * 1.25 + 3
+    assert durations['T5'] == 8 * 1.25
+
+
+def test_batch_matches_single_scenarios():
+    rules = compiled()
+    rng = np.random.default_rng(3)
+    selected = rng.random((500, len(rules['keys']))) < 0.4
+    batch = scenario_durations(rules, [t['Duration'] for t in TASKS], resolve_active(rules, selected))
+
+    for row in (0, 123, 499):
+        selection = dict(zip(rules['keys'], selected[row]))
+        assert np.allclose(batch[row], list(durations_for(selection).values()))
+
+
+def test_effect_log():
+    rules = compiled()
+    active = resolve_active(rules, selection_matrix(rules, {'design_flaw': True}))
+    log = effect_log(rules, active[0], [t['Task'] for t in TASKS])
+    assert [(row['Event'], row['Stage Affected']) for row in log] == [
+        ('Design Flaw', 'Design'), ('Rework', 'Hull Fabrication'), ('Rework', 'Engine Installation'),
+    ]
+
+
+def test_app_delays_unchanged():
+    # The original checkboxes must give the same result as before the rules engine
+    from supply_chain_model import BASELINE_TASKS, DELAY_DEFINITIONS, calculate_simulated_plan
+
+    original = {key: True for key in DELAY_DEFINITIONS if key not in ('regional_port_strike', 'design_rework')}
+    _, delay_log, end_week = calculate_simulated_plan(BASELINE_TASKS, original)
+    assert round(end_week, 1) == 178.2
+    assert len(delay_log) == 12
+    assert round(calculate_simulated_plan(BASELINE_TASKS, {'design_flaw': True})[2], 1) == 151.0
+
+    # the chained rework is opt-in and needs the flaw
+    assert calculate_simulated_plan(BASELINE_TASKS, {'design_rework': True})[2] == calculate_simulated_plan(BASELINE_TASKS, {})[2]
+    assert calculate_simulated_plan(BASELINE_TASKS, {'design_flaw': True, 'design_rework': True})[2] > 151.0
+
+
+def test_supply_rules_compiled_once_per_task_list():
+    import copy
+    from supply_chain_model import (BASELINE_TASKS, COMPILED_RULES_CACHE, compiled_delay_rules, _compile_delay_rules,
+                                    calculate_simulated_plan)
+
+    compiled = compiled_delay_rules(BASELINE_TASKS)
+    # a copy of the same tasks (as every plan makes) reuses the compiled rules
+    assert compiled_delay_rules(copy.deepcopy(BASELINE_TASKS)) is compiled
+    calculate_simulated_plan(BASELINE_TASKS, {'design_flaw': True})
+    assert compiled_delay_rules(BASELINE_TASKS) is compiled
+
+    # a task moved to another category is matched again
+    tasks = copy.deepcopy(BASELINE_TASKS)
+    tasks[8]['Category'] = 'Construction (FIN)'  # T7, now in scope of 'design_rework'
+    recompiled = compiled_delay_rules(tasks)
+    rule = compiled['keys'].index('design_rework')
+    assert 8 not in compiled['targets'][rule] and 8 in recompiled['targets'][rule]
+
+    # the memo is bounded: old task lists are dropped, not kept forever
+    for i in range(COMPILED_RULES_CACHE + 5):
+        tasks[0]['ID'] = f'T1_{i}'
+        compiled_delay_rules(tasks)
+    assert _compile_delay_rules.cache_info().currsize == COMPILED_RULES_CACHE
+
+
+if __name__ == "__main__":
+    print("### DELAY RULES BACKEND TEST ###")
+
+    test_selectors()
+    test_trigger_chain_and_requires()
+    test_correlation_group()
+    test_batch_matches_single_scenarios()
+    test_effect_log()
+    test_app_delays_unchanged()
+    test_supply_rules_compiled_once_per_task_list()
+
+    print("\nAll tests completed.")
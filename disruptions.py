@@ -0,0 +1,170 @@
+"""
+disruptions.py
+Stochastic supplier disruptions as processes over time, sampled in
+vectorized batches for the Monte Carlo runs (no Streamlit).
+
+The risk buttons and DELAY_DEFINITIONS checkboxes fire one event on demand.
+A disruption process instead says how often events happen and how long they
+hold up the nodes it hits, which are picked with the delay rule selectors
+(task_id, match, category, type; see delay_rules.py):
+
+    'supplier_strikes': {
+        'name': 'Supplier Strikes',
+        'process': 'poisson',     # events per time unit while a node runs
+        'match': r'^Pur_',
+        'rate': 1 / 365,
+        'impact': [5, 10, 30],    # days lost per event: fixed, or triangular (low, mode, high)
+    }
+
+    poisson   independent events at `rate` per time unit of each node's
+              planned duration (strikes, breakdowns)
+    shutdown  events at `rate` per time unit of the project calendar; one
+              event stops every selected node running at the time for its
+              length, so the nodes it hits are correlated (regional
+              shutdowns, port closures)
+    reject    each selected node fails inspection with `probability` and is
+              redone for `impact` time units (quality rejects, stock outs)
+
+Rates and impacts are in the project's time unit. Exposure windows are the
+planned early dates, so a node delayed by one event is not more exposed to
+the next (a first-order model). sample_disruptions draws the added time for
+a whole chunk of runs at once (events padded to the chunk's largest count
+and masked), and disruption_sampler adds it to any run_monte_carlo sampler,
+so millions of timelines go straight through forward_pass_batch.
+"""
+
+import numpy as np
+
+from schedule_engine import forward_pass
+from delay_rules import compile_rules, SELECTOR_FIELDS
+from profiling import count
+
+PROCESSES = ('poisson', 'shutdown', 'reject')
+
+
+def compile_disruptions(processes, graph, base_durations, node_records, project_start=0):
+    """
+    Compiles a {key: process} dict against a project's nodes: the selected
+    nodes of each process plus the planned windows ('start' / 'finish') and
+    calendar ('horizon') the events are placed in.
+    """
+    for key, process in processes.items():
+        kind = process.get('process')
+        if kind not in PROCESSES:
+            raise ValueError(f"Disruption '{key}' has unknown process '{kind}' (choose from {', '.join(PROCESSES)})")
+        if kind == 'reject' and not 0 <= process.get('probability', -1) <= 1:
+            raise ValueError(f"Disruption '{key}' needs a probability between 0 and 1")
+        if kind != 'reject' and process.get('rate', -1) < 0:
+            raise ValueError(f"Disruption '{key}' needs a rate of at least 0")
+    # only the selectors: effects and chaining work differently here
+    selector_keys = ('name', 'task_id', 'match', *SELECTOR_FIELDS)
+    rules = {key: {k: v for k, v in process.items() if k in selector_keys} for key, process in processes.items()}
+    compiled = compile_rules(rules, graph['ids'], node_records, unit='days')
+
+    base = np.asarray(base_durations, dtype=float)
+    start, finish = forward_pass(graph, list(base), project_start)
+    return {
+        'keys': compiled['keys'],
+        'processes': processes,
+        'node_ids': compiled['node_ids'],
+        'targets': [np.array(targets, dtype=int) for targets in compiled['targets']],
+        'base': base,
+        'start': np.asarray(start, dtype=float),
+        'finish': np.asarray(finish, dtype=float),
+        'project_start': project_start,
+        'horizon': max(finish, default=project_start) - project_start,
+    }
+
+
+def _impacts(rng, impact, shape):
+    if isinstance(impact, (list, tuple)):
+        low, mode, high = impact
+        return rng.triangular(low, mode, high, size=shape) if high > low else np.full(shape, float(mode))
+    return np.full(shape, float(impact))
+
+
+def _padded(rng, counts, impact):
+    """Impacts for counts[...] events each, padded to the largest count; (..., events) and mask."""
+    most = int(counts.max(initial=0))
+    mask = np.arange(most) < counts[..., None]
+    return _impacts(rng, impact, mask.shape) * mask, mask
+
+
+def sample_disruptions(compiled, rng, rows, tally=None):
+    """
+    Time added to every node by the disruption processes: (rows, nodes).
+    `tally` (optional dict) accumulates per process key: 'runs', 'events'
+    (that delayed something), 'runs_hit' and 'days' (summed over nodes).
+    """
+    added = np.zeros((rows, len(compiled['node_ids'])))
+    for key, targets in zip(compiled['keys'], compiled['targets']):
+        process = compiled['processes'][key]
+        kind = process['process']
+        impact = process.get('impact', 0)
+        if not len(targets):
+            days = np.zeros((rows, 0))
+            events = np.zeros(rows, dtype=int)
+        elif kind == 'poisson':
+            counts = rng.poisson(process['rate'] * compiled['base'][targets], size=(rows, len(targets)))
+            impacts, _ = _padded(rng, counts, impact)
+            days = impacts.sum(axis=-1)
+            events = counts.sum(axis=1)
+        elif kind == 'reject':
+            hit = rng.random((rows, len(targets))) < process['probability']
+            days = hit * _impacts(rng, impact, hit.shape)
+            events = hit.sum(axis=1)
+        else:
+            counts = rng.poisson(process['rate'] * compiled['horizon'], size=rows)
+            lengths, mask = _padded(rng, counts, impact)
+            begin = compiled['project_start'] + rng.uniform(0, compiled['horizon'], size=mask.shape)
+            start = compiled['start'][targets]
+            finish = compiled['finish'][targets]
+            # time each event overlaps each node's window: (rows, events, targets)
+            overlap = (np.minimum((begin + lengths)[..., None], finish) - np.maximum(begin[..., None], start)).clip(0)
+            overlap *= mask[..., None]
+            days = overlap.sum(axis=1)
+            events = (overlap > 0).any(axis=2).sum(axis=1)
+        added[:, targets] += days
+
+        if tally is not None:
+            entry = tally.setdefault(key, {'runs': 0, 'events': 0, 'runs_hit': 0, 'days': 0.0})
+            entry['runs'] += rows
+            entry['events'] += int(events.sum())
+            entry['runs_hit'] += int((days.sum(axis=1) > 0).sum())
+            entry['days'] += float(days.sum())
+    count('disruption_timelines', rows)
+    return added
+
+
+def disruption_sampler(compiled, base_sampler=None, tally=None):
+    """
+    run_monte_carlo sampler: `base_sampler`'s durations (default: as
+    planned) plus sampled disruptions. `tally` is filled as in
+    sample_disruptions.
+    """
+    def sample(rng, base, rows):
+        if base_sampler is None:
+            durations = np.tile(np.asarray(base, dtype=float), (rows, 1))
+        else:
+            durations = base_sampler(rng, base, rows)
+        return durations + sample_disruptions(compiled, rng, rows, tally)
+    return sample
+
+
+def disruption_rows(compiled, tally):
+    """Table rows (one per process) of a tally: events, runs hit and time lost per run."""
+    rows = []
+    for key in compiled['keys']:
+        entry = tally.get(key)
+        if not entry or not entry['runs']:
+            continue
+        process = compiled['processes'][key]
+        rows.append({
+            'Disruption': process.get('name', key),
+            'Process': process['process'],
+            'Nodes Exposed': len(compiled['targets'][compiled['keys'].index(key)]),
+            'Events / Run': round(entry['events'] / entry['runs'], 3),
+            'Runs Hit (%)': round(100 * entry['runs_hit'] / entry['runs'], 1),
+            'Time Lost / Run': round(entry['days'] / entry['runs'], 2),
+        })
+    return rows
@@ -0,0 +1,116 @@
+"""
+disruptions_test.py
+Backend tests for the stochastic supplier disruption processes
+(disruptions.py) and their Monte Carlo runs.
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import numpy as np
+
+from disruptions import compile_disruptions, sample_disruptions, disruption_sampler, disruption_rows
+from monte_carlo import run_monte_carlo
+from schedule_engine import compile_graph
+from pyramid_model import INITIAL_NODES, DISRUPTIONS, compile_nodes
+from supply_chain_model import BASELINE_TASKS
+
+# Two suppliers in parallel (one busy early, one late) feeding assembly
+NODES = {
+    'Pur_A': {'duration': 100, 'type': 'Procurement', 'prereqs': []},
+    'Pur_B': {'duration': 100, 'type': 'Procurement', 'prereqs': []},
+    'Pur_C': {'duration': 50, 'type': 'Procurement', 'prereqs': ['Pur_A']},
+    'Assembly': {'duration': 20, 'type': 'Construction', 'prereqs': ['Pur_B', 'Pur_C']},
+}
+
+
+def compiled_for(processes, nodes=NODES):
+    ids = list(nodes)
+    graph = compile_graph(ids, [nodes[n]['prereqs'] for n in ids])
+    durations = [nodes[n]['duration'] for n in ids]
+    return graph, durations, compile_disruptions(processes, graph, durations, [nodes[n] for n in ids])
+
+
+def test_poisson_and_reject_rates():
+    processes = {
+        'strikes': {'process': 'poisson', 'match': r'^Pur_', 'rate': 0.01, 'impact': 5},
+        'rejects': {'process': 'reject', 'type': 'Procurement', 'probability': 0.2, 'impact': [10, 20, 60]},
+    }
+    _, _, compiled = compiled_for(processes)
+    tally = {}
+    added = sample_disruptions(compiled, np.random.default_rng(1), 200_000, tally)
+
+    assert added.shape == (200_000, 4) and not added[:, 3].any()  # Assembly is not selected
+    # 0.01 events per day over 100 + 100 + 50 planned days, 5 days each
+    assert abs(tally['strikes']['events'] / 200_000 - 2.5) < 0.02
+    assert tally['strikes']['days'] == 5 * tally['strikes']['events']
+    assert abs(tally['rejects']['events'] / (3 * 200_000) - 0.2) < 0.005
+    assert abs(tally['rejects']['days'] / tally['rejects']['events'] - 30) < 0.3  # triangular mean
+    rows = disruption_rows(compiled, tally)
+    assert [row['Nodes Exposed'] for row in rows] == [3, 3]
+
+
+def test_shutdown_hits_overlapping_nodes_together():
+    processes = {'shutdown': {'process': 'shutdown', 'match': r'^Pur_', 'rate': 0.005, 'impact': 14}}
+    _, _, compiled = compiled_for(processes)
+    added = sample_disruptions(compiled, np.random.default_rng(2), 50_000)
+
+    # Pur_A and Pur_B run at the same time: every shutdown stops both
+    assert np.array_equal(added[:, 0], added[:, 1])
+    assert (added[:, 0] > 0).mean() > 0.2
+    # Pur_C runs afterwards: hit by other events
+    assert np.corrcoef(added[:, 0], added[:, 2])[0, 1] < 0.1
+    # a shutdown never costs a node more than the shutdown's length per event
+    assert added.max() <= 14 * 10
+
+
+def test_sampler_feeds_monte_carlo():
+    graph, durations, compiled = compiled_for({})
+    quiet = run_monte_carlo(graph, durations, 1000, sampler=disruption_sampler(compiled))
+    assert np.all(quiet['end'] == 170)  # no processes: as planned
+
+    processes = {'rejects': {'process': 'reject', 'task_id': 'Pur_B', 'probability': 0.5, 'impact': 100}}
+    graph, durations, compiled = compiled_for(processes)
+    runs = [run_monte_carlo(graph, durations, 20_000, seed=7, sampler=disruption_sampler(compiled))['end']
+            for _ in range(2)]
+    assert np.array_equal(runs[0], runs[1])  # same seed, same timelines
+    # Pur_B has 50 days of float: a rejected order moves Assembly by 50
+    assert set(np.unique(runs[0])) == {170.0, 220.0}
+    assert abs((runs[0] > 170).mean() - 0.5) < 0.02
+
+
+def test_selectors_on_supply_chain_categories():
+    ids = [task['ID'] for task in BASELINE_TASKS]
+    graph = compile_graph(ids, [task['Prereq'] for task in BASELINE_TASKS])
+    processes = {'steel_ports': {'process': 'shutdown', 'category': 'Supply Chain (Steel)', 'rate': 0.05, 'impact': [1, 2, 4]}}
+    compiled = compile_disruptions(processes, graph, [task['Duration'] for task in BASELINE_TASKS], BASELINE_TASKS)
+    assert [ids[i] for i in compiled['targets'][0]] == ['T2A', 'T3A']
+
+    try:
+        compile_disruptions({'x': {'process': 'earthquake', 'task_id': 'T1'}}, graph, [1] * len(ids), BASELINE_TASKS)
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert 'earthquake' in str(e)
+
+
+def test_million_timelines():
+    # timed in perf_benchmark.py ('disruptions 1M timelines')
+    node_ids, graph, durations = compile_nodes(INITIAL_NODES)
+    compiled = compile_disruptions(DISRUPTIONS, graph, durations, [INITIAL_NODES[n] for n in node_ids])
+    tally = {}
+    result = run_monte_carlo(graph, durations, 1_000_000, chunk_rows=50_000, sampler=disruption_sampler(compiled, tally=tally))
+    assert len(result['end']) == 1_000_000
+    assert result['end'].min() >= 1171  # disruptions only ever add time
+    assert all(entry['runs'] == 1_000_000 for entry in tally.values())
+    assert any(entry['runs_hit'] for entry in tally.values())
+
+
+if __name__ == "__main__":
+    print("### DISRUPTIONS BACKEND TEST ###")
+
+    test_poisson_and_reject_rates()
+    test_shutdown_hits_overlapping_nodes_together()
+    test_sampler_feeds_monte_carlo()
+    test_selectors_on_supply_chain_categories()
+    test_million_timelines()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,84 @@
+"""
+graph_layout.py
+Automatic node placement for the flow diagrams (no Streamlit).
+
+sankey_layout derives columns from topological depth (longest chain of
+prerequisites) and orders nodes inside each column by the barycenter of
+their neighbours, which keeps related lanes (e.g. steel vs. engine supply)
+together and cuts down link crossings. Each sweep is linear in the number of
+links plus a sort per column, so it scales to large supply chains. With
+reduce=True, links implied by a longer chain (see graph_validation) are not
+drawn; the columns do not change, since they follow the longest chain.
+"""
+
+from schedule_engine import compile_graph, topological_levels
+from graph_validation import normalize_prereqs
+from profiling import count, timed
+
+LAYOUT_VERSION = 2  # bump when sankey_layout's placement or result changes, to rebuild cached layouts
+
+
+def _spread(count_in_column, margin=0.02):
+    """Evenly spaced positions inside (0, 1) for one column."""
+    return [margin + (1 - 2 * margin) * (i + 1) / (count_in_column + 1) for i in range(count_in_column)]
+
+
+@timed('sankey_layout')
+def sankey_layout(node_ids, prereq_lists, sweeps=2, reduce=False):
+    """
+    Positions for a Sankey diagram.
+
+    Returns a dict with 'ids' (node_ids), 'x' and 'y' (one entry per node,
+    same order as node_ids, values in (0, 1)), 'sources' / 'targets' (one
+    entry per link, as node indices) and 'depth' (the column of each node).
+    """
+    if reduce:
+        prereq_lists, _ = normalize_prereqs(node_ids, prereq_lists)
+    graph = compile_graph(node_ids, prereq_lists)
+    n = len(graph['ids'])
+    pred_ptr, pred_idx = graph['pred_ptr'], graph['pred_idx']
+    succ_ptr, succ_idx = graph['succ_ptr'], graph['succ_idx']
+
+    # Column = longest chain of prerequisites (one pass in topological order)
+    depth = topological_levels(graph)
+    max_depth = max(depth, default=0)
+
+    columns = [[] for _ in range(max_depth + 1)]
+    for i in range(n):
+        columns[depth[i]].append(i)
+
+    # Row order: alternate downstream sweeps (predecessor barycenters) and
+    # upstream sweeps (successor barycenters). Ties keep the current order.
+    row = [0] * n
+    for column in columns:
+        for position, i in enumerate(column):
+            row[i] = position
+
+    def barycenter(i, ptr, neighbours):
+        first, last = ptr[i], ptr[i + 1]
+        if first == last:
+            return row[i]
+        return sum(row[neighbours[k]] for k in range(first, last)) / (last - first)
+
+    for sweep in range(sweeps):
+        if sweep % 2 == 0:
+            ordered_columns, ptr, neighbours = columns[1:], pred_ptr, pred_idx
+        else:
+            ordered_columns, ptr, neighbours = reversed(columns[:-1]), succ_ptr, succ_idx
+        for column in ordered_columns:
+            column.sort(key=lambda i: (barycenter(i, ptr, neighbours), row[i]))
+            for position, i in enumerate(column):
+                row[i] = position
+    count('layout_sweeps', sweeps)
+
+    x = [0.0] * n
+    y = [0.0] * n
+    for d, column in enumerate(columns):
+        column_x = 0.05 + 0.9 * d / max_depth if max_depth else 0.5
+        for i, column_y in zip(column, _spread(len(column))):
+            x[i] = column_x
+            y[i] = column_y
+
+    sources = list(pred_idx)
+    targets = [j for j in range(n) for _ in range(pred_ptr[j], pred_ptr[j + 1])]
+    return {'ids': list(graph['ids']), 'x': x, 'y': y, 'sources': sources, 'targets': targets, 'depth': depth}
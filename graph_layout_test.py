@@ -0,0 +1,76 @@
+"""
+graph_layout_test.py
+Backend tests for the automatic Sankey layout (graph_layout.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import random
+
+from graph_layout import sankey_layout
+
+
+def test_columns_follow_dependency_depth():
+    from supply_chain_model import BASELINE_TASKS
+
+    ids = [task['ID'] for task in BASELINE_TASKS]
+    layout = sankey_layout(ids, [task['Prereq'] for task in BASELINE_TASKS])
+    depth = dict(zip(ids, layout['depth']))
+    x = dict(zip(ids, layout['x']))
+
+    assert depth['T1'] == 0 and depth['T2A'] == depth['T2B'] == 1 and depth['T4'] == 3
+    assert x['T2A'] == x['T2B'] and x['T1'] < x['T2A'] < x['T3A'] < x['T4'] < x['T7']
+    assert all(0 < value < 1 for value in layout['x'] + layout['y'])
+
+
+def test_barycenter_keeps_lanes_together():
+    # Two independent chains: each chain should stay on one side of the diagram
+    ids = ['A1', 'B1', 'B2', 'A2', 'A3', 'B3']
+    prereqs = [[], [], ['B1'], ['A1'], ['A2'], ['B2']]
+    layout = sankey_layout(ids, prereqs)
+    y = dict(zip(ids, layout['y']))
+    assert (y['A1'] < y['B1']) == (y['A2'] < y['B2']) == (y['A3'] < y['B3'])
+
+
+def test_links_and_large_graph():
+    rng = random.Random(11)
+    n = 5000
+    ids = [f'N{i}' for i in range(n)]
+    prereqs = [[f'N{p}' for p in rng.sample(range(i), min(i, 3))] for i in range(n)]
+    layout = sankey_layout(ids, prereqs)
+
+    assert len(layout['sources']) == sum(len(p) for p in prereqs)
+    for s, t in zip(layout['sources'][:200], layout['targets'][:200]):
+        assert layout['depth'][s] < layout['depth'][t]
+
+
+def test_shared_layout_follows_task_ids():
+    # One layout in BASELINE_TASKS order serves every scenario, whatever the plan order
+    from supply_chain_model import BASELINE_TASKS, calculate_simulated_plan, create_sankey_chart
+
+    ids = [task['ID'] for task in BASELINE_TASKS]
+    shared = sankey_layout(ids, [task['Prereq'] for task in BASELINE_TASKS], reduce=True)
+    baseline_plan = calculate_simulated_plan(BASELINE_TASKS, {})[0]
+
+    def nodes_and_links(plan, layout):
+        sankey = create_sankey_chart(plan, baseline_plan, layout).data[0]
+        label = sankey.node.label
+        nodes = sorted(zip(label, sankey.node.x, sankey.node.y, sankey.node.color))
+        links = sorted((label[s], label[t], v) for s, t, v in zip(sankey.link.source, sankey.link.target, sankey.link.value))
+        return nodes, links
+
+    # the second scenario starts T3B before T4, so its plan is in a different order
+    for inputs in ({}, {'china_prod_delay': True, 'china_shipping_delay': True}, {'design_flaw': True, 'design_rework': True}):
+        plan = calculate_simulated_plan(BASELINE_TASKS, inputs)[0]
+        assert nodes_and_links(plan, shared) == nodes_and_links(plan, None)
+
+
+if __name__ == "__main__":
+    print("### GRAPH LAYOUT BACKEND TEST ###")
+
+    test_columns_follow_dependency_depth()
+    test_barycenter_keeps_lanes_together()
+    test_links_and_large_graph()
+    test_shared_layout_follows_task_ids()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,263 @@
+"""
+graph_validation.py
+Validation and normalization of project networks (no Streamlit).
+
+Hand-made plans and imported schedules often carry structure that does not
+change a single date but costs time in every scheduling pass and clutters
+the pyramid and Sankey drawings. validate_graph reports, without raising:
+
+  unknown          prerequisites that name no node
+  self_loops       nodes listed as their own prerequisite
+  duplicates       the same predecessor and link type listed twice on a node
+  cycles           groups of nodes that depend on each other
+  orphans          nodes with neither predecessors nor successors
+  unreachable_sinks  end nodes other than the delivery target(s)
+  dead_ends        nodes whose work never reaches a delivery target
+
+normalize_prereqs removes duplicate links and, optionally, the transitive
+reduction: a plain finish-to-start link A -> C is redundant when C already
+follows A through another chain of finish-to-start links with non-negative
+lags (A -> B -> C), because that chain alone forces C to start after A
+finishes whatever the durations. Typed links (SS/FF/SF) and lagged links
+are never removed, and no link is removed on the strength of a path
+through them, so scheduling results are unchanged (for non-negative
+durations, which every plan here has).
+
+Reachability is kept as one Python int bitset per node, filled in a single
+reverse-topological sweep; a bitset is dropped as soon as its last reader is
+done, so only the sweep frontier is held in memory. For large graphs the
+target nodes are processed in blocks of `block_bits` (by topological rank),
+which bounds each bitset to block_bits bits.
+"""
+
+import copy
+
+from schedule_engine import FS, compile_graph, parse_link
+from profiling import count, timed
+
+
+@timed('validate_graph')
+def validate_graph(node_ids, prereq_lists, targets=None):
+    """
+    Checks a project network. `targets` are the delivery node(s); without
+    them the sink and dead-end checks are skipped.
+    Returns a dict with 'nodes', 'links', the issue lists described in the
+    module docstring ('cycles' is a list of node ID groups) and 'ok'
+    (False when the plan cannot be scheduled: unknown IDs, self loops or
+    cycles).
+    """
+    node_ids = list(node_ids)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    n = len(node_ids)
+
+    unknown = []
+    self_loops = []
+    duplicates = []
+    preds = [[] for _ in range(n)]
+    succs = [[] for _ in range(n)]
+    links = 0
+    for j, (node_id, prereqs) in enumerate(zip(node_ids, prereq_lists)):
+        seen = set()
+        for prereq in prereqs or []:
+            links += 1
+            pred_id, kind, _ = parse_link(prereq)
+            if pred_id not in index:
+                unknown.append((node_id, pred_id))
+                continue
+            if pred_id == node_id:
+                self_loops.append(node_id)
+                continue
+            if (pred_id, kind) in seen:
+                duplicates.append((node_id, pred_id))
+                continue
+            seen.add((pred_id, kind))
+            i = index[pred_id]
+            if i not in preds[j]:
+                preds[j].append(i)
+                succs[i].append(j)
+
+    # Kahn's algorithm; whatever is left over sits on or behind a cycle
+    in_degree = [len(p) for p in preds]
+    stack = [j for j in range(n) if in_degree[j] == 0]
+    removed = 0
+    while stack:
+        i = stack.pop()
+        removed += 1
+        for j in succs[i]:
+            in_degree[j] -= 1
+            if in_degree[j] == 0:
+                stack.append(j)
+    cycles = []
+    if removed < n:
+        import networkx as nx
+
+        stuck = nx.DiGraph()
+        for j in range(n):
+            if in_degree[j] > 0:
+                stuck.add_edges_from((i, j) for i in preds[j] if in_degree[i] > 0)
+        cycles = [[node_ids[j] for j in sorted(group)]
+                  for group in nx.strongly_connected_components(stuck) if len(group) > 1]
+        cycles.sort()
+
+    orphans = [node_ids[j] for j in range(n) if n > 1 and not preds[j] and not succs[j]]
+
+    sinks = [j for j in range(n) if not succs[j]]
+    unreachable_sinks = []
+    dead_ends = []
+    if targets is not None:
+        target_idx = {index[t] for t in targets if t in index}
+        unreachable_sinks = [node_ids[j] for j in sinks if j not in target_idx]
+        feeds = [False] * n
+        stack = list(target_idx)
+        for j in stack:
+            feeds[j] = True
+        while stack:
+            j = stack.pop()
+            for i in preds[j]:
+                if not feeds[i]:
+                    feeds[i] = True
+                    stack.append(i)
+        dead_ends = [node_ids[j] for j in range(n) if not feeds[j]]
+
+    return {
+        'nodes': n,
+        'links': links,
+        'unknown': unknown,
+        'self_loops': self_loops,
+        'duplicates': duplicates,
+        'cycles': cycles,
+        'orphans': orphans,
+        'sinks': [node_ids[j] for j in sinks],
+        'unreachable_sinks': unreachable_sinks,
+        'dead_ends': dead_ends,
+        'ok': not (unknown or self_loops or cycles),
+    }
+
+
+def dedupe_prereqs(prereqs):
+    """
+    Drops repeated links to the same predecessor with the same type (only
+    the largest lag can bind), keeping the position of the first one.
+    """
+    chosen = {}
+    for prereq in prereqs or []:
+        pred_id, kind, lag = parse_link(prereq)
+        key = (pred_id, kind)
+        if key not in chosen or lag > chosen[key][0]:
+            chosen[key] = (lag, prereq)
+    return [prereq for _, prereq in chosen.values()]
+
+
+@timed('redundant_links')
+def redundant_links(graph, block_bits=16384):
+    """
+    Link indices (positions in graph['pred_idx']) of plain finish-to-start
+    links implied by another chain of FS links with non-negative lags.
+    """
+    n = len(graph['ids'])
+    order, rank = graph['order'], graph['rank']
+    succ_ptr, succ_idx, succ_edge = graph['succ_ptr'], graph['succ_idx'], graph['succ_edge']
+    link_type, lag = graph['link_type'], graph['lag']
+
+    # Per node (by rank): successors over strong links (FS, lag >= 0) and
+    # the removable candidates among them (plain FS links), both as ranks
+    strong = [[] for _ in range(n)]
+    candidates = [[] for _ in range(n)]
+    for position, i in enumerate(order):
+        for k in range(succ_ptr[i], succ_ptr[i + 1]):
+            e = succ_edge[k]
+            if link_type[e] == FS and lag[e] >= 0:
+                strong[position].append(rank[succ_idx[k]])
+                if lag[e] == 0:
+                    candidates[position].append((rank[succ_idx[k]], e))
+    # A node's bitset is dropped once its earliest predecessor has used it,
+    # so only the current frontier is held in memory
+    release = [[] for _ in range(n)]
+    released = [False] * n
+    for r in range(n):
+        for s in strong[r]:
+            if not released[s]:
+                released[s] = True
+                release[r].append(s)
+
+    redundant = []
+    for lo in range(0, n, block_bits):
+        hi = min(lo + block_bits, n)
+        # reach[r]: bit (s - lo) set for every block node of rank s reachable
+        # from rank r through strong links. Ranks only grow along links, so
+        # nodes from rank hi on cannot reach the block and are never visited.
+        reach = [0] * hi
+        for r in range(hi - 1, -1, -1):
+            via_others = 0
+            own = 0
+            for s in strong[r]:
+                if s < hi:
+                    via_others |= reach[s]
+                    if s >= lo:
+                        own |= 1 << (s - lo)
+            reach[r] = via_others | own
+            if via_others:
+                for s, e in candidates[r]:
+                    if lo <= s < hi and via_others >> (s - lo) & 1:
+                        redundant.append(e)
+            for s in release[r]:
+                if s < hi:
+                    reach[s] = 0
+        count('reduction_blocks')
+    redundant.sort()
+    return redundant
+
+
+@timed('normalize_prereqs')
+def normalize_prereqs(node_ids, prereq_lists, reduce=True, block_bits=16384):
+    """
+    Normalized prerequisite lists (same order as node_ids) plus a report:
+    'links_before', 'links_after', 'duplicates_removed', 'redundant_removed',
+    'saved_pct' and 'removed' (a list of (node_id, pred_id) pairs).
+    Raises ValueError (from compile_graph) if the plan cannot be scheduled.
+    """
+    node_ids = list(node_ids)
+    links_before = sum(len(prereqs or []) for prereqs in prereq_lists)
+    deduped = [dedupe_prereqs(prereqs) for prereqs in prereq_lists]
+    links_deduped = sum(len(prereqs) for prereqs in deduped)
+
+    removed = []
+    normalized = deduped
+    if reduce:
+        graph = compile_graph(node_ids, deduped)
+        drop = set(redundant_links(graph, block_bits))
+        normalized = []
+        e = 0
+        for node_id, prereqs in zip(node_ids, deduped):
+            kept = []
+            for prereq in prereqs:
+                if e in drop:
+                    removed.append((node_id, parse_link(prereq)[0]))
+                else:
+                    kept.append(prereq)
+                e += 1
+            normalized.append(kept)
+
+    links_after = links_deduped - len(removed)
+    return normalized, {
+        'links_before': links_before,
+        'links_after': links_after,
+        'duplicates_removed': links_before - links_deduped,
+        'redundant_removed': len(removed),
+        'saved_pct': 100 * (links_before - links_after) / links_before if links_before else 0.0,
+        'removed': removed,
+    }
+
+
+def normalize_nodes(nodes_data, reduce=True):
+    """
+    Pyramid-format nodes ({node_id: {..., 'prereqs': [...]}}) with normalized
+    prerequisites, as a copy. Returns (nodes, report).
+    """
+    node_ids = list(nodes_data)
+    prereqs, report = normalize_prereqs(node_ids, [nodes_data[nid].get('prereqs', []) for nid in node_ids], reduce)
+    nodes = copy.deepcopy(nodes_data)
+    for node_id, kept in zip(node_ids, prereqs):
+        if 'prereqs' in nodes[node_id] or kept:
+            nodes[node_id]['prereqs'] = kept
+    return nodes, report
@@ -0,0 +1,108 @@
+"""
+graph_validation_test.py
+Backend tests for network validation and normalization (graph_validation.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import copy
+import random
+
+import networkx as nx
+
+from graph_validation import validate_graph, normalize_prereqs, normalize_nodes
+from schedule_engine import compile_graph, forward_pass, backward_pass
+
+
+def random_plan(seed, n, typed=False):
+    rng = random.Random(seed)
+    ids = [f'N{i}' for i in range(n)]
+    prereq_lists = []
+    for i in range(n):
+        prereqs = []
+        for p in rng.sample(range(max(0, i - 30), i), min(i, rng.randint(0, 4))):
+            if typed and rng.random() < 0.4:
+                prereqs.append({'id': f'N{p}', 'type': rng.choice(['FS', 'SS', 'FF', 'SF']), 'lag': rng.choice([-3, 0, 4])})
+            else:
+                prereqs.append(f'N{p}')
+        prereq_lists.append(prereqs)
+    return ids, prereq_lists, [rng.choice([0, 1, 5, 9]) for _ in range(n)]
+
+
+def test_initial_nodes():
+    from pyramid_model import INITIAL_NODES, calculate_schedule
+
+    ids = list(INITIAL_NODES)
+    report = validate_graph(ids, [INITIAL_NODES[nid].get('prereqs', []) for nid in ids], targets=['Delivery'])
+    assert report['ok'] and not report['cycles'] and not report['duplicates']
+    # Auxiliary machinery is a dead end: nothing after it leads to Delivery
+    assert report['unreachable_sinks'] == ['Aux_Mach'] and 'Aux_Mach' in report['dead_ends']
+
+    nodes, _ = normalize_nodes(INITIAL_NODES)
+    before = calculate_schedule(copy.deepcopy(INITIAL_NODES))
+    after = calculate_schedule(nodes)
+    assert after['Delivery']['end_day'] == 1171
+    assert all(before[nid]['start_day'] == after[nid]['start_day'] and
+               before[nid]['total_float'] == after[nid]['total_float'] for nid in ids)
+
+
+def test_detects_structural_problems():
+    ids = ['A', 'B', 'C', 'D', 'E', 'F']
+    prereqs = [['C'], ['A', 'A'], ['B'], ['D'], [], ['Ghost']]
+    report = validate_graph(ids, prereqs, targets=['C'])
+    assert not report['ok']
+    assert report['cycles'] == [['A', 'B', 'C']]
+    assert report['duplicates'] == [('B', 'A')] and report['self_loops'] == ['D']
+    assert report['unknown'] == [('F', 'Ghost')]
+    assert report['orphans'] == ['D', 'E', 'F']
+
+
+def test_reduction_drops_only_implied_links():
+    ids = ['A', 'B', 'C', 'D']
+    prereqs = [[], ['A'], ['A', 'B', 'B'], [{'id': 'A', 'type': 'FS', 'lag': 2}, 'C', {'id': 'B', 'type': 'SS'}]]
+    normalized, report = normalize_prereqs(ids, prereqs)
+    # C <- A is implied by A -> B -> C; lagged and typed links are kept
+    assert normalized == [[], ['A'], ['B'], [{'id': 'A', 'type': 'FS', 'lag': 2}, 'C', {'id': 'B', 'type': 'SS'}]]
+    assert report['duplicates_removed'] == 1 and report['removed'] == [('C', 'A')]
+    assert report['links_before'] == 7 and report['links_after'] == 5
+
+    # Plain finish-to-start plans: same result as the textbook transitive reduction
+    for seed in range(20):
+        ids, prereqs, _ = random_plan(seed, 60)
+        _, report = normalize_prereqs(ids, prereqs, block_bits=16)
+        reference = nx.DiGraph([(p, node_id) for node_id, ps in zip(ids, prereqs) for p in ps])
+        reference.add_nodes_from(ids)
+        assert report['links_after'] == nx.transitive_reduction(reference).number_of_edges()
+
+
+def test_schedules_unchanged():
+    for seed in range(40):
+        ids, prereqs, durations = random_plan(seed, 80, typed=True)
+        normalized, _ = normalize_prereqs(ids, prereqs, block_bits=32)
+        full, reduced = compile_graph(ids, prereqs), compile_graph(ids, normalized)
+        start, finish = forward_pass(full, durations)
+        assert forward_pass(reduced, durations) == (start, finish)
+        assert backward_pass(reduced, durations, finish) == backward_pass(full, durations, finish)
+
+
+def test_large_plan():
+    # timed in perf_benchmark.py ('normalize 30k nodes')
+    ids, prereqs, durations = random_plan(3, 30000)
+    normalized, report = normalize_prereqs(ids, prereqs)
+    assert report['redundant_removed'] > 0 and report['saved_pct'] > 5
+    full, reduced = compile_graph(ids, prereqs), compile_graph(ids, normalized)
+    start, finish = forward_pass(full, durations)
+    assert forward_pass(reduced, durations) == (start, finish)
+    assert backward_pass(reduced, durations, finish) == backward_pass(full, durations, finish)
+
+
+if __name__ == "__main__":
+    print("### GRAPH VALIDATION BACKEND TEST ###")
+
+    test_initial_nodes()
+    test_detects_structural_problems()
+    test_reduction_drops_only_implied_links()
+    test_schedules_unchanged()
+    test_large_plan()
+
+    print("\nAll tests completed.")
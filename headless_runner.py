@@ -0,0 +1,116 @@
+"""
+headless_runner.py
+Runs the same calculation and chart-building stages as one Streamlit rerun,
+without a browser session, and reports where the time goes.
+
+Examples:
+    python headless_runner.py pyramid --delay Engine_Prep=10 --delay Fuel_Sys=30
+    python headless_runner.py supply --scenario design_flaw --scenario china_prod_delay
+    python headless_runner.py pyramid --repeat 20 --profile-json prof.json --chrome-trace trace.json
+
+Open the Chrome trace in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import argparse
+import copy
+
+from profiling import start_profiler, stage
+
+
+def run_pyramid(delays):
+    """One pyramid-app rerun: schedules, layout and figure."""
+    from pyramid_model import INITIAL_NODES, calculate_schedule, get_pyramid_layout, build_pyramid_figure
+
+    nodes = copy.deepcopy(INITIAL_NODES)
+    for node_id, days in delays.items():
+        nodes[node_id]['delay'] = days
+
+    calculated_nodes = calculate_schedule(nodes)
+    baseline_nodes = calculate_schedule(copy.deepcopy(INITIAL_NODES))
+    pos = get_pyramid_layout(calculated_nodes)
+    build_pyramid_figure(calculated_nodes, baseline_nodes, pos, 'Delivery')
+    return calculated_nodes['Delivery']['end_day'], baseline_nodes['Delivery']['end_day']
+
+
+def run_supply(scenario_keys):
+    """One supply-chain-app rerun: plans, Sankey and Gantt charts."""
+    from supply_chain_model import BASELINE_TASKS, calculate_simulated_plan, create_sankey_chart, create_gantt_chart
+
+    inputs = {key: True for key in scenario_keys}
+    baseline_plan, _, baseline_end_week = calculate_simulated_plan(BASELINE_TASKS, {})
+    simulated_plan, _, simulated_end_week = calculate_simulated_plan(BASELINE_TASKS, inputs)
+    create_sankey_chart(simulated_plan, baseline_plan)
+    create_gantt_chart(simulated_plan, "Simulated Project Timeline (With Delays)")
+    create_gantt_chart(baseline_plan, "Baseline Project Timeline (No Delays)")
+    return simulated_end_week, baseline_end_week
+
+
+def parse_delays(pairs):
+    """{node: days} from NODE=DAYS pairs; ValueError for a malformed pair or unknown node."""
+    from pyramid_model import INITIAL_NODES
+
+    delays = {}
+    for pair in pairs:
+        node_id, _, days = pair.partition('=')
+        if node_id not in INITIAL_NODES:
+            raise ValueError(f"unknown node '{node_id}' in --delay {pair}")
+        try:
+            delays[node_id] = int(days)
+        except ValueError:
+            raise ValueError(f"--delay {pair}: expected NODE=DAYS with whole days") from None
+    return delays
+
+
+def check_scenarios(keys):
+    """ValueError for a scenario key that is not in DELAY_DEFINITIONS."""
+    from supply_chain_model import DELAY_DEFINITIONS
+
+    for key in keys:
+        if key not in DELAY_DEFINITIONS:
+            raise ValueError(f"unknown scenario '{key}' in --scenario (choose from {', '.join(DELAY_DEFINITIONS)})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Shipyard simulation run with stage timings.")
+    parser.add_argument('model', choices=['pyramid', 'supply'], help="which app's pipeline to run")
+    parser.add_argument('--delay', action='append', default=[], metavar='NODE=DAYS',
+                        help="pyramid model: added delay for a node (repeatable)")
+    parser.add_argument('--scenario', action='append', default=[], metavar='KEY',
+                        help="supply model: DELAY_DEFINITIONS key to activate (repeatable)")
+    parser.add_argument('--repeat', type=int, default=1, help="number of reruns to time")
+    parser.add_argument('--profile-json', metavar='PATH', help="write stage timings and counters as JSON")
+    parser.add_argument('--chrome-trace', metavar='PATH', help="write a Chrome trace (Trace Event Format)")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    try:
+        delays = parse_delays(args.delay)
+        check_scenarios(args.scenario)
+    except ValueError as e:
+        parser.error(str(e))
+
+    profiler = start_profiler(f'headless_{args.model}')
+    for _ in range(args.repeat):
+        with stage('rerun'):
+            if args.model == 'pyramid':
+                result, baseline = run_pyramid(delays)
+            else:
+                result, baseline = run_supply(args.scenario)
+
+    print(f"Delivery: {result} (baseline {baseline})")
+    print(f"\n{'Stage':<28}{'Calls':>7}{'Total ms':>12}{'Max ms':>10}")
+    for row in profiler.stage_totals():
+        print(f"{row['Stage']:<28}{row['Calls']:>7}{row['Total (ms)']:>12.2f}{row['Max (ms)']:>10.2f}")
+    print("\nCounters:")
+    for name, value in sorted(profiler.counters.items()):
+        print(f"  {name}: {value}")
+
+    if args.profile_json:
+        profiler.write(args.profile_json, fmt='json')
+    if args.chrome_trace:
+        profiler.write(args.chrome_trace, fmt='chrome')
+    return profiler
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+headless_runner_test.py
+Backend tests for the headless rerun runner (headless_runner.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import contextlib
+import contextvars
+import io
+import json
+import os
+import tempfile
+
+from headless_runner import main, parse_delays
+
+
+def run_main(argv):
+    """main(argv) in an empty context with its printout captured: (profiler, output)."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        profiler = contextvars.Context().run(main, argv)
+    return profiler, out.getvalue()
+
+
+def rejected(argv):
+    """The argparse error message main prints for bad arguments, or None if they were accepted."""
+    err = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(err), contextlib.redirect_stdout(io.StringIO()):
+            contextvars.Context().run(main, argv)
+    except SystemExit as e:
+        assert e.code == 2
+        return err.getvalue()
+    return None
+
+
+def test_pyramid_run_and_exports():
+    with tempfile.TemporaryDirectory() as directory:
+        profile_path = os.path.join(directory, 'prof.json')
+        trace_path = os.path.join(directory, 'trace.json')
+        profiler, out = run_main(['pyramid', '--delay', 'Panel_Assy=40', '--repeat', '2',
+                                  '--profile-json', profile_path, '--chrome-trace', trace_path])
+        with open(profile_path) as f:
+            profile = json.load(f)
+        with open(trace_path) as f:
+            trace = json.load(f)
+
+    assert out.startswith("Delivery: 1211 (baseline 1171)")
+    totals = {row['Stage']: row for row in profiler.stage_totals()}
+    assert totals['rerun']['Calls'] == 2
+    assert {'calculate_schedule', 'get_pyramid_layout'} <= set(totals)
+    assert profile['name'] == 'headless_pyramid'
+    assert [row['Stage'] for row in profile['stages']] == [row['Stage'] for row in profiler.stage_totals()]
+    assert sum(event['name'] == 'rerun' for event in trace['traceEvents'] if event['ph'] == 'X') == 2
+
+
+def test_supply_run():
+    _, out = run_main(['supply', '--scenario', 'design_flaw'])
+    simulated, baseline = out.split('\n')[0].removeprefix('Delivery: ').rstrip(')').split(' (baseline ')
+    assert float(simulated) > float(baseline)
+    assert 'Stage' in out and 'Counters:' in out
+
+
+def test_bad_arguments_are_rejected():
+    assert 'at least 1' in rejected(['pyramid', '--repeat', '0'])
+    assert 'at least 1' in rejected(['supply', '--repeat', '-3'])
+    assert "unknown node 'Nope'" in rejected(['pyramid', '--delay', 'Nope=5'])
+    assert 'NODE=DAYS' in rejected(['pyramid', '--delay', 'Panel_Assy=soon'])
+    assert 'NODE=DAYS' in rejected(['pyramid', '--delay', 'Panel_Assy'])
+    assert "unknown scenario 'desing_flaw'" in rejected(['supply', '--scenario', 'desing_flaw'])
+    assert rejected(['supply', '--scenario', 'design_flaw']) is None
+
+
+def test_parse_delays():
+    assert parse_delays(['Panel_Assy=40', 'Engine_Prep=-2']) == {'Panel_Assy': 40, 'Engine_Prep': -2}
+    assert parse_delays([]) == {}
+
+
+if __name__ == "__main__":
+    print("### HEADLESS RUNNER BACKEND TEST ###")
+
+    test_pyramid_run_and_exports()
+    test_supply_run()
+    test_bad_arguments_are_rejected()
+    test_parse_delays()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,253 @@
+"""
+hierarchy.py
+Hierarchical groups (Zone / System / Block) over a project's nodes and
+rolled-up dates for zoomable summary views (no Streamlit).
+
+Groups form a tree; every node belongs to at most one group (its innermost
+one), nodes outside any group stay at the top level:
+
+    groups = {
+        'Zone_Hull': {'label': 'Hull', 'level': 'Zone'},
+        'Blk_Hull_Blocks': {'label': 'Hull Blocks', 'level': 'Block', 'parent': 'Zone_Hull'},
+    }
+    node_groups = {'Panel_Assy': 'Blk_Hull_Blocks', 'Block_Assy': 'Blk_Hull_Blocks'}
+
+A group's rollup covers everything below it: earliest start, latest end and
+late end, and the smallest total float (its most critical member).
+rollup_schedule computes every group in one bottom-up pass over the nodes
+and then the groups; update_rollup recomputes only the groups above the
+nodes whose dates changed, so a delay edit costs the size of the groups it
+touches, not of the project. summary_nodes turns the groups that are
+collapsed and the nodes of expanded groups into a nodes_data-like dict
+(links merged onto what is visible), so only visible items are laid out
+and drawn.
+"""
+
+import numpy as np
+
+from schedule_engine import prereq_ids
+from profiling import count, timed
+
+
+def compile_hierarchy(node_ids, groups, node_groups):
+    """
+    Compiles groups and node memberships against a project's nodes. Groups
+    are ordered children first ('order'), so one walk over them is bottom-up.
+    Raises ValueError for unknown parents, groups or nodes, cycles and IDs
+    used for both a group and a node.
+    """
+    node_ids = list(node_ids)
+    node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+    group_ids = list(groups)
+    index = {group_id: g for g, group_id in enumerate(group_ids)}
+    for group_id in group_ids:
+        if group_id in node_index:
+            raise ValueError(f"'{group_id}' is both a group and a node")
+        parent = groups[group_id].get('parent')
+        if parent is not None and parent not in index:
+            raise ValueError(f"Group '{group_id}' has unknown parent '{parent}'")
+    parent = np.array([index.get(groups[group_id].get('parent'), -1) for group_id in group_ids], dtype=int)
+
+    depth = np.zeros(len(group_ids), dtype=int)
+    for g in range(len(group_ids)):
+        p = parent[g]
+        while p >= 0:
+            depth[g] += 1
+            if depth[g] > len(group_ids):
+                raise ValueError(f"Group '{group_ids[g]}' is its own ancestor")
+            p = parent[p]
+
+    node_group = np.full(len(node_ids), -1, dtype=int)
+    for node_id, group_id in node_groups.items():
+        if node_id not in node_index:
+            raise ValueError(f"Unknown node '{node_id}' in group '{group_id}'")
+        if group_id not in index:
+            raise ValueError(f"Node '{node_id}' is in unknown group '{group_id}'")
+        node_group[node_index[node_id]] = index[group_id]
+
+    order = np.argsort(-depth, kind='stable')
+    members = [[] for _ in group_ids]
+    for i, g in enumerate(node_group):
+        if g >= 0:
+            members[g].append(i)
+    children = [[] for _ in group_ids]
+    for g in range(len(group_ids)):
+        if parent[g] >= 0:
+            children[parent[g]].append(g)
+
+    # every node under each group, for sizes
+    size = np.bincount(node_group[node_group >= 0], minlength=len(group_ids))
+    for g in order:
+        if parent[g] >= 0:
+            size[parent[g]] += size[g]
+
+    return {
+        'node_ids': node_ids,
+        'node_index': node_index,
+        'group_ids': group_ids,
+        'index': index,
+        'groups': groups,
+        'parent': parent,
+        'depth': depth,
+        'order': order,
+        'node_group': node_group,
+        'members': [np.array(m, dtype=int) for m in members],
+        'children': children,
+        'size': size,
+    }
+
+
+def _node_values(schedule):
+    start = np.asarray(schedule['start'], dtype=float)
+    return {
+        'start': start,
+        'end': np.asarray(schedule['finish'], dtype=float),
+        'late_end': np.asarray(schedule['late_finish'], dtype=float),
+        'total_float': np.asarray(schedule['late_start'], dtype=float) - start,
+    }
+
+
+# rollup field -> how members combine
+_COMBINE = {'start': np.minimum, 'end': np.maximum, 'late_end': np.maximum, 'total_float': np.minimum}
+_EMPTY = {'start': np.inf, 'end': -np.inf, 'late_end': -np.inf, 'total_float': np.inf}
+
+
+@timed('rollup_schedule')
+def rollup_schedule(hierarchy, schedule):
+    """
+    Rolled-up dates of every group from a schedule ('start', 'finish',
+    'late_start', 'late_finish' lists in node order, as returned by the
+    simulation service): {field: array over groups}, one bottom-up pass.
+    Groups without any node get inf / -inf.
+    """
+    values = _node_values(schedule)
+    node_group = hierarchy['node_group']
+    grouped = node_group >= 0
+    parent = hierarchy['parent']
+    rollup = {}
+    for field, combine in _COMBINE.items():
+        result = np.full(len(hierarchy['group_ids']), _EMPTY[field])
+        combine.at(result, node_group[grouped], values[field][grouped])
+        for g in hierarchy['order']:
+            if parent[g] >= 0:
+                result[parent[g]] = combine(result[parent[g]], result[g])
+        rollup[field] = result
+    count('rollup_groups', len(hierarchy['group_ids']))
+    return rollup
+
+
+def changed_nodes(old_schedule, new_schedule):
+    """Indices of nodes with any date or float that differs between two schedules."""
+    old, new = _node_values(old_schedule), _node_values(new_schedule)
+    return np.flatnonzero(np.any([old[field] != new[field] for field in _COMBINE], axis=0))
+
+
+def _take(values, indices):
+    if isinstance(values, np.ndarray):
+        return values[indices]
+    return [values[i] for i in indices]
+
+
+def update_rollup(hierarchy, rollup, schedule, changed):
+    """
+    Brings `rollup` (from rollup_schedule) up to date in place after the
+    nodes `changed` (indices, e.g. from changed_nodes) moved to `schedule`.
+    Only the groups above those nodes are recomputed, children first.
+    Returns the indices of groups whose rollup changed.
+    """
+    parent, node_group = hierarchy['parent'], hierarchy['node_group']
+    affected = set()
+    for g in set(node_group[np.asarray(changed, dtype=int)].tolist()):
+        while g >= 0 and g not in affected:
+            affected.add(g)
+            g = parent[g]
+    if not affected:
+        return []
+
+    members, children = hierarchy['members'], hierarchy['children']
+    moved = []
+    for g in sorted(affected, key=lambda g: -hierarchy['depth'][g]):
+        # only this group's own nodes are read, not the whole schedule
+        values = _node_values({key: _take(schedule[key], members[g]) for key in ('start', 'finish', 'late_start', 'late_finish')})
+        was_moved = False
+        for field, combine in _COMBINE.items():
+            result = _EMPTY[field]
+            if len(members[g]):
+                result = combine.reduce(values[field])
+            for child in children[g]:
+                result = combine(result, rollup[field][child])
+            if result != rollup[field][g]:
+                rollup[field][g] = result
+                was_moved = True
+        if was_moved:
+            moved.append(g)
+    count('rollup_groups', len(affected))
+    return moved
+
+
+def _plain(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def summary_nodes(hierarchy, nodes_data, rollup, expanded=()):
+    """
+    The visible items as a nodes_data-like dict: groups whose parents are
+    all expanded (collapsed ones as one item each) and the nodes of expanded
+    groups, with links merged onto the visible items. Group items carry
+    'group': True, 'level', 'size' and the rolled-up 'start_day', 'end_day',
+    'late_end' and 'total_float'. `nodes_data` must be scheduled.
+    """
+    group_ids, parent, node_group = hierarchy['group_ids'], hierarchy['parent'], hierarchy['node_group']
+    expanded = set(expanded)
+
+    # top-down: a group is shown if its parent is shown and expanded, else it
+    # is drawn as its nearest shown ancestor
+    shown = np.zeros(len(group_ids), dtype=bool)
+    represent = np.arange(len(group_ids))
+    for g in hierarchy['order'][::-1]:
+        p = parent[g]
+        shown[g] = p < 0 or (shown[p] and group_ids[p] in expanded)
+        if not shown[g]:
+            represent[g] = represent[p]
+
+    def visible(i):
+        g = node_group[i]
+        if g < 0 or (shown[g] and group_ids[g] in expanded):
+            return hierarchy['node_ids'][i]
+        return group_ids[represent[g]]
+
+    node_ids = hierarchy['node_ids']
+    items = {}
+    for g in np.flatnonzero(shown):
+        group_id = group_ids[g]
+        if group_id in expanded or not hierarchy['size'][g]:
+            continue
+        group = hierarchy['groups'][group_id]
+        items[group_id] = {
+            'label': f"{group.get('label', group_id)} ({hierarchy['size'][g]})",
+            'type': group.get('level', 'Group'),
+            'group': True,
+            'level': group.get('level', 'Group'),
+            'size': int(hierarchy['size'][g]),
+            'duration': _plain(rollup['end'][g] - rollup['start'][g]),
+            'start_day': _plain(rollup['start'][g]),
+            'end_day': _plain(rollup['end'][g]),
+            'late_end': _plain(rollup['late_end'][g]),
+            'total_float': _plain(rollup['total_float'][g]),
+            'prereqs': set(),
+        }
+    for i, node_id in enumerate(node_ids):
+        item_id = visible(i)
+        if item_id == node_id:
+            items[node_id] = dict(nodes_data[node_id], prereqs=set())
+    for i, node_id in enumerate(node_ids):
+        item_id = visible(i)
+        for pred in prereq_ids(nodes_data[node_id].get('prereqs')):
+            pred_item = visible(hierarchy['node_index'][pred])
+            if pred_item != item_id:
+                items[item_id]['prereqs'].add(pred_item)
+    for item in items.values():
+        item['prereqs'] = sorted(item['prereqs'])
+    count('summary_items', len(items))
+    return items
@@ -0,0 +1,185 @@
+"""
+hierarchy_test.py
+Backend tests for hierarchical groups, rollups and summary views
+(hierarchy.py) on the pyramid and on a large generated yard.
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import contextvars
+import copy
+import random
+
+import numpy as np
+
+from hierarchy import compile_hierarchy, rollup_schedule, update_rollup, changed_nodes, summary_nodes
+from schedule_engine import compile_graph, forward_pass, backward_pass
+from profiling import start_profiler
+from pyramid_model import INITIAL_NODES, GROUPS, calculate_schedule, compile_pyramid_hierarchy
+
+
+def schedule_of(graph, durations):
+    start, finish = forward_pass(graph, durations)
+    late_start, late_finish = backward_pass(graph, durations, finish)
+    return {'start': start, 'finish': finish, 'late_start': late_start, 'late_finish': late_finish}
+
+
+def brute_force(hierarchy, schedule, g):
+    """Rollup of group g straight from every node below it."""
+    below = []
+    for i, group in enumerate(hierarchy['node_group']):
+        while group >= 0 and group != g:
+            group = hierarchy['parent'][group]
+        if group == g:
+            below.append(i)
+    start = [schedule['start'][i] for i in below]
+    return {
+        'start': min(start),
+        'end': max(schedule['finish'][i] for i in below),
+        'late_end': max(schedule['late_finish'][i] for i in below),
+        'total_float': min(schedule['late_start'][i] - schedule['start'][i] for i in below),
+    }
+
+
+def generated_yard(seed=0, zones=4, systems=5, blocks=8, per_block=250):
+    """A yard of zones > systems > blocks, each block a chain-ish network of activities."""
+    rng = random.Random(seed)
+    groups, node_groups, ids, prereqs = {}, {}, [], []
+    for z in range(zones):
+        groups[f'Z{z}'] = {'label': f'Zone {z}', 'level': 'Zone'}
+        for s in range(systems):
+            groups[f'Z{z}S{s}'] = {'label': f'System {z}.{s}', 'level': 'System', 'parent': f'Z{z}'}
+            for b in range(blocks):
+                block = f'Z{z}S{s}B{b}'
+                groups[block] = {'label': f'Block {z}.{s}.{b}', 'level': 'Block', 'parent': f'Z{z}S{s}'}
+                for a in range(per_block):
+                    node_id = f'{block}_A{a}'
+                    links = [ids[-1]] if a else []
+                    if ids and rng.random() < 0.2:
+                        links.append(rng.choice(ids))
+                    ids.append(node_id)
+                    prereqs.append(sorted(set(links)))
+                    node_groups[node_id] = block
+    ids.append('Delivery')
+    prereqs.append([node_id for node_id in ids if node_id.endswith(f'_A{per_block - 1}')])
+    graph = compile_graph(ids, prereqs)
+    durations = [rng.randint(1, 10) for _ in ids]
+    return compile_hierarchy(ids, groups, node_groups), graph, durations
+
+
+def test_pyramid_rollups():
+    nodes = calculate_schedule(copy.deepcopy(INITIAL_NODES))
+    hierarchy = compile_pyramid_hierarchy(nodes)
+    ids = list(nodes)
+    schedule = {'start': [nodes[n]['start_day'] for n in ids], 'finish': [nodes[n]['end_day'] for n in ids],
+                'late_start': [nodes[n]['late_start'] for n in ids], 'late_finish': [nodes[n]['late_end'] for n in ids]}
+    rollup = rollup_schedule(hierarchy, schedule)
+    for g, group_id in enumerate(hierarchy['group_ids']):
+        expected = brute_force(hierarchy, schedule, g)
+        assert {field: rollup[field][g] for field in expected} == expected, group_id
+
+    view = summary_nodes(hierarchy, nodes, rollup)
+    assert set(view) == {group_id for group_id in GROUPS if 'parent' not in GROUPS[group_id]} | {'Delivery'}
+    assert view['Zone_Commissioning']['end_day'] == 1166 and view['Zone_Commissioning']['total_float'] == 0
+    assert view['Delivery']['prereqs'] == ['Zone_Commissioning']
+    assert sum(item['size'] for item in view.values() if item.get('group')) == len(nodes) - 1
+
+    # expanding a zone shows its systems, expanding a system its agents
+    view = summary_nodes(hierarchy, nodes, rollup, ['Zone_Machinery', 'Sys_Propulsion'])
+    assert 'Zone_Machinery' not in view and 'Sys_Fuel_Piping' in view and 'Mount_Engine' in view
+    assert view['Mount_Engine']['prereqs'] == ['Engine_Prep']
+    assert view['Engine_Prep']['prereqs'] == ['Zone_Supply']
+    assert view['Sys_Fuel_Piping']['prereqs'] == ['Mount_Engine', 'Zone_Supply']
+    # a group expanded under a collapsed parent stays hidden
+    view = summary_nodes(hierarchy, nodes, rollup, ['Sys_Propulsion'])
+    assert 'Mount_Engine' not in view and 'Zone_Machinery' in view
+
+
+def test_incremental_matches_full_rollup():
+    hierarchy, graph, durations = generated_yard()
+    schedule = schedule_of(graph, durations)
+    rollup = rollup_schedule(hierarchy, schedule)
+    rng = random.Random(3)
+    for _ in range(10):
+        durations = list(durations)
+        durations[rng.randrange(len(durations))] += rng.randint(-3, 30)
+        new_schedule = schedule_of(graph, [max(0, d) for d in durations])
+        changed = changed_nodes(schedule, new_schedule)
+        before = {field: values.copy() for field, values in rollup.items()}
+        moved = update_rollup(hierarchy, rollup, new_schedule, changed)
+        full = rollup_schedule(hierarchy, new_schedule)
+        for field in full:
+            assert np.array_equal(rollup[field], full[field]), field
+        # exactly the groups whose rollup differs are reported
+        differs = np.any([before[field] != full[field] for field in full], axis=0)
+        assert sorted(moved) == np.flatnonzero(differs).tolist()
+        schedule = new_schedule
+
+
+def test_incremental_update_is_local():
+    hierarchy, graph, durations = generated_yard(blocks=40, per_block=120)
+    schedule = schedule_of(graph, durations)
+    rollup = rollup_schedule(hierarchy, schedule)
+
+    # a real change in one activity: only its block, system and zone are recomputed
+    finish = list(schedule['finish'])
+    finish[5] += 1_000_000
+    changed = dict(schedule, finish=finish)
+
+    def update():
+        profiler = start_profiler('rollup_test')
+        moved = update_rollup(hierarchy, rollup, changed, changed_nodes(schedule, changed))
+        return profiler, moved
+    profiler, moved = contextvars.Context().run(update)
+    assert [hierarchy['group_ids'][g] for g in moved] == ['Z0S0B0', 'Z0S0', 'Z0']
+    assert profiler.counters['rollup_groups'] == 3
+
+    def full():
+        profiler = start_profiler('rollup_test')
+        return profiler, rollup_schedule(hierarchy, changed)
+    profiler, expected = contextvars.Context().run(full)
+    assert profiler.counters['rollup_groups'] == len(hierarchy['group_ids']) == 4 + 4 * 5 + 4 * 5 * 40
+    for field in expected:
+        assert np.array_equal(rollup[field], expected[field])
+
+
+def test_summary_view_of_large_yard():
+    hierarchy, graph, durations = generated_yard()
+    schedule = schedule_of(graph, durations)
+    rollup = rollup_schedule(hierarchy, schedule)
+    nodes = {node_id: {'label': node_id, 'type': 'Construction', 'prereqs': prereqs}
+             for node_id, prereqs in zip(hierarchy['node_ids'], [[graph['ids'][graph['pred_idx'][e]] for e in
+                                                                   range(graph['pred_ptr'][j], graph['pred_ptr'][j + 1])]
+                                                                  for j in range(len(graph['ids']))])}
+    view = summary_nodes(hierarchy, nodes, rollup)
+    assert len(view) == 5  # four zones and Delivery, not 40k activities
+    view = summary_nodes(hierarchy, nodes, rollup, ['Z1', 'Z1S2'])
+    assert len(view) == 3 + 4 + 8 + 1
+    assert all(item['size'] == 250 for item_id, item in view.items() if item_id.startswith('Z1S2B'))
+
+
+def test_invalid_hierarchies():
+    for groups, node_groups, message in [
+        ({'A': {'parent': 'B'}, 'B': {'parent': 'A'}}, {}, 'own ancestor'),
+        ({'A': {'parent': 'Nope'}}, {}, 'unknown parent'),
+        ({'X': {}}, {}, 'both a group and a node'),
+        ({'A': {}}, {'X': 'B'}, 'unknown group'),
+        ({'A': {}}, {'Q': 'A'}, 'Unknown node'),
+    ]:
+        try:
+            compile_hierarchy(['X', 'Y'], groups, node_groups)
+            assert False, f"expected ValueError ({message})"
+        except ValueError as e:
+            assert message in str(e)
+
+
+if __name__ == "__main__":
+    print("### HIERARCHY BACKEND TEST ###")
+
+    test_pyramid_rollups()
+    test_incremental_matches_full_rollup()
+    test_incremental_update_is_local()
+    test_summary_view_of_large_yard()
+    test_invalid_hierarchies()
+
+    print("\nAll tests completed.")
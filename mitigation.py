@@ -0,0 +1,216 @@
+"""
+mitigation.py
+Mitigation portfolio optimizer: which risk responses to buy, within a
+budget, to pull in the P80 delivery date (no Streamlit).
+
+A mitigation is written like a delay rule (same selectors, see
+delay_rules.py) but its effects shorten or de-risk the nodes it hits, and
+it has a cost:
+
+    'dual_source_engine': {
+        'name': 'Dual-Source Diesel Engine',
+        'task_id': 'Pur_Engine',
+        'cost': 180000,
+        'risk': 0.4,          # overrun tail cut to 40 %
+        'days': -20,          # change to the planned duration
+        'multiplier': 0.9,    # scales the planned duration
+    }
+
+'triggers', 'requires' and 'group' work as for delay rules (e.g. a crew that
+only helps if the second shift is bought too).
+
+Every portfolio is scored on the same sampled overrun factors (common random
+numbers): two portfolios differ only by what they buy, not by sampling
+noise, so a modest sample ranks them reliably. Portfolios are scored in
+batches through forward_pass_batch, optionally spread over a process pool.
+
+  - up to `exact_limit` mitigations: every affordable portfolio is scored,
+  - beyond that: steepest-descent local search from the empty portfolio
+    over add / drop / swap moves, each round scored as one batch.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from schedule_engine import forward_pass_batch
+from delay_rules import compile_rules, resolve_active, scenario_durations
+from monte_carlo import triangular_sampler
+from profiling import count, timed
+
+BATCH_CELLS = 4_000_000  # portfolios x samples x nodes scheduled per forward pass
+
+
+def compile_mitigations(mitigations, node_ids, node_records):
+    """
+    Compiles a {key: mitigation} dict against a project's nodes: the delay
+    rule matrices plus 'log_risk' (mitigations x nodes) and 'cost'.
+    """
+    compiled = compile_rules(mitigations, node_ids, node_records, unit='days')
+    log_risk = np.zeros_like(compiled['add'])
+    for r, key in enumerate(compiled['keys']):
+        risk = mitigations[key].get('risk', 1.0)
+        if risk <= 0:
+            raise ValueError(f"Mitigation '{key}' needs a risk factor above 0")
+        log_risk[r, compiled['targets'][r]] = np.log(risk)
+    compiled['log_risk'] = log_risk
+    compiled['cost'] = np.array([mitigations[key].get('cost', 0) for key in compiled['keys']], dtype=float)
+    return compiled
+
+
+def portfolio_durations(compiled, base_durations, factors, active):
+    """
+    Sampled durations for each portfolio: (portfolios, samples, nodes).
+    `factors` (samples x nodes) are the shared duration factors around 1;
+    a portfolio's risk factors scale only the overrun part of them.
+    """
+    active = np.atleast_2d(active)
+    planned = np.maximum(scenario_durations(compiled, base_durations, active), 0)
+    risk = np.exp(active.astype(float) @ compiled['log_risk'])
+    overrun = np.maximum(factors - 1, 0)
+    underrun = np.minimum(factors - 1, 0)
+    return planned[:, None, :] * (1 + underrun[None] + overrun[None] * risk[:, None, :])
+
+
+def score_portfolios(problem, selected):
+    """`quantile` of the project end for each row of `selected` (portfolios x mitigations)."""
+    graph, compiled, base, factors, quantile = problem
+    active = resolve_active(compiled, selected)
+    samples, n = factors.shape
+    rows = max(1, BATCH_CELLS // max(1, samples * n))
+    scores = []
+    for first in range(0, len(active), rows):
+        block = active[first:first + rows]
+        durations = portfolio_durations(compiled, base, factors, block)
+        _, finish = forward_pass_batch(graph, durations.reshape(-1, n))
+        ends = finish.max(axis=1).reshape(len(block), samples)
+        scores.append(np.percentile(ends, quantile, axis=1))
+    count('portfolios_scored', len(active))
+    return np.concatenate(scores) if scores else np.empty(0)
+
+
+_PROBLEM = None  # set in each pool worker
+
+
+def _init_worker(problem):
+    global _PROBLEM
+    _PROBLEM = problem
+
+
+def _score_in_worker(selected):
+    return score_portfolios(_PROBLEM, selected)
+
+
+class PortfolioScorer:
+    """
+    Scores portfolios (boolean rows) once each, in batches; with workers > 1
+    a batch is split over a process pool that holds the shared samples.
+    """
+
+    def __init__(self, problem, workers=1):
+        self.problem = problem
+        self.scores = {}
+        self._pool = None
+        self._workers = workers
+        if workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(problem,))
+
+    def __call__(self, selected):
+        selected = np.atleast_2d(np.asarray(selected, dtype=bool))
+        keys = [row.tobytes() for row in selected]
+        todo = {key: row for key, row in zip(keys, selected) if key not in self.scores}
+        if todo:
+            rows = np.array(list(todo.values()))
+            if self._pool is not None and len(rows) > 1:
+                parts = np.array_split(rows, min(self._workers, len(rows)))
+                values = np.concatenate(list(self._pool.map(_score_in_worker, parts)))
+            else:
+                values = score_portfolios(self.problem, rows)
+            self.scores.update(zip(todo, values))
+        return np.array([self.scores[key] for key in keys])
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def _best(candidates, values, cost, eps):
+    """Index of the lowest score; near-ties go to the cheaper portfolio."""
+    lowest = values.min()
+    near = np.flatnonzero(values <= lowest + eps)
+    return near[np.argmin(candidates[near] @ cost)]
+
+
+@timed('optimize_portfolio')
+def optimize_portfolio(graph, base_durations, mitigations, node_records, budget, samples=1000, quantile=80,
+                       seed=0, sampler=None, exact_limit=8, workers=1, max_rounds=50, eps=1e-6):
+    """
+    Best portfolio within `budget` for the given percentile of the project
+    end (P80 by default); near-ties go to the cheaper portfolio.
+    Returns a dict with 'selected' (mitigation keys), 'cost', 'value' (the
+    percentile with the portfolio), 'baseline' (without any), 'standalone'
+    ({key: value with only that mitigation}), 'evaluated' and 'method'
+    ('exhaustive' or 'local_search').
+    """
+    compiled = compile_mitigations(mitigations, graph['ids'], node_records)
+    cost = compiled['cost']
+    k = len(cost)
+    base = np.asarray(base_durations, dtype=float)
+    sampler = sampler or triangular_sampler()
+    factors = sampler(np.random.default_rng(seed), np.ones(len(base)), samples)
+    scorer = PortfolioScorer((graph, compiled, base, factors, quantile), workers)
+
+    try:
+        empty = np.zeros((1, k), dtype=bool)
+        singles = np.eye(k, dtype=bool)
+        first = scorer(np.vstack([empty, singles]))
+        baseline, standalone = first[0], first[1:]
+
+        if k <= exact_limit:
+            method = 'exhaustive'
+            subsets = np.arange(2 ** k)
+            candidates = ((subsets[:, None] >> np.arange(k)) & 1).astype(bool)
+            candidates = candidates[candidates @ cost <= budget]
+            values = scorer(candidates)
+            best = candidates[_best(candidates, values, cost, eps)]
+        else:
+            method = 'local_search'
+            best = empty[0]
+            best_value = baseline
+            for _ in range(max_rounds):
+                moves = []
+                for j in range(k):
+                    move = best.copy()
+                    move[j] = not move[j]
+                    moves.append(move)
+                    if best[j]:
+                        for i in np.flatnonzero(~best):
+                            swap = move.copy()
+                            swap[i] = True
+                            moves.append(swap)
+                moves = np.array(moves)
+                moves = moves[moves @ cost <= budget]
+                if not len(moves):
+                    break
+                values = scorer(moves)
+                pick = _best(moves, values, cost, eps)
+                better = values[pick] < best_value - eps
+                cheaper = values[pick] <= best_value + eps and moves[pick] @ cost < best @ cost
+                if not (better or cheaper):
+                    break
+                best, best_value = moves[pick], values[pick]
+        value = scorer(best)[0]
+        evaluated = len(scorer.scores)
+    finally:
+        scorer.close()
+
+    return {
+        'selected': [compiled['keys'][r] for r in np.flatnonzero(best)],
+        'cost': float(best @ cost),
+        'value': float(value),
+        'baseline': float(baseline),
+        'standalone': {key: float(v) for key, v in zip(compiled['keys'], standalone)},
+        'evaluated': evaluated,
+        'method': method,
+    }
@@ -0,0 +1,73 @@
+"""
+mitigation_test.py
+Backend tests for the mitigation portfolio optimizer (mitigation.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import copy
+
+import numpy as np
+
+from mitigation import compile_mitigations, portfolio_durations, optimize_portfolio
+from schedule_engine import compile_graph
+
+
+def test_effects_on_sampled_durations():
+    mitigations = {
+        'buffer': {'name': 'Buffer', 'task_id': 'A', 'risk': 0.5, 'cost': 10},
+        'shift': {'name': 'Shift', 'task_id': 'B', 'multiplier': 0.5, 'days': -1, 'cost': 20},
+    }
+    compiled = compile_mitigations(mitigations, ['A', 'B'], [{}, {}])
+    factors = np.array([[1.4, 0.8]])
+    durations = portfolio_durations(compiled, [10, 10], factors, np.array([[True, True], [False, False]]))
+    # Only the overrun part is scaled by the risk factor; 'shift' halves B's plan then removes a day
+    assert np.allclose(durations[0, 0], [12, 3.2]) and np.allclose(durations[1, 0], [14, 8])
+
+
+def test_pyramid_portfolio_within_budget():
+    from pyramid_model import INITIAL_NODES, MITIGATIONS, plan_mitigations, compile_nodes
+
+    rows, result = plan_mitigations(copy.deepcopy(INITIAL_NODES), 800000)
+    assert result['cost'] <= 800000 and result['value'] < result['baseline']
+    assert sum(row['Cost'] for row in rows if row['In Portfolio']) == result['cost']
+    # Off the critical chain, the engine's supplier risk does not move P80
+    assert result['standalone']['dual_source_engine'] == result['baseline']
+
+    # Local search finds the same portfolio value as scoring every affordable one
+    node_ids, graph, durations = compile_nodes(INITIAL_NODES)
+    records = [INITIAL_NODES[node_id] for node_id in node_ids]
+    exhaustive = optimize_portfolio(graph, durations, MITIGATIONS, records, 800000, exact_limit=len(MITIGATIONS))
+    assert exhaustive['method'] == 'exhaustive' and result['method'] == 'local_search'
+    assert exhaustive['value'] == result['value']
+
+    _, nothing = plan_mitigations(copy.deepcopy(INITIAL_NODES), 0)
+    assert nothing['selected'] == [] and nothing['value'] == nothing['baseline']
+
+
+def test_common_random_numbers_and_pool():
+    # Two parallel chains: only mitigating both shortens the project
+    graph = compile_graph(['A', 'B', 'C'], [[], [], ['A', 'B']])
+    mitigations = {
+        'fix_a': {'name': 'Fix A', 'task_id': 'A', 'days': -5, 'cost': 1},
+        'fix_b': {'name': 'Fix B', 'task_id': 'B', 'days': -5, 'cost': 1},
+        'gold': {'name': 'Gold Plating', 'task_id': 'C', 'days': 0, 'cost': 1},
+    }
+    records = [{}, {}, {}]
+    result = optimize_portfolio(graph, [20, 20, 5], mitigations, records, budget=3, samples=500)
+    assert result['selected'] == ['fix_a', 'fix_b']   # the useless one is left out at equal value
+    # Same samples for every portfolio: a mitigation that changes nothing scores exactly the same
+    assert result['standalone']['gold'] == result['baseline']
+
+    pooled = optimize_portfolio(graph, [20, 20, 5], mitigations, records, budget=3, samples=500, workers=2)
+    assert pooled['value'] == result['value'] and pooled['selected'] == result['selected']
+
+
+if __name__ == "__main__":
+    print("### MITIGATION OPTIMIZER BACKEND TEST ###")
+
+    test_effects_on_sampled_durations()
+    test_pyramid_portfolio_within_budget()
+    test_common_random_numbers_and_pool()
+
+    print("\nAll tests completed.")
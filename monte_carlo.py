@@ -0,0 +1,55 @@
+"""
+monte_carlo.py
+Monte Carlo schedule risk runs on the batch passes (no Streamlit).
+
+Durations are sampled for a chunk of iterations at a time, scheduled with
+forward_pass_batch / backward_pass_batch, and - when a store path is
+given - written straight to a memory-mapped ResultStore (start, finish and
+total float per node and iteration). Only the project end per iteration is
+kept in memory, so the run size is limited by disk, not RAM.
+"""
+
+import numpy as np
+
+from schedule_engine import forward_pass_batch, backward_pass_batch
+from result_store import ResultStore
+from profiling import stage, timed
+
+
+def triangular_sampler(optimistic=0.1, pessimistic=0.3):
+    """
+    Each duration is base * Triangular(1 - optimistic, 1, 1 + pessimistic):
+    most likely on plan, with a longer tail towards overruns.
+    """
+    def sample(rng, base, rows):
+        return base * rng.triangular(1 - optimistic, 1.0, 1 + pessimistic, size=(rows, len(base)))
+    return sample
+
+
+@timed('run_monte_carlo')
+def run_monte_carlo(graph, base_durations, iterations, store_path=None, chunk_rows=2000, seed=0, sampler=None):
+    """
+    Runs `iterations` sampled schedules in chunks of `chunk_rows`.
+    Returns a dict with 'end' (project end per iteration) and 'store'
+    (the ResultStore written to store_path, or None).
+    """
+    rng = np.random.default_rng(seed)
+    sampler = sampler or triangular_sampler()
+    base = np.asarray(base_durations, dtype=float)
+    store = None
+    if store_path is not None:
+        store = ResultStore.create(store_path, graph['ids'], columns=('start', 'finish', 'total_float'),
+                                   attrs={'iterations': iterations, 'seed': seed})
+
+    ends = []
+    for first in range(0, iterations, chunk_rows):
+        rows = min(chunk_rows, iterations - first)
+        durations = sampler(rng, base, rows)
+        start, finish = forward_pass_batch(graph, durations)
+        end = finish.max(axis=1)
+        ends.append(end)
+        if store is not None:
+            late_start, _ = backward_pass_batch(graph, durations, finish, end)
+            with stage('store_append'):
+                store.append(start=start, finish=finish, total_float=late_start - start)
+    return {'end': np.concatenate(ends) if ends else np.empty(0), 'store': store}
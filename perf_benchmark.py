@@ -0,0 +1,184 @@
+"""
+perf_benchmark.py
+Benchmark of the large backend cases against their time targets (no Streamlit).
+
+The unit tests check what these cases compute; this script checks how long
+they take, since wall-clock limits inside tests fail on loaded CI runners.
+Each target builds its case once, runs it once to warm up and then times
+`--repeat` runs in this process. The median is checked against a budget in
+milliseconds; the exit status is 1 if any target is over.
+
+    python perf_benchmark.py
+    python perf_benchmark.py --target "level pass 100k nodes" --repeat 20
+    python perf_benchmark.py --budget-scale 2 --output perf_output.txt
+
+See startup_benchmark.py for cold-start times.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from startup_benchmark import format_rows
+
+
+def fleet_program(n=100000, hull=200, seed=1):
+    """Fleet program: n / hull hulls, each activity waiting on earlier work of its hull."""
+    from schedule_engine import compile_graph
+
+    rng = random.Random(seed)
+    ids = [f'N{i}' for i in range(n)]
+    prereqs = []
+    for i in range(n):
+        first, k = i - i % hull, i % hull
+        prereqs.append([f'N{first + p}' for p in rng.sample(range(max(0, k - 20), k), min(k, 2))])
+    return compile_graph(ids, prereqs), np.array([rng.randint(1, 20) for _ in range(n)], dtype=float)
+
+
+def level_pass_100k():
+    from schedule_engine import compile_levels, forward_pass_levels
+
+    graph, durations = fleet_program()
+    levels = compile_levels(graph)
+    return lambda: forward_pass_levels(levels, durations)
+
+
+def attribution_2000_nodes():
+    from schedule_engine import compile_graph
+    from attribution import attribute_node_delays
+
+    rng = random.Random(9)
+    n = 2000
+    ids = [f'N{i}' for i in range(n)]
+    graph = compile_graph(ids, [[f'N{p}' for p in rng.sample(range(max(0, i - 40), i), min(i, 2))] for i in range(n)])
+    durations = [rng.randint(1, 10) for _ in range(n)]
+    delays = {i: rng.randint(1, 20) for i in rng.sample(range(n), 40)}
+    return lambda: attribute_node_delays(graph, durations, delays)
+
+
+def crashing_3000_nodes():
+    from schedule_engine import compile_graph, forward_pass
+    from crashing import solve_crashing
+
+    rng = random.Random(2)
+    n = 3000
+    ids = [f'N{i}' for i in range(n)]
+    prereqs = [[f'N{p}' for p in rng.sample(range(max(0, i - 50), i), min(i, 2))] for i in range(n)]
+    durations = [rng.randint(1, 20) for _ in range(n)]
+    graph = compile_graph(ids, prereqs)
+    end = max(forward_pass(graph, durations)[1])
+    costs = [rng.randint(1, 9) for _ in range(n)]
+    return lambda: solve_crashing(graph, durations, [d // 4 for d in durations], costs, end - 30)
+
+
+def large_schedule(n=50000, seed=4):
+    """A scheduled nodes_data-like dict of n nodes for the data table."""
+    rng = random.Random(seed)
+    nodes = {}
+    for i in range(n):
+        start = rng.randint(0, 2000)
+        nodes[f'N{i}'] = {'label': f'Node {i}', 'type': rng.choice(['Hull', 'Outfitting', 'Machinery']),
+                          'duration': 10, 'delay': rng.choice([0, 0, 0, 5]), 'start_day': start,
+                          'end_day': start + 10, 'total_float': rng.randint(0, 50)}
+    return nodes
+
+
+def data_table_build_50k():
+    from data_table import node_table
+
+    nodes = large_schedule()
+    return lambda: node_table(nodes)
+
+
+def data_table_page_50k():
+    from data_table import node_table, table_rows, table_page
+
+    table = node_table(large_schedule())
+
+    def view():
+        rows = table_rows(table, 'total_float', types=['Hull'], delay_status='Not Delayed', max_float=10)
+        return table_page(table, rows, 3, 100)
+    return view
+
+
+def normalize_30k_nodes():
+    from graph_validation import normalize_prereqs
+
+    rng = random.Random(3)
+    n = 30000
+    ids = [f'N{i}' for i in range(n)]
+    prereqs = [[f'N{p}' for p in rng.sample(range(max(0, i - 30), i), min(i, rng.randint(0, 4)))] for i in range(n)]
+    return lambda: normalize_prereqs(ids, prereqs)
+
+
+def disruptions_1m_timelines():
+    from disruptions import compile_disruptions, disruption_sampler
+    from monte_carlo import run_monte_carlo
+    from pyramid_model import INITIAL_NODES, DISRUPTIONS, compile_nodes
+
+    node_ids, graph, durations = compile_nodes(INITIAL_NODES)
+    compiled = compile_disruptions(DISRUPTIONS, graph, durations, [INITIAL_NODES[n] for n in node_ids])
+    return lambda: run_monte_carlo(graph, durations, 1_000_000, chunk_rows=50_000, sampler=disruption_sampler(compiled))
+
+
+# target -> (function building the case and returning the call to time, budget in ms)
+TARGETS = {
+    'level pass 100k nodes': (level_pass_100k, 10),
+    'attribution 40 delays 2k': (attribution_2000_nodes, 1000),
+    'crashing 3000 nodes': (crashing_3000_nodes, 2000),
+    'data table build 50k': (data_table_build_50k, 1000),
+    'data table page 50k': (data_table_page_50k, 100),
+    'normalize 30k nodes': (normalize_30k_nodes, 1000),
+    'disruptions 1M timelines': (disruptions_1m_timelines, 15000),
+}
+
+
+def measure(run, repeat=3):
+    """Wall times (ms) of `repeat` calls of run(), after one warm-up call."""
+    run()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def run_benchmark(targets=None, repeat=3, budget_scale=1.0):
+    """Rows with 'Target', 'Median (ms)', 'Min (ms)', 'Budget (ms)' and 'OK' (as startup_benchmark)."""
+    rows = []
+    for name in targets or TARGETS:
+        build, budget = TARGETS[name]
+        times = measure(build(), repeat)
+        median = statistics.median(times)
+        rows.append({'Target': name, 'Median (ms)': median, 'Min (ms)': min(times),
+                     'Budget (ms)': budget * budget_scale, 'OK': median <= budget * budget_scale})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the large Shipyard backend cases.")
+    parser.add_argument('--target', action='append', choices=list(TARGETS), metavar='NAME',
+                        help="measure only this target (repeatable)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per target")
+    parser.add_argument('--budget-scale', type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    parser.add_argument('--output', metavar='PATH', help="also write the table to this file")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    rows = run_benchmark(args.target, args.repeat, args.budget_scale)
+    text = format_rows(rows)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    return rows
+
+
+if __name__ == "__main__":
+    sys.exit(0 if all(row['OK'] for row in main()) else 1)
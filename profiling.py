@@ -0,0 +1,127 @@
+"""
+profiling.py
+Lightweight per-stage timers and counters for the simulators (no Streamlit).
+
+Code under measurement calls the module-level helpers, which are no-ops
+unless a profiler is active in the current context:
+
+    with stage('calculate_schedule'):
+        ...
+    count('nodes_visited', n)
+
+or decorate a whole function with @timed('create_gantt_chart').
+
+A run activates one with start_profiler() (each Streamlit session / thread
+gets its own, via contextvars) and reads it back for the debug panel or
+exports it as JSON or Chrome trace format (chrome://tracing, Perfetto).
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('shipyard_profiler', default=None)
+
+
+class Profiler:
+    """Collects timed stages (spans) and named counters for one run."""
+
+    def __init__(self, name='run'):
+        self.name = name
+        self.origin_ns = time.perf_counter_ns()
+        self.spans = []      # (stage, start_ns, duration_ns, depth)
+        self.counters = {}
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter_ns()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append((name, start - self.origin_ns, time.perf_counter_ns() - start, self._depth))
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def stage_totals(self):
+        """[{'Stage', 'Calls', 'Total (ms)', 'Max (ms)'}], slowest first."""
+        totals = {}
+        for name, _, duration, _ in self.spans:
+            row = totals.setdefault(name, {'Stage': name, 'Calls': 0, 'Total (ms)': 0.0, 'Max (ms)': 0.0})
+            row['Calls'] += 1
+            row['Total (ms)'] += duration / 1e6
+            row['Max (ms)'] = max(row['Max (ms)'], duration / 1e6)
+        return sorted(totals.values(), key=lambda row: -row['Total (ms)'])
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'stages': self.stage_totals(),
+            'counters': dict(self.counters),
+            'spans': [
+                {'stage': name, 'start_ms': start / 1e6, 'duration_ms': duration / 1e6, 'depth': depth}
+                for name, start, duration, depth in sorted(self.spans, key=lambda span: span[1])
+            ],
+        }
+
+    def to_chrome_trace(self):
+        """Trace Event Format: complete ('X') events plus one counter ('C') event."""
+        pid, tid = os.getpid(), threading.get_ident()
+        events = [
+            {'name': name, 'cat': self.name, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': pid, 'tid': tid}
+            for name, start, duration, _ in sorted(self.spans, key=lambda span: span[1])
+        ]
+        if self.counters:
+            end = max((start + duration for _, start, duration, _ in self.spans), default=0)
+            events.append({'name': 'counters', 'ph': 'C', 'ts': end / 1e3, 'pid': pid, 'tid': tid, 'args': dict(self.counters)})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path, fmt='json'):
+        data = self.to_chrome_trace() if fmt == 'chrome' else self.to_json()
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def start_profiler(name='run'):
+    """Activates a fresh profiler for the current context and returns it."""
+    profiler = Profiler(name)
+    _current.set(profiler)
+    return profiler
+
+
+def current_profiler():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    profiler = _current.get()
+    if profiler is None:
+        yield
+    else:
+        with profiler.stage(name):
+            yield
+
+
+def count(name, n=1):
+    profiler = _current.get()
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def timed(name):
+    """Decorator form of stage(): times every call of the wrapped function."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
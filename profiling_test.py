@@ -0,0 +1,113 @@
+"""
+profiling_test.py
+Backend tests for the per-stage timers and counters (profiling.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import contextvars
+import json
+import os
+import tempfile
+import time
+
+from profiling import start_profiler, current_profiler, stage, count, timed
+
+
+@timed('slow_step')
+def slow_step(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def in_fresh_context(func):
+    """Runs func in an empty context, so the profiler it starts does not leak into other tests."""
+    return contextvars.Context().run(func)
+
+
+def test_inactive_helpers_are_no_ops():
+    def run():
+        with stage('anything'):
+            count('things', 3)
+        assert slow_step(0) == 0
+        return current_profiler()
+    assert in_fresh_context(run) is None
+
+
+def test_stage_and_timed_totals():
+    def run():
+        profiler = start_profiler('test')
+        with stage('outer'):
+            for _ in range(3):
+                slow_step(0.01)
+            with stage('inner'):
+                count('nodes', 5)
+                count('nodes')
+        return profiler
+    profiler = in_fresh_context(run)
+
+    totals = {row['Stage']: row for row in profiler.stage_totals()}
+    assert set(totals) == {'outer', 'slow_step', 'inner'}
+    assert totals['slow_step']['Calls'] == 3 and totals['outer']['Calls'] == 1
+    assert totals['slow_step']['Total (ms)'] >= 30 and totals['slow_step']['Max (ms)'] >= 10
+    # an enclosing stage covers what runs inside it; slowest first
+    assert totals['outer']['Total (ms)'] >= totals['slow_step']['Total (ms)'] + totals['inner']['Total (ms)']
+    assert profiler.stage_totals()[0]['Stage'] == 'outer'
+    assert profiler.counters == {'nodes': 6}
+    assert {span[0]: span[3] for span in profiler.spans} == {'slow_step': 1, 'inner': 1, 'outer': 0}
+
+
+def test_chrome_trace_shape():
+    def run():
+        profiler = start_profiler('trace')
+        with stage('outer'):
+            slow_step(0.001)
+            count('runs', 2)
+        return profiler
+    profiler = in_fresh_context(run)
+
+    trace = profiler.to_chrome_trace()
+    assert trace['displayTimeUnit'] == 'ms'
+    complete = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in complete] == ['outer', 'slow_step']  # by start time
+    for event in complete:
+        assert event['cat'] == 'trace' and event['dur'] >= 0 and event['ts'] >= 0
+        assert {'pid', 'tid'} <= set(event)
+    outer, inner = complete
+    assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+    (counters,) = [event for event in trace['traceEvents'] if event['ph'] == 'C']
+    assert counters['args'] == {'runs': 2} and counters['ts'] >= inner['ts']
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trace.json')
+        profiler.write(path, fmt='chrome')
+        with open(path) as f:
+            assert json.load(f) == json.loads(json.dumps(trace))
+        path = os.path.join(directory, 'profile.json')
+        profiler.write(path)
+        with open(path) as f:
+            data = json.load(f)
+    assert data['name'] == 'trace' and data['counters'] == {'runs': 2}
+    assert [span['stage'] for span in data['spans']] == ['outer', 'slow_step']
+
+
+def test_contexts_get_their_own_profiler():
+    def run(name):
+        profiler = start_profiler(name)
+        count('calls')
+        return profiler
+    first = in_fresh_context(lambda: run('first'))
+    second = in_fresh_context(lambda: run('second'))
+    assert first is not second
+    assert first.counters == second.counters == {'calls': 1}
+
+
+if __name__ == "__main__":
+    print("### PROFILING BACKEND TEST ###")
+
+    test_inactive_helpers_are_no_ops()
+    test_stage_and_timed_totals()
+    test_chrome_trace_shape()
+    test_contexts_get_their_own_profiler()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,112 @@
+"""
+progress.py
+Progress tracking and rolling re-forecast from a status date (no Streamlit).
+
+A plan is no longer only "from day 0": once work has started, some dates
+are facts. ProgressTracker keeps, per node, the actual start, actual finish
+and percent complete, and forecasts the remaining work from the status date:
+
+  finished      start/finish are the actuals
+  in progress   start is the actual; the remaining share of the duration
+                runs from the status date (or the actual start, if later)
+  not started   scheduled from its prerequisites, never before the status date
+
+Progress events (e.g. the daily MES feed) are applied in bulk: the touched
+nodes are re-pinned and the schedule is re-propagated from them only
+(update_schedule), so thousands of events update a large plan in a
+fraction of a second. Dates are in the plan's own unit (days or weeks).
+"""
+
+from schedule_engine import forward_pass, backward_pass, update_schedule
+from profiling import count, timed
+
+
+class ProgressTracker:
+    """Actuals, percent complete and the forecast schedule for one plan."""
+
+    def __init__(self, graph, durations, status_date=0):
+        self.graph = graph
+        self.durations = list(durations)
+        self.status_date = status_date
+        self.actual_start = {}
+        self.actual_finish = {}
+        self.percent_complete = {}
+        self.fixed = {}
+        self.start, self.finish = forward_pass(graph, self.durations, status_date)
+
+    def _pin(self, j):
+        """Fixed dates for node j from its actuals (or none if it has not started)."""
+        if j in self.actual_finish:
+            finish = self.actual_finish[j]
+            self.fixed[j] = (self.actual_start.get(j, finish - self.durations[j]), finish)
+        elif j in self.actual_start:
+            remaining = self.durations[j] * (1 - self.percent_complete.get(j, 0) / 100)
+            self.fixed[j] = (self.actual_start[j], max(self.status_date, self.actual_start[j]) + remaining)
+        else:
+            self.fixed.pop(j, None)
+
+    @timed('apply_progress_events')
+    def apply_events(self, events):
+        """
+        Applies progress events in one go and re-forecasts from the touched
+        nodes. Each event is a dict with 'node' (node id) and any of
+        'actual_start', 'actual_finish', 'percent_complete' (0-100).
+        Percent complete without an actual start marks the node started
+        at its forecast start (or the status date, if earlier); 100% without
+        an actual finish marks it finished on the status date.
+        Returns the indices of nodes whose forecast dates moved.
+        """
+        index = self.graph['index']
+        touched = set()
+        for event in events:
+            node_id = event['node']
+            if node_id not in index:
+                raise ValueError(f"Unknown node '{node_id}' in progress event")
+            j = index[node_id]
+            if event.get('actual_start') is not None:
+                self.actual_start[j] = event['actual_start']
+            if event.get('actual_finish') is not None:
+                self.actual_finish[j] = event['actual_finish']
+            if event.get('percent_complete') is not None:
+                percent = min(max(event['percent_complete'], 0), 100)
+                self.percent_complete[j] = percent
+                if percent > 0 and j not in self.actual_start:
+                    self.actual_start[j] = min(self.start[j], self.status_date)
+                if percent >= 100 and j not in self.actual_finish:
+                    self.actual_finish[j] = max(self.status_date, self.actual_start[j])
+            touched.add(j)
+        for j in touched:
+            self._pin(j)
+        count('progress_events', len(events))
+        return update_schedule(self.graph, self.durations, self.start, self.finish, touched, self.status_date, self.fixed)
+
+    def set_status_date(self, status_date):
+        """Moves the status date and re-forecasts all unfinished work."""
+        self.status_date = status_date
+        open_nodes = [j for j in range(len(self.durations)) if j not in self.actual_finish]
+        for j in open_nodes:
+            self._pin(j)
+        return update_schedule(self.graph, self.durations, self.start, self.finish, open_nodes, status_date, self.fixed)
+
+    def status(self, j):
+        if j in self.actual_finish:
+            return 'Finished'
+        if j in self.actual_start:
+            return 'In Progress'
+        return 'Not Started'
+
+    def forecast(self):
+        """
+        Current forecast as a dict of lists in node order ('start', 'finish',
+        'late_start', 'late_finish') plus the forecast 'end'. Late dates use
+        the pinned nodes' actual spans; finished work cannot move, so its
+        late dates are its actual dates (no float).
+        """
+        durations = list(self.durations)
+        for j, (start, finish) in self.fixed.items():
+            durations[j] = finish - start
+        late_start, late_finish = backward_pass(self.graph, durations, self.finish)
+        for j in self.actual_finish:
+            late_start[j], late_finish[j] = self.start[j], self.finish[j]
+        return {'start': list(self.start), 'finish': list(self.finish), 'late_start': late_start,
+                'late_finish': late_finish, 'end': max(self.finish, default=self.status_date)}
@@ -0,0 +1,491 @@
+"""
+pyramid_model.py
+Data model and calculations for the Shipyard Pyramid Simulator (no Streamlit).
+Shared by the Streamlit app (shipyard_simulator_2.py) and the headless runner.
+"""
+
+from collections import deque
+
+from schedule_engine import compile_graph, forward_pass, backward_pass, delay_response, prereq_ids
+from crashing import solve_crashing
+from attribution import attribute_node_delays
+from mitigation import optimize_portfolio
+from hierarchy import compile_hierarchy
+from monte_carlo import triangular_sampler
+from profiling import stage, timed
+from startup_cache import lazy_import
+
+go = lazy_import('plotly.graph_objects')  # only needed to draw the pyramid
+
+LAYOUT_VERSION = 1  # bump when get_pyramid_layout's placement changes, to rebuild cached layouts
+
+# --- DATA MODEL: THE AGENTS ---
+INITIAL_NODES = {
+    # --- LEVEL 1: PROCUREMENT & SUPPLIERS (BASE OF PYRAMID) ---
+    'Pur_Weld_Eq': {'label': 'Welding Eq. Supplier', 'duration': 30, 'type': 'Procurement'},
+    'Pur_Profiles': {'label': 'Steel Profiles Supplier', 'duration': 30, 'type': 'Procurement'},
+    'Pur_Plates': {'label': 'Steel Plates Supplier', 'duration': 30, 'type': 'Procurement'},
+    'Pur_Pumps': {'label': 'Pump Supplier', 'duration': 180, 'type': 'Procurement'}, # 6 months
+    'Pur_Oil': {'label': 'Oil Supplier', 'duration': 30, 'type': 'Procurement'},
+    'Pur_FuelTanks': {'label': 'Fuel Tank Supplier', 'duration': 120, 'type': 'Procurement'}, # 4 months
+    'Pur_Engine': {'label': 'Diesel Engine Supplier', 'duration': 240, 'type': 'Procurement'}, # 8 months
+    'Pur_Gens': {'label': 'Aux Generator Supplier', 'duration': 300, 'type': 'Procurement'}, # 10 months
+    'Pur_Furniture': {'label': 'Furniture Supplier', 'duration': 300, 'type': 'Procurement'}, # 10 months
+
+    # --- LEVEL 2: PREPARATION & SUB-ASSEMBLY ---
+    'Steel_Prep': {'label': 'Steel Preparation', 'duration': 120, 'type': 'Construction', 'prereqs': ['Pur_Weld_Eq', 'Pur_Profiles', 'Pur_Plates']},
+    'Engine_Prep': {'label': 'Engine Room Prep', 'duration': 21, 'type': 'Outfitting', 'prereqs': ['Pur_Engine']}, # 3 weeks
+
+    # --- LEVEL 3: ASSEMBLY & INSTALLATION ---
+    'Panel_Assy': {'label': 'Panel Assembly', 'duration': 180, 'type': 'Construction', 'prereqs': ['Steel_Prep']},
+    'Mount_Engine': {'label': 'Mounting Engine', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Engine_Prep']},
+    'Shaft_Install': {'label': 'Shaft Installation', 'duration': 21, 'type': 'Outfitting', 'prereqs': ['Engine_Prep']},
+    
+    # --- LEVEL 4: BLOCK STAGES ---
+    'Block_Assy': {'label': 'Block Assembly', 'duration': 180, 'type': 'Construction', 'prereqs': ['Panel_Assy']},
+    'Fuel_Sys': {'label': 'Fuel System Install', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Pur_Pumps', 'Pur_Oil', 'Pur_FuelTanks']},
+    'Aux_Mach': {'label': 'Aux Machinery Install', 'duration': 21, 'type': 'Outfitting', 'prereqs': ['Pur_Gens', 'Shaft_Install']},
+
+    # --- LEVEL 5: INTEGRATION ---
+    'Block_Out': {'label': 'Block Outfitting', 'duration': 270, 'type': 'Construction', 'prereqs': ['Block_Assy']},
+    'Piping': {'label': 'Piping Installation', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Mount_Engine', 'Fuel_Sys']}, # 4 weeks
+    
+    # --- LEVEL 6: ERECTION & CABLING ---
+    'Dock_Erect': {'label': 'Dockyard Erection', 'duration': 135, 'type': 'Construction', 'prereqs': ['Block_Out']},
+    'Elec_Cable': {'label': 'Electrical Cabling', 'duration': 42, 'type': 'Outfitting', 'prereqs': ['Piping']}, # 6 weeks
+    
+    # --- LEVEL 7: HULL COMPLETION & VENTILATION ---
+    'Hull_Comp': {'label': 'Hull Completion', 'duration': 60, 'type': 'Construction', 'prereqs': ['Dock_Erect']},
+    'Ventilation': {'label': 'Ventilation Systems', 'duration': 30, 'type': 'Outfitting', 'prereqs': ['Elec_Cable']},
+
+    # --- LEVEL 8: INSULATION & OUTFITTING ---
+    'Outfitting_Hull': {'label': 'General Outfitting', 'duration': 14, 'type': 'Construction', 'prereqs': ['Hull_Comp']},
+    'Insulation': {'label': 'Insulation/Fireproofing', 'duration': 30, 'type': 'Outfitting', 'prereqs': ['Ventilation']},
+
+    # --- LEVEL 9: INTERIOR ---
+    'Interior_Str': {'label': 'Interior Structure', 'duration': 30, 'type': 'Outfitting', 'prereqs': ['Insulation', 'Pur_Furniture', 'Outfitting_Hull']}, # Merges Hull and Outfitting streams
+    
+    # --- LEVEL 10: FITTINGS ---
+    'Fittings': {'label': 'Fittings & Furniture', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Interior_Str']},
+    
+    # --- LEVEL 11: PAINTING ---
+    'Painting': {'label': 'Painting', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Fittings']},
+
+    # --- LEVEL 12: TESTING (START OF FINAL STAGE) ---
+    'Stage4_Start': {'label': 'Ready for Testing', 'duration': 0, 'type': 'Milestone', 'prereqs': ['Painting']},
+    'Sys_Check': {'label': 'System Check', 'duration': 21, 'type': 'Testing', 'prereqs': ['Stage4_Start']},
+    'Final_Clean': {'label': 'Final Cleaning', 'duration': 30, 'type': 'Testing', 'prereqs': ['Stage4_Start']},
+
+    # --- LEVEL 13: TRIALS ---
+    'Harbour_Trials': {'label': 'Harbour Trials', 'duration': 14, 'type': 'Testing', 'prereqs': ['Sys_Check', 'Final_Clean']}, # 2 weeks (implied)
+    
+    # --- LEVEL 14: SEA TRIALS ---
+    'Sea_Trials': {'label': 'Sea Trials', 'duration': 14, 'type': 'Testing', 'prereqs': ['Harbour_Trials']},
+    
+    # --- LEVEL 15: PERFORMANCE ---
+    'Perf_Test': {'label': 'Performance Testing', 'duration': 14, 'type': 'Testing', 'prereqs': ['Sea_Trials']},
+    
+    # --- LEVEL 16: CERTIFICATION ---
+    'Cert': {'label': 'Certification', 'duration': 14, 'type': 'Testing', 'prereqs': ['Perf_Test']},
+    
+    # --- LEVEL 17: INSPECTION ---
+    'Final_Insp': {'label': 'Final Inspection', 'duration': 5, 'type': 'Testing', 'prereqs': ['Cert']},
+    
+    # --- LEVEL 18: DELIVERY (PEAK OF PYRAMID) ---
+    'Delivery': {'label': '🚢 DELIVERY', 'duration': 5, 'type': 'Delivery', 'prereqs': ['Final_Insp']},
+}
+
+# --- EXPEDITING (CRASHING) PARAMETERS ---
+# How far each agent type can be shortened (fraction of its planned duration)
+# and what one day of expediting costs. A node can override these with
+# 'crash_days' and 'crash_cost'.
+CRASH_DEFAULTS = {
+    'Procurement': {'max_fraction': 0.15, 'cost_per_day': 4000},   # air freight, supplier overtime
+    'Construction': {'max_fraction': 0.20, 'cost_per_day': 2500},  # extra shifts
+    'Outfitting': {'max_fraction': 0.25, 'cost_per_day': 1800},    # subcontracted crews
+    'Testing': {'max_fraction': 0.10, 'cost_per_day': 3000},
+    'Milestone': {'max_fraction': 0.0, 'cost_per_day': 0},
+    'Delivery': {'max_fraction': 0.0, 'cost_per_day': 0},
+}
+
+# --- MITIGATIONS (RISK RESPONSES) ---
+# Responses that can be bought up front (see mitigation.py): 'risk' scales
+# the overrun tail of the agents hit, 'days' / 'multiplier' change the plan.
+# Costs in the same currency as CRASH_DEFAULTS.
+MITIGATIONS = {
+    'dual_source_engine': {'name': 'Dual-Source Diesel Engine', 'task_id': 'Pur_Engine', 'risk': 0.4, 'cost': 180000},
+    'early_pump_order': {'name': 'Early Pump Order', 'task_id': 'Pur_Pumps', 'days': -30, 'cost': 60000},
+    'steel_safety_stock': {'name': 'Steel Safety Stock', 'match': r'^Pur_(Plates|Profiles)$', 'risk': 0.3, 'days': -10, 'cost': 90000},
+    'second_shift_panels': {'name': 'Second Shift: Panel Assembly', 'task_id': 'Panel_Assy', 'multiplier': 0.85, 'cost': 450000},
+    'second_shift_blocks': {'name': 'Second Shift: Block Assembly', 'task_id': 'Block_Assy', 'multiplier': 0.85, 'cost': 450000},
+    'outfitting_subcontract': {'name': 'Subcontract Block Outfitting', 'task_id': 'Block_Out', 'multiplier': 0.9, 'risk': 0.7, 'cost': 380000},
+    'reserve_dock_slot': {'name': 'Reserve Dock Slot', 'task_id': 'Dock_Erect', 'risk': 0.5, 'cost': 150000},
+    'furniture_second_supplier': {'name': 'Second Furniture Supplier', 'task_id': 'Pur_Furniture', 'risk': 0.5, 'cost': 70000},
+    'trial_slots_booked': {'name': 'Pre-Booked Trial Slots', 'type': 'Testing', 'risk': 0.6, 'cost': 120000},
+}
+
+# --- DISRUPTIONS (SUPPLIER RISK PROCESSES) ---
+# Sampled over time in the risk run (see disruptions.py) instead of fired
+# by hand; rates per day, impacts in days.
+DISRUPTIONS = {
+    'supplier_strikes': {'name': 'Supplier Strikes', 'process': 'poisson', 'match': r'^Pur_', 'rate': 1 / 1000, 'impact': [3, 7, 21]},
+    'steel_region_shutdown': {'name': 'Regional Steel Shutdown', 'process': 'shutdown', 'task_id': ['Pur_Plates', 'Pur_Profiles', 'Pur_Weld_Eq'],
+                              'rate': 1 / 1000, 'impact': [7, 14, 42]},
+    'stock_outs': {'name': 'Stock Out', 'process': 'reject', 'match': r'^Pur_', 'probability': 0.08, 'impact': 14},
+    'material_rejects': {'name': 'Material Rejected at Inspection', 'process': 'reject', 'type': 'Procurement', 'probability': 0.03, 'impact': 42},
+    'engine_plant_breakdown': {'name': 'Engine Plant Breakdown', 'process': 'reject', 'task_id': 'Pur_Engine', 'probability': 0.05, 'impact': 60},
+}
+
+# --- HIERARCHY (SUMMARY VIEW) ---
+# Zones split into Systems / Blocks (see hierarchy.py); agents not listed,
+# like Delivery, stay at the top level.
+GROUPS = {
+    'Zone_Supply': {'label': 'Supply', 'level': 'Zone'},
+    'Sys_Steel_Supply': {'label': 'Steel Supply', 'level': 'System', 'parent': 'Zone_Supply'},
+    'Sys_Machinery_Supply': {'label': 'Machinery Supply', 'level': 'System', 'parent': 'Zone_Supply'},
+    'Zone_Hull': {'label': 'Hull', 'level': 'Zone'},
+    'Blk_Hull_Blocks': {'label': 'Hull Blocks', 'level': 'Block', 'parent': 'Zone_Hull'},
+    'Blk_Erection': {'label': 'Erection', 'level': 'Block', 'parent': 'Zone_Hull'},
+    'Zone_Machinery': {'label': 'Machinery & Systems', 'level': 'Zone'},
+    'Sys_Propulsion': {'label': 'Propulsion', 'level': 'System', 'parent': 'Zone_Machinery'},
+    'Sys_Fuel_Piping': {'label': 'Fuel & Piping', 'level': 'System', 'parent': 'Zone_Machinery'},
+    'Sys_Electrical_HVAC': {'label': 'Electrical & HVAC', 'level': 'System', 'parent': 'Zone_Machinery'},
+    'Zone_Accommodation': {'label': 'Accommodation', 'level': 'Zone'},
+    'Zone_Commissioning': {'label': 'Commissioning', 'level': 'Zone'},
+}
+
+NODE_GROUPS = {
+    **{node_id: 'Sys_Steel_Supply' for node_id in ['Pur_Weld_Eq', 'Pur_Profiles', 'Pur_Plates']},
+    **{node_id: 'Sys_Machinery_Supply' for node_id in ['Pur_Pumps', 'Pur_Oil', 'Pur_FuelTanks', 'Pur_Engine', 'Pur_Gens']},
+    'Pur_Furniture': 'Zone_Supply',
+    **{node_id: 'Blk_Hull_Blocks' for node_id in ['Steel_Prep', 'Panel_Assy', 'Block_Assy', 'Block_Out']},
+    **{node_id: 'Blk_Erection' for node_id in ['Dock_Erect', 'Hull_Comp', 'Outfitting_Hull']},
+    **{node_id: 'Sys_Propulsion' for node_id in ['Engine_Prep', 'Mount_Engine', 'Shaft_Install', 'Aux_Mach']},
+    **{node_id: 'Sys_Fuel_Piping' for node_id in ['Fuel_Sys', 'Piping']},
+    **{node_id: 'Sys_Electrical_HVAC' for node_id in ['Elec_Cable', 'Ventilation']},
+    **{node_id: 'Zone_Accommodation' for node_id in ['Insulation', 'Interior_Str', 'Fittings', 'Painting']},
+    **{node_id: 'Zone_Commissioning' for node_id in ['Stage4_Start', 'Sys_Check', 'Final_Clean', 'Harbour_Trials',
+                                                     'Sea_Trials', 'Perf_Test', 'Cert', 'Final_Insp']},
+}
+
+# --- HELPER FUNCTIONS ---
+
+def compile_nodes(nodes_data):
+    """
+    (node ids, compiled dependency graph, durations including added delays)
+    for the schedule engine, in node order.
+    """
+    node_ids = list(nodes_data)
+    graph = compile_graph(node_ids, [nodes_data[nid].get('prereqs', []) for nid in node_ids])
+    durations = [nodes_data[nid]['duration'] + nodes_data[nid].get('delay', 0) for nid in node_ids]
+    return node_ids, graph, durations
+
+@timed('calculate_schedule')
+def calculate_schedule(nodes_data):
+    """
+    Topological sort calculation to determine start/end dates for all agents.
+    Prereqs can be plain IDs (finish-to-start) or typed links with a lag,
+    e.g. {'id': 'Block_Assy', 'type': 'SS', 'lag': 21}.
+    Also fills in late dates and total float from the backward pass.
+    """
+    node_ids, graph, durations = compile_nodes(nodes_data)
+
+    start, finish = forward_pass(graph, durations)
+    late_start, late_finish = backward_pass(graph, durations, finish)
+
+    return apply_schedule(nodes_data, {'start': start, 'finish': finish, 'late_start': late_start, 'late_finish': late_finish})
+
+def apply_schedule(nodes_data, schedule):
+    """
+    Writes a schedule (lists of 'start', 'finish', 'late_start', 'late_finish'
+    in node order) into the node dicts, e.g. one returned by the simulation service.
+    """
+    for i, node in enumerate(nodes_data.values()):
+        node['start_day'] = schedule['start'][i]
+        node['end_day'] = schedule['finish'][i]
+        node['late_start'] = schedule['late_start'][i]
+        node['late_end'] = schedule['late_finish'][i]
+        node['total_float'] = schedule['late_start'][i] - schedule['start'][i]
+    return nodes_data
+
+def attribute_delivery_slip(nodes_data):
+    """
+    How many of the Delivery slip days each delayed agent is responsible
+    for (Shapley shares, so overlapping delays on parallel paths are split
+    fairly and the shares add up to the slip). Rows sorted by share.
+    """
+    node_ids, graph, _ = compile_nodes(nodes_data)
+    base = [nodes_data[nid]['duration'] for nid in node_ids]
+    delays = {i: nodes_data[nid]['delay'] for i, nid in enumerate(node_ids) if nodes_data[nid].get('delay', 0)}
+    result = attribute_node_delays(graph, base, delays)
+
+    rows = [
+        {
+            'Agent': nodes_data[node_ids[i]]['label'],
+            'Added Delay': delays[i],
+            'Days If Alone': round(float(alone), 1),
+            'Share of Slip (Days)': round(float(share), 1),
+            'Share (%)': round(100 * float(share) / result['slip'], 1) if result['slip'] else 0.0,
+        }
+        for i, alone, share in zip(result['sources'], result['standalone'], result['contribution'])
+    ]
+    rows.sort(key=lambda row: -row['Share of Slip (Days)'])
+    return rows
+
+def plan_recovery(nodes_data, target_end):
+    """
+    Cheapest expediting plan that brings Delivery back to target_end.
+    Returns (rows for a table, solver result); rows are sorted by cost.
+    """
+    node_ids, graph, durations = compile_nodes(nodes_data)
+
+    crash_limits = []
+    crash_costs = []
+    for node_id in node_ids:
+        node = nodes_data[node_id]
+        defaults = CRASH_DEFAULTS.get(node['type'], {'max_fraction': 0.0, 'cost_per_day': 0})
+        crash_limits.append(node.get('crash_days', int(node['duration'] * defaults['max_fraction'])))
+        crash_costs.append(node.get('crash_cost', defaults['cost_per_day']))
+
+    result = solve_crashing(graph, durations, crash_limits, crash_costs, target_end)
+    rows = [
+        {
+            'Agent': nodes_data[node_ids[i]]['label'],
+            'Days Expedited': days,
+            'Of Max': crash_limits[i],
+            'Cost / Day': crash_costs[i],
+            'Cost': days * crash_costs[i],
+        }
+        for i, days in result['crash'].items()
+    ]
+    rows.sort(key=lambda row: -row['Cost'])
+    return rows, result
+
+def plan_mitigations(nodes_data, budget, overrun_tail=0.3, samples=1000, workers=1):
+    """
+    Best MITIGATIONS portfolio within budget for the P80 delivery day.
+    Returns (rows for a table, optimizer result); rows are sorted by cost.
+    """
+    node_ids, graph, durations = compile_nodes(nodes_data)
+    result = optimize_portfolio(graph, durations, MITIGATIONS, [nodes_data[nid] for nid in node_ids], budget,
+                                samples=samples, sampler=triangular_sampler(0.1, overrun_tail), workers=workers)
+    rows = [
+        {
+            'Mitigation': mitigation['name'],
+            'Cost': mitigation['cost'],
+            'P80 Gain Alone (Days)': round(result['baseline'] - result['standalone'][key], 1),
+            'In Portfolio': key in result['selected'],
+        }
+        for key, mitigation in MITIGATIONS.items()
+    ]
+    rows.sort(key=lambda row: (not row['In Portfolio'], -row['Cost']))
+    return rows, result
+
+def delay_impact(nodes_data, node_id, max_delay=120, target='Delivery'):
+    """
+    Target's end day for every added delay 0..max_delay on node_id (the other
+    agents' delays as they are), from one pass over the agent's downstream
+    agents instead of a reschedule per value. nodes_data must be scheduled
+    (calculate_schedule / apply_schedule).
+    Returns a dict with 'delays', 'end_days', 'break_even' (delay absorbed
+    before the target moves; None if it never does) and 'total_float'.
+    """
+    node_ids, graph, durations = compile_nodes(nodes_data)
+    index = graph['index']
+    durations[index[node_id]] = nodes_data[node_id]['duration']
+    start = [nodes_data[nid]['start_day'] for nid in node_ids]
+    finish = [nodes_data[nid]['end_day'] for nid in node_ids]
+
+    terms = delay_response(graph, durations, start, finish, index[node_id], index[target])
+    delays = list(range(max_delay + 1))
+    end_days = [max(offset + slope * d for slope, offset in terms.items()) for d in delays]
+    return {
+        'delays': delays,
+        'end_days': end_days,
+        'break_even': end_days[0] - terms[1] if 1 in terms else None,
+        'total_float': nodes_data[node_id]['total_float'],
+    }
+
+def compile_pyramid_hierarchy(nodes_data):
+    """GROUPS / NODE_GROUPS compiled for nodes_data (hierarchy.compile_hierarchy)."""
+    return compile_hierarchy(list(nodes_data), GROUPS, {k: v for k, v in NODE_GROUPS.items() if k in nodes_data})
+
+@timed('get_pyramid_layout')
+def get_pyramid_layout(nodes_data):
+    """
+    Calculates X, Y coordinates to enforce a Pyramid shape.
+    """
+    # Level = links from the node down to Delivery (one breadth-first search
+    # backwards from Delivery); nodes that never reach it sit at level 0
+    distance = {'Delivery': 0} if 'Delivery' in nodes_data else {}
+    queue = deque(distance)
+    while queue:
+        node_id = queue.popleft()
+        for pr in prereq_ids(nodes_data[node_id].get('prereqs')):
+            if pr not in distance:
+                distance[pr] = distance[node_id] + 1
+                queue.append(pr)
+    levels = {node_id: distance.get(node_id, 0) for node_id in nodes_data}
+    max_level = max(levels.values(), default=0)
+
+    nodes_by_level = {}
+    for node, level in levels.items():
+        if level not in nodes_by_level:
+            nodes_by_level[level] = []
+        nodes_by_level[level].append(node)
+        
+    pos = {}
+    for level, level_nodes in nodes_by_level.items():
+        level_nodes.sort() 
+        count = len(level_nodes)
+        y = max_level - level
+        for i, node_id in enumerate(level_nodes):
+            x = i - (count - 1) / 2
+            x *= 2.0 
+            pos[node_id] = (x, y)
+            
+    return pos
+
+@timed('build_pyramid_figure')
+def build_pyramid_figure(calculated_nodes, baseline_nodes, pos, selected_agent_id):
+    """
+    Builds the clickable pyramid figure.
+    Returns (fig, ordered_node_ids); the node order maps click indices back to IDs.
+    """
+    # Create Plotly traces
+    edge_x = []
+    edge_y = []
+    with stage('pyramid_edge_traces'):
+        for node_id, node in calculated_nodes.items():
+            for pr in prereq_ids(node.get('prereqs')):
+                x0, y0 = pos[pr]
+                x1, y1 = pos[node_id]
+                edge_x.extend([x0, x1, None])
+                edge_y.extend([y0, y1, None])
+
+    # Node data preparation for Plotly
+    ordered_node_ids = list(pos.keys()) # Keep order for click mapping
+    node_x = []
+    node_y = []
+    node_text = []
+    node_color = []
+    node_size = []
+    node_symbol = []
+
+    with stage('pyramid_node_traces'):
+        for node_id in ordered_node_ids:
+            x, y = pos[node_id]
+            node = calculated_nodes[node_id]
+    
+            base_end_day = baseline_nodes[node_id]['end_day']
+            actual_end_day = node['end_day']
+    
+            is_delayed_impact = actual_end_day > base_end_day
+            added_delay = node.get('delay', 0)
+    
+            node_x.append(x)
+            node_y.append(y)
+    
+            if node.get('group'):
+                # a collapsed summary group (hierarchy.summary_nodes)
+                info = (f"<b>{node['label']}</b> - {node['level']}<br>"
+                        f"Day {node['start_day']} to {actual_end_day} (Plan end: {base_end_day})<br>"
+                        f"Total Float: {node['total_float']} days<br>"
+                        f"Click to expand")
+            else:
+                info = (f"<b>{node['label']}</b><br>"
+                        f"End: Day {actual_end_day} (Plan: {base_end_day})<br>"
+                        f"Direct Delay Added: {added_delay} days")
+            node_text.append(info)
+            node_symbol.append('square' if node.get('group') else 'circle')
+    
+            # Color logic
+            if node_id == selected_agent_id:
+                node_color.append('#FFFF00') # Yellow for selected
+                node_size.append(30) # Bigger for selected
+            elif is_delayed_impact:
+                node_color.append('#FF4B4B') # Red for delayed
+                node_size.append(20)
+            elif node['type'] == 'Delivery':
+                node_color.append('#00FF00') # Green for Delivery
+                node_size.append(30)
+            elif node['type'] == 'Procurement':
+                node_color.append('#1f77b4') # Blue for Procurement
+                node_size.append(15)
+            elif node.get('group'):
+                node_color.append('#9467bd') # Purple for collapsed groups
+                node_size.append(22)
+            else:
+                node_color.append('#DDDDDD') # Grey for others
+                node_size.append(15)
+
+    # Draw Figure
+    fig = go.Figure()
+
+    # Edges (Lines)
+    fig.add_trace(go.Scatter(
+        x=edge_x, y=edge_y,
+        line=dict(width=1, color='#888'),
+        hoverinfo='none',
+        mode='lines'
+    ))
+
+    # Nodes (Dots)
+    fig.add_trace(go.Scatter(
+        x=node_x, y=node_y,
+        mode='markers+text',
+        text=[calculated_nodes[nid]['label'] for nid in ordered_node_ids],
+        textposition="top center",
+        hoverinfo='text',
+        hovertext=node_text,
+        marker=dict(
+            showscale=False,
+            color=node_color,
+            size=node_size,
+            symbol=node_symbol,
+            line_width=2
+        )
+    ))
+
+    fig.update_layout(
+        title="Construction Pyramid (Click a node to Edit)",
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=0,l=0,r=0,t=40),
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        height=700,
+        plot_bgcolor='rgba(0,0,0,0)',
+        clickmode='event+select' # Enable clicking
+    )
+
+    return fig, ordered_node_ids
+
+def build_delay_impact_figure(impact, current_delay=0):
+    """Small line chart of a delay_impact curve, marking the break-even and the current delay."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=impact['delays'], y=impact['end_days'],
+        mode='lines',
+        line=dict(width=2, color='#FF4B4B'),
+        hovertemplate="+%{x} days → Day %{y}<extra></extra>"
+    ))
+    break_even = impact['break_even']
+    if break_even is not None and break_even <= impact['delays'][-1]:
+        fig.add_vline(x=break_even, line_dash='dash', line_color='#888')
+    if 0 <= current_delay <= impact['delays'][-1]:
+        fig.add_trace(go.Scatter(
+            x=[current_delay], y=[impact['end_days'][current_delay]],
+            mode='markers',
+            marker=dict(color='#FFFF00', size=10, line_width=1),
+            hoverinfo='skip'
+        ))
+
+    fig.update_layout(
+        showlegend=False,
+        margin=dict(b=0,l=0,r=0,t=10),
+        xaxis=dict(title="Added Delay (Days)"),
+        yaxis=dict(title="Delivery Day"),
+        height=220,
+    )
+    return fig
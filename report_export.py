@@ -0,0 +1,273 @@
+"""
+report_export.py
+Headless report export: the pyramid, Gantt and Sankey figures of stored
+schedules written as HTML (and PNG / PDF when kaleido is installed) in
+batch, without a browser session (no Streamlit).
+
+A report spec is one stored schedule (a JSON list or JSON lines file):
+
+    {"name": "hull_412", "model": "pyramid", "delays": {"Fuel_Sys": 30}}
+    {"name": "weekly", "model": "supply", "scenarios": ["design_flaw"], "start_date": "2025-01-06"}
+
+Pyramid specs may carry their own "nodes" and supply specs their own
+"tasks" (same formats as INITIAL_NODES / BASELINE_TASKS); otherwise the
+built-in project is used. "start_date" pins the Gantt dates (otherwise
+they count from today, so the Gantt figures change daily). Each report goes to <out>/<name>/<figure>.<fmt>;
+HTML pages share one plotly.min.js in <out>, so the pack works offline.
+
+Reports are spread over a process pool. Plans are cheap to recompute, the
+figures (and above all image export) are not, so every figure is keyed by a
+hash of exactly the data it is drawn from. manifest.json in <out> records
+those hashes, and a figure whose hash and files are unchanged since the
+last run is skipped. Layouts depend only on the network, so each worker
+computes one per network and reuses it for every report on it.
+
+    python report_export.py reports.jsonl --out reports --format html --format png --workers 8
+"""
+
+import argparse
+import copy
+import importlib.util
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from scenario_cache import scenario_key
+from profiling import count, timed
+
+FIGURE_VERSION = 1  # bump when a figure's look changes, to re-export everything
+FORMATS = ('html', 'png', 'pdf')
+IMAGE_FORMATS = ('png', 'pdf')
+MANIFEST = 'manifest.json'
+PLOTLY_JS = 'plotly.min.js'
+
+_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+_LAYOUTS = {}  # per process: network hash -> layout
+
+
+def image_export_available():
+    """True if plotly can write PNG / PDF (needs the kaleido package)."""
+    return importlib.util.find_spec('kaleido') is not None
+
+
+def load_specs(path):
+    """Report specs from a JSON list or a JSON lines file."""
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _cached_layout(key, build):
+    if key not in _LAYOUTS:
+        _LAYOUTS[key] = build()
+    else:
+        count('layout_cache_hits')
+    return _LAYOUTS[key]
+
+
+def pyramid_figures(spec):
+    """
+    Schedules a pyramid spec. Returns (figures, summary): figures maps a
+    figure name to (input hash, function building the figure).
+    """
+    from pyramid_model import INITIAL_NODES, calculate_schedule, get_pyramid_layout, build_pyramid_figure
+
+    nodes = copy.deepcopy(spec.get('nodes') or INITIAL_NODES)
+    baseline_nodes = copy.deepcopy(nodes)
+    for node in baseline_nodes.values():
+        node['delay'] = 0
+    for node_id, days in (spec.get('delays') or {}).items():
+        if node_id not in nodes:
+            raise ValueError(f"Unknown node '{node_id}'")
+        if not isinstance(days, int) or isinstance(days, bool):
+            raise ValueError(f"Delay for '{node_id}' must be a whole number of days, not {days!r}")
+        nodes[node_id]['delay'] = days
+
+    calculated_nodes = calculate_schedule(nodes)
+    baseline_nodes = calculate_schedule(baseline_nodes)
+    selected = spec.get('selected', 'Delivery')
+    network = scenario_key('pyramid', {node_id: node.get('prereqs', []) for node_id, node in nodes.items()})
+
+    def pyramid():
+        pos = _cached_layout(network, lambda: get_pyramid_layout(calculated_nodes))
+        return build_pyramid_figure(calculated_nodes, baseline_nodes, pos, selected)[0]
+
+    end = max(node['end_day'] for node in calculated_nodes.values())
+    baseline_end = max(node['end_day'] for node in baseline_nodes.values())
+    figures = {'pyramid': (scenario_key(FIGURE_VERSION, 'pyramid', calculated_nodes, baseline_nodes, selected), pyramid)}
+    return figures, {'end': end, 'baseline_end': baseline_end}
+
+
+def supply_figures(spec):
+    """Schedules a supply-chain spec; same return value as pyramid_figures."""
+    from supply_chain_model import (BASELINE_TASKS, DELAY_DEFINITIONS, calculate_simulated_plan, create_gantt_chart,
+                                    create_sankey_chart)
+    from graph_layout import sankey_layout
+
+    for key in spec.get('scenarios', []):
+        if key not in DELAY_DEFINITIONS:
+            raise ValueError(f"Unknown scenario '{key}'")
+    tasks = spec.get('tasks') or BASELINE_TASKS
+    start_date = date.fromisoformat(spec['start_date']) if spec.get('start_date') else None
+    inputs = {key: True for key in spec.get('scenarios', [])}
+    baseline_plan, _, baseline_end = calculate_simulated_plan(tasks, {}, start_date)
+    simulated_plan, _, end = calculate_simulated_plan(tasks, inputs, start_date)
+
+    # in spec order: simulated_plan's order changes with the scenarios
+    task_ids = [task['ID'] for task in tasks]
+    prereqs = [task['Prereq'] for task in tasks]
+    network = scenario_key('sankey', task_ids, prereqs)
+
+    def sankey():
+        layout = _cached_layout(network, lambda: sankey_layout(task_ids, prereqs, reduce=True))
+        return create_sankey_chart(simulated_plan, baseline_plan, layout)
+
+    figures = {
+        'gantt': (scenario_key(FIGURE_VERSION, 'gantt', simulated_plan),
+                  lambda: create_gantt_chart(simulated_plan, "Simulated Project Timeline (With Delays)")),
+        'gantt_baseline': (scenario_key(FIGURE_VERSION, 'gantt_baseline', baseline_plan),
+                           lambda: create_gantt_chart(baseline_plan, "Baseline Project Timeline (No Delays)")),
+        'sankey': (scenario_key(FIGURE_VERSION, 'sankey', simulated_plan, baseline_plan), sankey),
+    }
+    return figures, {'end': end, 'baseline_end': baseline_end}
+
+
+MODELS = {'pyramid': pyramid_figures, 'supply': supply_figures}
+
+
+def _write_figure(fig, path, fmt):
+    if fmt == 'html':
+        # one shared copy of plotly.js, one level up (see export_reports)
+        fig.write_html(path, include_plotlyjs=f'../{PLOTLY_JS}', full_html=True)
+    else:
+        fig.write_image(path, format=fmt)
+
+
+@timed('export_report')
+def export_report(spec, out_dir, formats=('html',), previous=None):
+    """
+    Exports one report (worker function). `previous` is the report's last
+    manifest entry; figures whose hash and files are unchanged are skipped.
+    Returns the new manifest entry plus 'written' / 'skipped' figure names,
+    or {'name', 'error'} if the spec cannot be scheduled, so one bad spec
+    does not stop the batch.
+    """
+    name = spec['name']
+    try:
+        figures, summary = MODELS[spec.get('model', 'pyramid')](spec)
+    except (ValueError, TypeError, KeyError) as error:
+        return {'name': name, 'error': f"{type(error).__name__}: {error}"}
+
+    report_dir = os.path.join(out_dir, name)
+    os.makedirs(report_dir, exist_ok=True)
+    old_figures = (previous or {}).get('figures', {})
+    entry = {'name': name, 'model': spec.get('model', 'pyramid'), **summary, 'figures': {}, 'written': [], 'skipped': []}
+    for figure_name, (input_hash, build) in figures.items():
+        files = [f'{name}/{figure_name}.{fmt}' for fmt in formats]
+        old = old_figures.get(figure_name, {})
+        if old.get('hash') == input_hash and all(os.path.exists(os.path.join(out_dir, f)) for f in files):
+            entry['figures'][figure_name] = {'hash': input_hash, 'files': sorted(set(old['files']) | set(files))}
+            entry['skipped'].append(figure_name)
+            continue
+        fig = build()
+        for fmt, file in zip(formats, files):
+            _write_figure(fig, os.path.join(out_dir, file), fmt)
+        entry['figures'][figure_name] = {'hash': input_hash, 'files': files}
+        entry['written'].append(figure_name)
+    return entry
+
+
+def _export_job(args):
+    return export_report(*args)
+
+
+@timed('export_reports')
+def export_reports(specs, out_dir, formats=('html',), workers=None):
+    """
+    Exports a batch of reports into out_dir and updates its manifest.
+    workers=1 runs in this process; otherwise a pool of `workers`
+    processes (default: one per CPU) shares the reports.
+    Returns {'reports', 'written', 'skipped', 'errors'}.
+    """
+    formats = tuple(dict.fromkeys(fmt.lower() for fmt in formats))
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}' (choose from {', '.join(FORMATS)})")
+    if any(fmt in IMAGE_FORMATS for fmt in formats) and not image_export_available():
+        raise ValueError("PNG / PDF export needs the kaleido package (pip install kaleido)")
+    for spec in specs:
+        if spec.get('model', 'pyramid') not in MODELS:
+            raise ValueError(f"Unknown model '{spec.get('model')}' in report '{spec.get('name')}'")
+    names = [spec.get('name', '') for spec in specs]
+    for name in names:
+        if not _NAME.match(name):
+            raise ValueError(f"Report name '{name}' must be letters, digits, '.', '_' or '-'")
+    if len(set(names)) < len(names):
+        raise ValueError("Report names must be unique")
+
+    os.makedirs(out_dir, exist_ok=True)
+    if 'html' in formats and not os.path.exists(os.path.join(out_dir, PLOTLY_JS)):
+        from plotly.offline import get_plotlyjs
+
+        with open(os.path.join(out_dir, PLOTLY_JS), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {'reports': {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    jobs = [(spec, out_dir, formats, manifest['reports'].get(spec['name'])) for spec in specs]
+
+    if workers == 1 or len(jobs) <= 1:
+        entries = [export_report(*job) for job in jobs]
+    else:
+        workers = workers or os.cpu_count() or 1
+        # consecutive specs usually share a network, so hand them out in runs
+        chunksize = max(1, len(jobs) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            entries = list(pool.map(_export_job, jobs, chunksize=chunksize))
+
+    result = {'reports': len(entries), 'written': 0, 'skipped': 0, 'errors': {}}
+    for entry in entries:
+        if 'error' in entry:
+            result['errors'][entry['name']] = entry['error']
+            continue
+        result['written'] += len(entry.pop('written'))
+        result['skipped'] += len(entry.pop('skipped'))
+        manifest['reports'][entry.pop('name')] = entry
+    count('figures_written', result['written'])
+    count('figures_skipped', result['skipped'])
+
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, default=str)
+    os.replace(tmp_path, manifest_path)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch export of Shipyard report figures.")
+    parser.add_argument('specs', help="JSON list or JSON lines file of report specs")
+    parser.add_argument('--out', default='reports', help="output directory (holds manifest.json)")
+    parser.add_argument('--format', action='append', choices=FORMATS, metavar='FMT',
+                        help="html, png or pdf (repeatable; default html)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    try:
+        result = export_reports(load_specs(args.specs), args.out, args.format or ['html'], args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"Reports: {result['reports']}  figures written: {result['written']}  skipped (unchanged): {result['skipped']}")
+    for name, error in result['errors'].items():
+        print(f"  {name}: {error}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
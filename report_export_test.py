@@ -0,0 +1,95 @@
+"""
+report_export_test.py
+Backend tests for the headless report export (report_export.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import json
+import os
+import tempfile
+
+from report_export import export_reports, image_export_available, load_specs, main
+
+SPECS = [
+    {'name': 'base', 'model': 'pyramid'},
+    {'name': 'panel_30', 'model': 'pyramid', 'delays': {'Panel_Assy': 30}},
+    {'name': 'weekly', 'model': 'supply', 'scenarios': ['design_flaw'], 'start_date': '2025-01-06'},
+]
+
+
+def test_html_pack_and_manifest():
+    with tempfile.TemporaryDirectory() as out:
+        result = export_reports(SPECS, out, workers=1)
+        assert result['written'] == 5 and result['skipped'] == 0 and not result['errors']
+
+        with open(os.path.join(out, 'manifest.json')) as f:
+            manifest = json.load(f)
+        assert manifest['reports']['panel_30']['end'] == 1201
+        assert manifest['reports']['base']['baseline_end'] == 1171
+        assert sorted(manifest['reports']['weekly']['figures']) == ['gantt', 'gantt_baseline', 'sankey']
+        assert os.path.exists(os.path.join(out, 'plotly.min.js'))
+        with open(os.path.join(out, 'weekly', 'sankey.html')) as f:
+            assert 'src="../plotly.min.js"' in f.read()
+
+
+def test_unchanged_figures_are_skipped():
+    with tempfile.TemporaryDirectory() as out:
+        export_reports(SPECS, out, workers=2)
+        assert export_reports(SPECS, out, workers=2)['skipped'] == 5
+
+        # Only the report whose schedule changed is drawn again
+        changed = SPECS[:1] + [{**SPECS[1], 'delays': {'Panel_Assy': 45}}] + SPECS[2:]
+        result = export_reports(changed, out, workers=1)
+        assert result['written'] == 1 and result['skipped'] == 4
+
+        # A deleted file is rewritten even though its inputs did not change
+        os.remove(os.path.join(out, 'base', 'pyramid.html'))
+        assert export_reports(changed, out, workers=1)['written'] == 1
+
+
+def test_bad_specs():
+    with tempfile.TemporaryDirectory() as out:
+        result = export_reports([{'name': 'typo', 'delays': {'Nope': 3}}], out, workers=1)
+        assert 'Nope' in result['errors']['typo']
+        # a bad value or custom node is reported and the rest of the batch still runs
+        result = export_reports([{'name': 'text', 'delays': {'Fuel_Sys': '30'}},
+                                 {'name': 'no_duration', 'nodes': {'A': {'prereqs': []}}},
+                                 {'name': 'base'}], out, workers=1)
+        assert "'30'" in result['errors']['text'] and 'duration' in result['errors']['no_duration']
+        assert result['written'] == 1
+        result = export_reports([{'name': 'misspelled', 'model': 'supply', 'scenarios': ['desing_flaw']}], out, workers=1)
+        assert "Unknown scenario 'desing_flaw'" in result['errors']['misspelled'] and result['written'] == 0
+        for specs in ([{'name': '../escape'}], [{'name': 'a'}, {'name': 'a'}], [{'name': 'a', 'model': 'gantt'}]):
+            try:
+                export_reports(specs, out)
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+        if not image_export_available():
+            try:
+                export_reports(SPECS, out, formats=['png'])
+                assert False, "expected ValueError"
+            except ValueError as error:
+                assert 'kaleido' in str(error)
+
+
+def test_command_line():
+    with tempfile.TemporaryDirectory() as out:
+        path = os.path.join(out, 'specs.jsonl')
+        with open(path, 'w') as f:
+            f.write('\n'.join(json.dumps(spec) for spec in SPECS))
+        assert load_specs(path) == SPECS
+        result = main([path, '--out', os.path.join(out, 'reports'), '--workers', '1'])
+        assert result['reports'] == 3 and result['written'] == 5
+
+
+if __name__ == "__main__":
+    print("### REPORT EXPORT BACKEND TEST ###")
+
+    test_html_pack_and_manifest()
+    test_unchanged_figures_are_skipped()
+    test_bad_specs()
+    test_command_line()
+
+    print("\nAll tests completed.")
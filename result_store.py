@@ -0,0 +1,190 @@
+"""
+result_store.py
+Memory-mapped columnar store for large Monte Carlo and sweep outputs
+(no Streamlit).
+
+Per-node samples get big fast: 10k nodes x 100k iterations of start and
+finish dates is 8 GB even as float32, far beyond what a DataFrame built
+with pd.DataFrame.from_dict can hold. A store is a directory instead:
+
+    meta.json            node ids, columns, dtype, rows per chunk and
+                         per-node min/max of every column
+    start_00000.npy      one (rows, nodes) block per column and chunk,
+    finish_00000.npy     written with np.lib.format.open_memmap
+    ...
+
+Writers append chunks as they are simulated. Readers open chunks with
+mmap_mode='r', so only the pages actually touched are loaded: percentiles,
+histograms and criticality stream over the chunks one at a time, and the UI
+reads just the rows and nodes it displays with read().
+"""
+
+import json
+import os
+
+import numpy as np
+
+from profiling import count, timed
+
+META_FILE = 'meta.json'
+
+
+class ResultStore:
+    """A directory of chunked (iterations, nodes) arrays, one set per column."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.index = {node_id: i for i, node_id in enumerate(self.meta['node_ids'])}
+
+    @classmethod
+    def create(cls, path, node_ids, columns=('start', 'finish'), dtype='float32', attrs=None):
+        """New, empty store at `path` (the directory is created if needed)."""
+        os.makedirs(path, exist_ok=True)
+        n = len(node_ids)
+        meta = {
+            'node_ids': list(node_ids),
+            'columns': list(columns),
+            'dtype': dtype,
+            'chunks': [],
+            'rows': 0,
+            'min': {column: [float('inf')] * n for column in columns},
+            'max': {column: [float('-inf')] * n for column in columns},
+            'attrs': attrs or {},
+        }
+        with open(os.path.join(path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+        return cls(path)
+
+    @property
+    def node_ids(self):
+        return self.meta['node_ids']
+
+    @property
+    def rows(self):
+        return self.meta['rows']
+
+    def _chunk_path(self, column, k):
+        return os.path.join(self.path, f'{column}_{k:05d}.npy')
+
+    def _node_indices(self, nodes):
+        if nodes is None:
+            return np.arange(len(self.node_ids))
+        return np.array([self.index[node] if isinstance(node, str) else node for node in nodes], dtype=int)
+
+    # --- WRITING ---
+
+    def append(self, **blocks):
+        """Appends one chunk: a (rows, nodes) array for every column of the store."""
+        missing = set(self.meta['columns']) - set(blocks)
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+        k = len(self.meta['chunks'])
+        rows = None
+        for column in self.meta['columns']:
+            block = np.asarray(blocks[column])
+            if block.ndim != 2 or block.shape[1] != len(self.node_ids) or (rows is not None and block.shape[0] != rows):
+                raise ValueError(f"Column '{column}' must be (rows, {len(self.node_ids)}) like the other columns")
+            rows = block.shape[0]
+            out = np.lib.format.open_memmap(self._chunk_path(column, k), mode='w+', dtype=self.meta['dtype'], shape=block.shape)
+            out[:] = block
+            out.flush()
+            del out
+            if rows:
+                self.meta['min'][column] = np.minimum(self.meta['min'][column], block.min(axis=0)).tolist()
+                self.meta['max'][column] = np.maximum(self.meta['max'][column], block.max(axis=0)).tolist()
+        self.meta['chunks'].append(rows)
+        self.meta['rows'] += rows
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(self.meta, f)
+        count('store_rows_written', rows)
+
+    # --- READING ---
+
+    def chunks(self, column):
+        """Yields (first row, read-only memory-mapped block) for every chunk of a column."""
+        first = 0
+        for k, rows in enumerate(self.meta['chunks']):
+            yield first, np.load(self._chunk_path(column, k), mmap_mode='r')
+            first += rows
+
+    def read(self, column, rows=None, nodes=None):
+        """
+        Just the requested slice as an in-memory array: `rows` is a slice of
+        iterations (default all), `nodes` a list of node ids or indices.
+        Chunks outside the row range are never opened.
+        """
+        start, stop, _ = (rows or slice(None)).indices(self.rows)
+        cols = self._node_indices(nodes)
+        parts = []
+        first = 0
+        for k, chunk_rows in enumerate(self.meta['chunks']):
+            lo, hi = max(start, first), min(stop, first + chunk_rows)
+            if lo < hi:
+                block = np.load(self._chunk_path(column, k), mmap_mode='r')
+                parts.append(block[lo - first:hi - first][:, cols])
+            first += chunk_rows
+        if not parts:
+            return np.empty((0, len(cols)), dtype=self.meta['dtype'])
+        return np.concatenate(parts)
+
+    # --- OUT-OF-CORE STATISTICS ---
+
+    def _bin_edges(self, column, cols, bins):
+        lo = np.array(self.meta['min'][column])[cols]
+        hi = np.array(self.meta['max'][column])[cols]
+        width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+        return lo, width
+
+    @timed('store_histograms')
+    def histograms(self, column, nodes=None, bins=50):
+        """
+        Per-node histograms in one streaming pass.
+        Returns (counts of shape (bins, nodes), lower edges, bin widths);
+        each node's bins span its own min..max.
+        """
+        cols = self._node_indices(nodes)
+        lo, width = self._bin_edges(column, cols, bins)
+        counts = np.zeros(bins * len(cols), dtype=np.int64)
+        offsets = np.arange(len(cols))
+        for _, block in self.chunks(column):
+            values = np.asarray(block[:, cols], dtype=float)
+            bin_index = np.clip(((values - lo) / width).astype(np.int64), 0, bins - 1)
+            counts += np.bincount((bin_index * len(cols) + offsets).ravel(), minlength=counts.size)
+        return counts.reshape(bins, len(cols)), lo, width
+
+    def percentiles(self, column, qs, nodes=None, bins=512):
+        """
+        Approximate per-node percentiles (0-100) from streamed histograms,
+        interpolated within a bin; the error is at most (max - min) / bins.
+        Returns an array of shape (len(qs), nodes).
+        """
+        counts, lo, width = self.histograms(column, nodes, bins)
+        cumulative = counts.cumsum(axis=0)
+        result = np.empty((len(qs), counts.shape[1]))
+        for row, q in enumerate(qs):
+            target = q / 100.0 * self.rows
+            b = np.minimum((cumulative < target).sum(axis=0), bins - 1)
+            before = np.where(b > 0, cumulative[np.maximum(b - 1, 0), np.arange(counts.shape[1])], 0)
+            in_bin = counts[b, np.arange(counts.shape[1])]
+            fraction = np.where(in_bin > 0, (target - before) / np.maximum(in_bin, 1), 0.0)
+            result[row] = lo + (b + np.clip(fraction, 0, 1)) * width
+        hi = np.array(self.meta['max'][column])[self._node_indices(nodes)]
+        return np.minimum(result, hi)
+
+    def mean(self, column, nodes=None):
+        cols = self._node_indices(nodes)
+        total = np.zeros(len(cols))
+        for _, block in self.chunks(column):
+            total += np.asarray(block[:, cols], dtype=float).sum(axis=0)
+        return total / max(self.rows, 1)
+
+    @timed('store_criticality')
+    def criticality(self, column='total_float', nodes=None, eps=1e-3):
+        """Share of iterations in which each node had (near) zero float, i.e. was critical."""
+        cols = self._node_indices(nodes)
+        critical = np.zeros(len(cols), dtype=np.int64)
+        for _, block in self.chunks(column):
+            critical += (np.asarray(block[:, cols]) <= eps).sum(axis=0)
+        return critical / max(self.rows, 1)
@@ -0,0 +1,71 @@
+"""
+result_store_test.py
+Backend tests for the memory-mapped result store (result_store.py) and the
+Monte Carlo runner that writes to it (monte_carlo.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import tempfile
+
+import numpy as np
+
+from result_store import ResultStore
+from monte_carlo import run_monte_carlo
+from schedule_engine import compile_graph
+
+
+def test_chunks_slices_and_reopen():
+    with tempfile.TemporaryDirectory() as path:
+        store = ResultStore.create(path, ['A', 'B', 'C'], columns=('finish',))
+        data = np.arange(30, dtype=float).reshape(10, 3)
+        store.append(finish=data[:4])
+        store.append(finish=data[4:])
+
+        reopened = ResultStore(path)
+        assert reopened.rows == 10 and reopened.meta['chunks'] == [4, 6]
+        assert np.array_equal(reopened.read('finish', rows=slice(2, 7), nodes=['C', 'A']), data[2:7][:, [2, 0]])
+        assert np.array_equal(reopened.read('finish'), data)
+        assert reopened.meta['max']['finish'] == [27, 28, 29]
+
+
+def test_streaming_stats_match_in_memory():
+    rng = np.random.default_rng(3)
+    data = rng.normal(100, 10, size=(20000, 4))
+    with tempfile.TemporaryDirectory() as path:
+        store = ResultStore.create(path, ['A', 'B', 'C', 'D'], columns=('finish',), dtype='float64')
+        for first in range(0, len(data), 3000):
+            store.append(finish=data[first:first + 3000])
+
+        approx = store.percentiles('finish', [50, 80, 95])
+        exact = np.percentile(data, [50, 80, 95], axis=0)
+        width = (data.max(axis=0) - data.min(axis=0)) / 512
+        assert np.all(np.abs(approx - exact) <= 2 * width)
+        assert np.allclose(store.mean('finish'), data.mean(axis=0))
+
+        counts, _, _ = store.histograms('finish', nodes=['B'], bins=40)
+        assert counts.sum() == len(data) and counts.shape == (40, 1)
+
+
+def test_monte_carlo_into_store():
+    # A (10) and B (8) in parallel into C: A is usually, but not always, critical
+    graph = compile_graph(['A', 'B', 'C'], [[], [], ['A', 'B']])
+    with tempfile.TemporaryDirectory() as path:
+        result = run_monte_carlo(graph, [10, 8, 5], iterations=5000, store_path=path, chunk_rows=1500, seed=1)
+        store = result['store']
+
+        assert store.rows == 5000 and len(store.meta['chunks']) == 4
+        assert np.allclose(store.read('finish', nodes=['C'])[:, 0], result['end'], atol=1e-4)
+        critical = dict(zip(store.node_ids, store.criticality()))
+        assert critical['C'] == 1.0 and 0.5 < critical['A'] < 1.0 and 0 < critical['B'] < 0.5
+        assert abs(critical['A'] + critical['B'] - 1.0) < 0.01
+
+
+if __name__ == "__main__":
+    print("### RESULT STORE BACKEND TEST ###")
+
+    test_chunks_slices_and_reopen()
+    test_streaming_stats_match_in_memory()
+    test_monte_carlo_into_store()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,113 @@
+"""
+scenario_cache.py
+Bounded LRU memo for scenario results (no Streamlit).
+
+Planners toggle the same delay checkboxes and per-node delays back and
+forth, so the same few scenarios are asked for again and again. A result is
+stored under a canonical hash of the graph version plus the scenario
+overlay (delays, active rules...), see scenario_key(). The cache keeps at
+most `max_entries` results and roughly `max_bytes` of them; the least
+recently used ones are evicted first.
+
+A hit is a dict lookup under a lock, so a repeated scenario comes back in
+microseconds. Hits, misses and evictions are kept on the cache and also
+reported as profiling counters (scenario_cache_hits / _misses) in the run
+that asked.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from profiling import count
+
+MISSING = object()
+
+
+def scenario_key(*parts):
+    """Canonical hash of a graph version plus a scenario overlay (dict key order does not matter)."""
+    text = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def estimate_size(value):
+    """Approximate memory held by a result (bytes); arrays and frames count their data."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    pd = sys.modules.get('pandas')  # a frame can only exist once pandas is loaded
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if pd is not None and isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ScenarioCache:
+    """Thread-safe LRU cache with an entry limit and an approximate memory cap."""
+
+    def __init__(self, max_entries=512, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size); most recent last
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None, record_miss=True):
+        """
+        Cached value (and mark it recently used), else `default`.
+        record_miss=False is for a fast-path peek that falls back to a
+        lookup which will record the miss itself.
+        """
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is MISSING:
+                if record_miss:
+                    self.misses += 1
+                    count('scenario_cache_misses')
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        count('scenario_cache_hits')
+        return entry[0]
+
+    def put(self, key, value):
+        """Stores a result; a single result bigger than max_bytes is not cached."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {'cache_hits': self.hits, 'cache_misses': self.misses, 'cache_evictions': self.evictions,
+                'cache_entries': len(self._entries), 'cache_bytes': self.bytes}
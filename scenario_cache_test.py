@@ -0,0 +1,61 @@
+"""
+scenario_cache_test.py
+Backend tests for the LRU scenario result cache (scenario_cache.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import numpy as np
+
+from scenario_cache import ScenarioCache, scenario_key, estimate_size
+from simulation_service import create_default_service
+from profiling import start_profiler
+
+
+def test_key_is_canonical():
+    assert scenario_key('v1', {'A': 3, 'B': 5}) == scenario_key('v1', {'B': 5, 'A': 3})
+    assert scenario_key('v1', {'A': 3}) != scenario_key('v2', {'A': 3})
+    assert scenario_key('v1', {'A': 3}) != scenario_key('v1', {'A': 4})
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ScenarioCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1          # 'a' is now the most recent
+    cache.put('c', 3)                   # evicts 'b'
+    assert 'b' not in cache and cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get('b') is None and cache.misses == 1 and cache.evictions == 1
+
+    block = np.zeros(1000)              # 8000 bytes
+    cache = ScenarioCache(max_entries=100, max_bytes=20000)
+    for key in 'xyz':
+        cache.put(key, block)
+    assert list(cache._entries) == ['y', 'z'] and cache.bytes == 2 * estimate_size(block)
+    cache.put('huge', np.zeros(10000))  # bigger than the cap: not cached
+    assert 'huge' not in cache and len(cache) == 2
+
+
+def test_repeated_scenario_is_a_cache_hit():
+    service = create_default_service()
+    profiler = start_profiler('cache_test')
+    first = service.cached_schedule('pyramid', {'Panel_Assy': 40})
+    for _ in range(1000):
+        again = service.cached_schedule('pyramid', {'Panel_Assy': 40})
+
+    # every repeat is answered from the cache with the very same result
+    assert again is first and first['end'] == 1211
+    assert profiler.counters['scenario_cache_hits'] == 1000
+    assert service.stats['cache_misses'] == 1 and service.stats['computed'] == 1
+    assert service.stats['deduplicated'] == 0
+    service.close()
+
+
+if __name__ == "__main__":
+    print("### SCENARIO CACHE BACKEND TEST ###")
+
+    test_key_is_canonical()
+    test_lru_eviction_by_entries_and_bytes()
+    test_repeated_scenario_is_a_cache_hit()
+
+    print("\nAll tests completed.")
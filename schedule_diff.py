@@ -0,0 +1,117 @@
+"""
+schedule_diff.py
+Diff engine for two plans or scenario versions (no Streamlit).
+
+Both plans are turned into DataFrames indexed by node ID (plan_frame,
+nodes_frame for the pyramid model, tasks_frame for the supply plan). The
+diff aligns them on the union of the two hashed indexes - so nodes added or
+removed between versions are handled - and computes every column's old /
+new / delta as whole-column vector operations. There is no per-node Python
+loop, so two 100k-activity versions diff in a fraction of a second.
+
+diff_schedules reports, per node, what moved (start, finish, duration),
+float gained or lost and critical path entries/exits, plus a summary.
+"""
+
+import numpy as np
+
+from profiling import timed
+from startup_cache import lazy_import
+
+pd = lazy_import('pandas')
+
+DIFF_COLUMNS = ['start', 'finish', 'duration', 'total_float']
+
+
+def plan_frame(node_ids, start, finish, late_start=None, labels=None):
+    """Plan as a DataFrame indexed by node ID with the diff columns (and 'label')."""
+    start = np.asarray(start, dtype=float)
+    finish = np.asarray(finish, dtype=float)
+    frame = pd.DataFrame({
+        'label': labels if labels is not None else list(node_ids),
+        'start': start,
+        'finish': finish,
+        'duration': finish - start,
+        'total_float': np.asarray(late_start, dtype=float) - start if late_start is not None else np.nan,
+    }, index=pd.Index(node_ids, name='node'))
+    return frame
+
+
+def nodes_frame(nodes_data):
+    """Pyramid-model nodes (after calculate_schedule / apply_schedule) as a plan frame."""
+    node_ids = list(nodes_data)
+    return plan_frame(
+        node_ids,
+        [nodes_data[nid]['start_day'] for nid in node_ids],
+        [nodes_data[nid]['end_day'] for nid in node_ids],
+        [nodes_data[nid]['late_start'] for nid in node_ids],
+        [nodes_data[nid]['label'] for nid in node_ids],
+    )
+
+
+def tasks_frame(plan):
+    """Supply-chain plan rows (calculate_simulated_plan) as a plan frame."""
+    return plan_frame(
+        [task['ID'] for task in plan],
+        [task['Start_Wk'] for task in plan],
+        [task['End_Wk'] for task in plan],
+        [task['Start_Wk'] + task['Total_Float'] for task in plan],
+        [task['Task'] for task in plan],
+    )
+
+
+@timed('diff_schedules')
+def diff_schedules(old, new, eps=1e-6):
+    """
+    Diffs two plan frames. Returns (diff, summary):
+
+    diff     one row per node in either plan: label, <column>_old,
+             <column>_new, <column>_delta for start/finish/duration/float,
+             'change' (Added / Removed / Moved / Changed Duration / Unchanged)
+             and 'critical_change' (Became Critical / Left Critical Path / '')
+    summary  counts of each kind of change plus old / new / delta project end
+    """
+    index = old.index.union(new.index, sort=False)
+    a = old.reindex(index)
+    b = new.reindex(index)
+
+    columns = {'label': b['label'].fillna(a['label'])}
+    for column in DIFF_COLUMNS:
+        columns[f'{column}_old'] = a[column]
+        columns[f'{column}_new'] = b[column]
+        columns[f'{column}_delta'] = b[column] - a[column]
+    diff = pd.DataFrame(columns, index=index)
+
+    added = a['start'].isna().to_numpy()
+    removed = b['start'].isna().to_numpy()
+    moved = ((diff['start_delta'].abs() > eps) | (diff['finish_delta'].abs() > eps)).to_numpy()
+    resized = (diff['duration_delta'].abs() > eps).to_numpy()
+    # a new duration always moves a date too, so it is checked before a plain move
+    diff['change'] = np.select([added, removed, resized, moved], ['Added', 'Removed', 'Changed Duration', 'Moved'], 'Unchanged')
+
+    # Only nodes in both versions can enter or leave the critical path
+    in_both = ~added & ~removed
+    critical_old = (a['total_float'] <= eps).to_numpy() & in_both
+    critical_new = (b['total_float'] <= eps).to_numpy() & in_both
+    diff['critical_change'] = np.select([critical_new & ~critical_old, critical_old & ~critical_new],
+                                        ['Became Critical', 'Left Critical Path'], '')
+
+    float_delta = diff['total_float_delta']
+    end_old = float(old['finish'].max()) if len(old) else 0.0
+    end_new = float(new['finish'].max()) if len(new) else 0.0
+    summary = {
+        'nodes_old': len(old),
+        'nodes_new': len(new),
+        'added': int(added.sum()),
+        'removed': int(removed.sum()),
+        'moved': int((diff['change'] == 'Moved').sum()),
+        'duration_changed': int(resized.sum()),
+        'float_gained': int((float_delta > eps).sum()),
+        'float_lost': int((float_delta < -eps).sum()),
+        'became_critical': int((critical_new & ~critical_old).sum()),
+        'left_critical': int((critical_old & ~critical_new).sum()),
+        'end_old': end_old,
+        'end_new': end_new,
+        'end_delta': end_new - end_old,
+    }
+    return diff, summary
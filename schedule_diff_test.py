@@ -0,0 +1,96 @@
+"""
+schedule_diff_test.py
+Backend tests for the schedule diff engine (schedule_diff.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import copy
+import time
+
+import numpy as np
+
+from schedule_diff import plan_frame, nodes_frame, tasks_frame, diff_schedules
+
+
+def test_pyramid_versions():
+    from pyramid_model import INITIAL_NODES, calculate_schedule
+
+    baseline = nodes_frame(calculate_schedule(copy.deepcopy(INITIAL_NODES)))
+    nodes = copy.deepcopy(INITIAL_NODES)
+    nodes['Panel_Assy']['delay'] = 40
+    delayed = nodes_frame(calculate_schedule(nodes))
+
+    diff, summary = diff_schedules(baseline, delayed)
+    assert summary['end_delta'] == 40 and summary['added'] == summary['removed'] == 0
+    assert diff.loc['Delivery', 'finish_delta'] == 40
+    assert diff.loc['Panel_Assy', 'change'] == 'Changed Duration' and diff.loc['Panel_Assy', 'duration_delta'] == 40
+    assert diff.loc['Block_Assy', 'change'] == 'Moved' and diff.loc['Block_Assy', 'duration_delta'] == 0
+    # Identical versions: nothing changes
+    _, same = diff_schedules(baseline, baseline)
+    assert same['moved'] == same['float_gained'] == same['became_critical'] == 0
+
+
+def test_added_removed_and_critical_path_changes():
+    old = plan_frame(['A', 'B', 'C'], [0, 0, 10], [10, 8, 12], late_start=[0, 2, 10])
+    new = plan_frame(['A', 'B', 'D'], [0, 0, 10], [10, 12, 11], late_start=[2, 0, 11])
+    diff, summary = diff_schedules(old, new)
+
+    assert list(diff.index) == ['A', 'B', 'C', 'D']
+    assert diff.loc['C', 'change'] == 'Removed' and diff.loc['D', 'change'] == 'Added'
+    assert diff.loc['B', 'critical_change'] == 'Became Critical'
+    assert diff.loc['A', 'critical_change'] == 'Left Critical Path'
+    assert summary['float_gained'] == 1 and summary['float_lost'] == 1
+
+
+def test_change_labels():
+    old = plan_frame(['A', 'B', 'C', 'D'], [0, 10, 10, 0], [10, 15, 12, 4])
+    new = plan_frame(['A', 'B', 'C', 'D'], [0, 10, 14, 0], [10, 25, 16, 4])
+    diff, summary = diff_schedules(old, new)
+
+    # B ran longer in place, C kept its duration but was pushed back
+    assert list(diff['change']) == ['Unchanged', 'Changed Duration', 'Moved', 'Unchanged']
+    assert summary['moved'] == 1 and summary['duration_changed'] == 1
+
+
+def test_supply_plans():
+    from supply_chain_model import BASELINE_TASKS, calculate_simulated_plan
+
+    baseline, _, _ = calculate_simulated_plan(BASELINE_TASKS, {})
+    simulated, _, _ = calculate_simulated_plan(BASELINE_TASKS, {'design_flaw': True})
+    _, summary = diff_schedules(tasks_frame(baseline), tasks_frame(simulated))
+    assert summary['end_delta'] > 0 and summary['moved'] > 0
+
+
+def test_100k_activity_versions():
+    rng = np.random.default_rng(2)
+    n = 100000
+    ids = [f'N{i}' for i in range(n)]
+    start = rng.uniform(0, 1000, n)
+    duration = rng.uniform(1, 30, n)
+    old = plan_frame(ids, start, start + duration, late_start=start + rng.uniform(0, 5, n))
+    shift = np.where(rng.random(n) < 0.1, 7.0, 0.0)
+    new_ids = ids[1000:] + [f'X{i}' for i in range(500)]
+    new = plan_frame(new_ids, np.r_[start[1000:] + shift[1000:], np.zeros(500)],
+                     np.r_[start[1000:] + shift[1000:] + duration[1000:], np.ones(500)],
+                     late_start=np.r_[start[1000:] + shift[1000:], np.zeros(500)])
+
+    started = time.perf_counter()
+    diff, summary = diff_schedules(old, new)
+    elapsed = time.perf_counter() - started
+
+    assert len(diff) == n + 500 and summary['removed'] == 1000 and summary['added'] == 500
+    assert summary['moved'] == int((shift[1000:] > 0).sum())
+    assert elapsed < 1.0, f"diff took {elapsed:.2f}s"
+
+
+if __name__ == "__main__":
+    print("### SCHEDULE DIFF BACKEND TEST ###")
+
+    test_pyramid_versions()
+    test_added_removed_and_critical_path_changes()
+    test_change_labels()
+    test_supply_plans()
+    test_100k_activity_versions()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,481 @@
+"""
+schedule_engine.py
+Shared scheduling core for the Shipyard simulators (no Streamlit).
+
+A project is compiled once into a dependency graph (topological order plus
+flat link arrays). Every scheduling path then runs in linear time over the
+links: the forward pass (early dates), the backward pass (late dates and
+float), the incremental re-propagation after an edit, and the batch
+forward/backward passes used for Monte Carlo runs. For very large graphs
+(fleet programs) forward_pass_levels schedules a whole topological level
+per vectorized step.
+
+Prerequisites can be plain IDs (finish-to-start, no lag) or typed links:
+    {'id': 'Block_Assy', 'type': 'SS', 'lag': 21}
+
+    FS  successor starts after the predecessor finishes (+ lag)  <- default
+    SS  successor starts after the predecessor starts (+ lag)
+    FF  successor finishes after the predecessor finishes (+ lag)
+    SF  successor finishes after the predecessor starts (+ lag)
+
+A negative lag is a lead.
+"""
+
+import heapq
+from collections import deque
+
+import numpy as np
+
+from profiling import count
+
+LINK_TYPES = ('FS', 'SS', 'FF', 'SF')
+FS, SS, FF, SF = range(4)
+
+
+def parse_link(prereq):
+    """
+    Normalizes one prerequisite entry to (pred_id, link_type, lag).
+    """
+    if isinstance(prereq, dict):
+        link_type = str(prereq.get('type', 'FS')).upper()
+        if link_type not in LINK_TYPES:
+            raise ValueError(f"Unknown link type '{link_type}' on prerequisite '{prereq.get('id')}'")
+        return prereq['id'], link_type, prereq.get('lag', 0)
+    return prereq, 'FS', 0
+
+
+def prereq_ids(prereqs):
+    """Returns just the predecessor IDs of a prerequisite list."""
+    return [parse_link(p)[0] for p in prereqs or []]
+
+
+def compile_graph(node_ids, prereq_lists):
+    """
+    Builds the compiled graph used by all scheduling passes.
+
+    node_ids:      list of IDs, in display order
+    prereq_lists:  prerequisite list for each ID (same order)
+
+    Incoming links are stored CSR-style per node ('pred_ptr' / 'pred_idx'),
+    outgoing links likewise ('succ_ptr' / 'succ_idx' / 'succ_edge').
+    Raises ValueError for unknown prerequisites or circular dependencies.
+    """
+    node_ids = list(node_ids)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    n = len(node_ids)
+
+    pred_ptr = [0]
+    pred_idx = []
+    link_type = []
+    lag = []
+    for node_id, prereqs in zip(node_ids, prereq_lists):
+        for prereq in prereqs or []:
+            pred_id, kind, link_lag = parse_link(prereq)
+            if pred_id not in index:
+                raise ValueError(f"Unknown prerequisite '{pred_id}' for '{node_id}'")
+            pred_idx.append(index[pred_id])
+            link_type.append(LINK_TYPES.index(kind))
+            lag.append(link_lag)
+        pred_ptr.append(len(pred_idx))
+
+    # Outgoing links, bucketed by predecessor (counting sort keeps this linear)
+    succ_count = [0] * (n + 1)
+    for i in pred_idx:
+        succ_count[i + 1] += 1
+    succ_ptr = succ_count[:]
+    for i in range(n):
+        succ_ptr[i + 1] += succ_ptr[i]
+    fill = succ_ptr[:-1]
+    succ_idx = [0] * len(pred_idx)
+    succ_edge = [0] * len(pred_idx)
+    for j in range(n):
+        for e in range(pred_ptr[j], pred_ptr[j + 1]):
+            i = pred_idx[e]
+            succ_idx[fill[i]] = j
+            succ_edge[fill[i]] = e
+            fill[i] += 1
+
+    # Kahn's algorithm; ties keep the original node order
+    in_degree = [pred_ptr[j + 1] - pred_ptr[j] for j in range(n)]
+    queue = deque(j for j in range(n) if in_degree[j] == 0)
+    order = []
+    while queue:
+        i = queue.popleft()
+        order.append(i)
+        for k in range(succ_ptr[i], succ_ptr[i + 1]):
+            j = succ_idx[k]
+            in_degree[j] -= 1
+            if in_degree[j] == 0:
+                queue.append(j)
+
+    if len(order) < n:
+        stuck = [node_ids[j] for j in range(n) if in_degree[j] > 0]
+        raise ValueError(f"Circular dependency detected between: {', '.join(stuck)}")
+
+    rank = [0] * n
+    for position, i in enumerate(order):
+        rank[i] = position
+
+    return {
+        'ids': node_ids,
+        'index': index,
+        'order': order,
+        'rank': rank,
+        'pred_ptr': pred_ptr,
+        'pred_idx': pred_idx,
+        'link_type': link_type,
+        'lag': lag,
+        'succ_ptr': succ_ptr,
+        'succ_idx': succ_idx,
+        'succ_edge': succ_edge,
+    }
+
+
+def _early_start(graph, j, duration, start, finish, project_start):
+    """Earliest start of node j given its predecessors' dates."""
+    pred_ptr, pred_idx = graph['pred_ptr'], graph['pred_idx']
+    link_type, lag = graph['link_type'], graph['lag']
+    early = project_start
+    for e in range(pred_ptr[j], pred_ptr[j + 1]):
+        i = pred_idx[e]
+        kind = link_type[e]
+        if kind == FS:
+            candidate = finish[i] + lag[e]
+        elif kind == SS:
+            candidate = start[i] + lag[e]
+        elif kind == FF:
+            candidate = finish[i] + lag[e] - duration
+        else:
+            candidate = start[i] + lag[e] - duration
+        if candidate > early:
+            early = candidate
+    return early
+
+
+def forward_pass(graph, durations, project_start=0):
+    """
+    Early start / finish for every node, in one pass over the topological order.
+    Returns (start, finish) lists indexed like graph['ids'].
+    """
+    n = len(graph['ids'])
+    start = [project_start] * n
+    finish = [project_start] * n
+    for j in graph['order']:
+        start[j] = _early_start(graph, j, durations[j], start, finish, project_start)
+        finish[j] = start[j] + durations[j]
+    count('nodes_visited', n)
+    count('links_scanned', len(graph['pred_idx']))
+    return start, finish
+
+
+def backward_pass(graph, durations, finish, project_end=None):
+    """
+    Late start / finish for every node, walking the topological order backwards.
+    By default the project end is the latest early finish.
+    """
+    n = len(graph['ids'])
+    if project_end is None:
+        project_end = max(finish) if n else 0
+    succ_ptr, succ_idx, succ_edge = graph['succ_ptr'], graph['succ_idx'], graph['succ_edge']
+    link_type, lag = graph['link_type'], graph['lag']
+
+    late_start = [project_end] * n
+    late_finish = [project_end] * n
+    for i in reversed(graph['order']):
+        duration = durations[i]
+        late = project_end
+        for k in range(succ_ptr[i], succ_ptr[i + 1]):
+            j = succ_idx[k]
+            e = succ_edge[k]
+            kind = link_type[e]
+            if kind == FS:
+                candidate = late_start[j] - lag[e]
+            elif kind == SS:
+                candidate = late_start[j] - lag[e] + duration
+            elif kind == FF:
+                candidate = late_finish[j] - lag[e]
+            else:
+                candidate = late_finish[j] - lag[e] + duration
+            if candidate < late:
+                late = candidate
+        late_finish[i] = late
+        late_start[i] = late - duration
+    count('nodes_visited', n)
+    count('links_scanned', len(graph['pred_idx']))
+    return late_start, late_finish
+
+
+def update_schedule(graph, durations, start, finish, changed, project_start=0, fixed=None):
+    """
+    Incremental forward pass: re-propagates only from the `changed` node
+    indices, updating `start` / `finish` in place. A node's successors are
+    revisited only if its own dates actually moved.
+    `fixed` ({node index: (start, finish)}) pins nodes whose dates are known,
+    e.g. from actuals; they are not recomputed from their prerequisites.
+    Returns the list of node indices whose dates changed.
+    """
+    rank = graph['rank']
+    succ_ptr, succ_idx = graph['succ_ptr'], graph['succ_idx']
+    heap = [(rank[i], i) for i in set(changed)]
+    heapq.heapify(heap)
+    queued = set(i for _, i in heap)
+    moved = []
+    visited = 0
+    while heap:
+        _, j = heapq.heappop(heap)
+        queued.discard(j)
+        visited += 1
+        if fixed and j in fixed:
+            new_start, new_finish = fixed[j]
+        else:
+            new_start = _early_start(graph, j, durations[j], start, finish, project_start)
+            new_finish = new_start + durations[j]
+        if new_start == start[j] and new_finish == finish[j]:
+            continue
+        start[j] = new_start
+        finish[j] = new_finish
+        moved.append(j)
+        for k in range(succ_ptr[j], succ_ptr[j + 1]):
+            s = succ_idx[k]
+            if s not in queued:
+                queued.add(s)
+                heapq.heappush(heap, (rank[s], s))
+    count('nodes_visited', visited)
+    return moved
+
+
+def _add_term(terms, slope, offset):
+    if offset > terms.get(slope, offset - 1):
+        terms[slope] = offset
+
+
+def delay_response(graph, durations, start, finish, node, target=None, project_start=0):
+    """
+    How the finish of `target` (a node index; default the project end)
+    moves when d days are added to the duration of `node`, for every d at
+    once, from one pass over the nodes downstream of `node`.
+
+    Every date downstream is a max of affine terms in d: slope 1 (pushed by
+    the node's finish), 0 (not affected) or -1 (the node's start is pulled
+    earlier by an FF / SF link, as its finish is fixed). Returns those terms
+    for the target as {slope: offset}: its finish is max(offset + slope * d).
+    `start` / `finish` are early dates of the schedule; only dates of nodes
+    not downstream of `node` are read, so they may come from any duration
+    of `node`. `durations[node]` is the duration that d is added to.
+    """
+    pred_ptr, pred_idx = graph['pred_ptr'], graph['pred_idx']
+    link_type, lag = graph['link_type'], graph['lag']
+    succ_ptr, succ_idx = graph['succ_ptr'], graph['succ_idx']
+    rank = graph['rank']
+
+    downstream = {node}
+    stack = [node]
+    while stack:
+        i = stack.pop()
+        for k in range(succ_ptr[i], succ_ptr[i + 1]):
+            if succ_idx[k] not in downstream:
+                downstream.add(succ_idx[k])
+                stack.append(succ_idx[k])
+
+    start_terms, finish_terms = {}, {}
+    for j in sorted(downstream, key=rank.__getitem__):
+        terms = {0: project_start}
+        shift = 1 if j == node else 0  # FF / SF links pull the node's own start back by d
+        for e in range(pred_ptr[j], pred_ptr[j + 1]):
+            i = pred_idx[e]
+            kind = link_type[e]
+            from_start = kind in (SS, SF)
+            if i in finish_terms:
+                pred_terms = start_terms[i] if from_start else finish_terms[i]
+            else:
+                pred_terms = {0: start[i] if from_start else finish[i]}
+            for slope, offset in pred_terms.items():
+                if kind in (FF, SF):
+                    _add_term(terms, slope - shift, offset + lag[e] - durations[j])
+                else:
+                    _add_term(terms, slope, offset + lag[e])
+        start_terms[j] = terms
+        finish_terms[j] = {slope + shift: offset + durations[j] for slope, offset in terms.items()}
+    count('nodes_visited', len(downstream))
+
+    if target is not None:
+        return dict(finish_terms[target]) if target in finish_terms else {0: finish[target]}
+    end = {}
+    others = [finish[i] for i in range(len(finish)) if i not in downstream]
+    if others:
+        _add_term(end, 0, max(others))
+    for terms in finish_terms.values():
+        for slope, offset in terms.items():
+            _add_term(end, slope, offset)
+    return end
+
+
+def forward_pass_batch(graph, durations, project_start=0):
+    """
+    Vectorized forward pass for Monte Carlo runs.
+    `durations` has shape (iterations, nodes); each node is processed once,
+    with all iterations handled together as NumPy columns.
+    Returns (start, finish) arrays of the same shape.
+    """
+    durations = np.asarray(durations, dtype=float)
+    start = np.empty_like(durations)
+    finish = np.empty_like(durations)
+    pred_ptr, pred_idx = graph['pred_ptr'], graph['pred_idx']
+    link_type, lag = graph['link_type'], graph['lag']
+    for j in graph['order']:
+        duration = durations[:, j]
+        early = np.full(durations.shape[0], float(project_start))
+        for e in range(pred_ptr[j], pred_ptr[j + 1]):
+            i = pred_idx[e]
+            kind = link_type[e]
+            if kind == FS:
+                candidate = finish[:, i] + lag[e]
+            elif kind == SS:
+                candidate = start[:, i] + lag[e]
+            elif kind == FF:
+                candidate = finish[:, i] + (lag[e] - duration)
+            else:
+                candidate = start[:, i] + (lag[e] - duration)
+            np.maximum(early, candidate, out=early)
+        start[:, j] = early
+        finish[:, j] = early + duration
+    count('nodes_visited', len(graph['ids']))
+    count('batch_rows', durations.shape[0])
+    return start, finish
+
+
+def backward_pass_batch(graph, durations, finish, project_end=None):
+    """
+    Vectorized backward pass to go with forward_pass_batch.
+    `durations` and `finish` have shape (iterations, nodes); by default each
+    iteration's project end is its own latest early finish.
+    Returns (late_start, late_finish) arrays of the same shape.
+    """
+    durations = np.asarray(durations, dtype=float)
+    if project_end is None:
+        project_end = finish.max(axis=1) if durations.shape[1] else np.zeros(durations.shape[0])
+    project_end = np.broadcast_to(np.asarray(project_end, dtype=float), durations.shape[:1])
+    late_start = np.empty_like(durations)
+    late_finish = np.empty_like(durations)
+    succ_ptr, succ_idx, succ_edge = graph['succ_ptr'], graph['succ_idx'], graph['succ_edge']
+    link_type, lag = graph['link_type'], graph['lag']
+    for i in reversed(graph['order']):
+        duration = durations[:, i]
+        late = project_end.copy()
+        for k in range(succ_ptr[i], succ_ptr[i + 1]):
+            j = succ_idx[k]
+            e = succ_edge[k]
+            kind = link_type[e]
+            if kind == FS:
+                candidate = late_start[:, j] - lag[e]
+            elif kind == SS:
+                candidate = late_start[:, j] - lag[e] + duration
+            elif kind == FF:
+                candidate = late_finish[:, j] - lag[e]
+            else:
+                candidate = late_finish[:, j] - lag[e] + duration
+            np.minimum(late, candidate, out=late)
+        late_finish[:, i] = late
+        late_start[:, i] = late - duration
+    count('nodes_visited', len(graph['ids']))
+    count('batch_rows', durations.shape[0])
+    return late_start, late_finish
+
+
+def topological_levels(graph):
+    """
+    Level of every node: the longest chain of prerequisites before it.
+    Every link goes from a lower level to a higher one, so all nodes of
+    one level can be scheduled together once the levels before it are done.
+    """
+    pred_ptr, pred_idx = graph['pred_ptr'], graph['pred_idx']
+    level = [0] * len(graph['ids'])
+    for j in graph['order']:
+        for e in range(pred_ptr[j], pred_ptr[j + 1]):
+            if level[pred_idx[e]] + 1 > level[j]:
+                level[j] = level[pred_idx[e]] + 1
+    return level
+
+
+def _level_block(lo, hi, nodes, position, n, pred_ptr, pred_idx, link_type, lag):
+    """Flat link arrays for the nodes at positions lo..hi (one level, or part of one)."""
+    counts = pred_ptr[nodes + 1] - pred_ptr[nodes]
+    offsets = np.cumsum(counts) - counts
+    edges = np.repeat(pred_ptr[nodes] - offsets, counts) + np.arange(counts.sum())
+    kinds = link_type[edges]
+    # Dates live in one array [start | finish] in level order: FS/FF links read the finish half
+    gather = position[pred_idx[edges]] + n * ((kinds == FS) | (kinds == FF))
+    tied = np.flatnonzero((kinds == FF) | (kinds == SF))
+    return {
+        'lo': lo,
+        'hi': hi,
+        'offsets': offsets,
+        'gather': gather,
+        'lag': lag[edges].astype(float),
+        'tied_edges': tied,
+        'tied_nodes': np.repeat(np.arange(lo, hi), counts)[tied],
+    }
+
+
+def compile_levels(graph, parts=1, min_parallel=50000):
+    """
+    Groups the compiled graph by topological level for forward_pass_levels.
+    Nodes are renumbered in level order so every level is a contiguous
+    slice. Levels wider than `min_parallel` nodes are split into `parts`
+    blocks that can be scheduled on separate threads.
+    """
+    n = len(graph['ids'])
+    level = np.asarray(topological_levels(graph), dtype=np.int64)
+    pred_ptr = np.asarray(graph['pred_ptr'], dtype=np.int64)
+    pred_idx = np.asarray(graph['pred_idx'], dtype=np.int64)
+    link_type = np.asarray(graph['link_type'], dtype=np.int64)
+    lag = np.asarray(graph['lag'], dtype=float)
+
+    order = np.argsort(level, kind='stable')     # position -> node
+    position = np.empty(n, dtype=np.int64)       # node -> position
+    position[order] = np.arange(n)
+    bounds = np.searchsorted(level[order], np.arange(level.max(initial=-1) + 2))
+    levels = []
+    for d in range(len(bounds) - 1):
+        lo, hi = int(bounds[d]), int(bounds[d + 1])
+        splits = np.linspace(lo, hi, parts + 1).astype(int) if parts > 1 and hi - lo > min_parallel else [lo, hi]
+        levels.append([_level_block(a, b, order[a:b], position, n, pred_ptr, pred_idx, link_type, lag)
+                       for a, b in zip(splits[:-1], splits[1:])])
+    return {'n': n, 'order': order, 'position': position, 'levels': levels}
+
+
+def _level_step(block, durations, dates, n, project_start):
+    lo, hi = block['lo'], block['hi']
+    if len(block['gather']):
+        candidate = dates[block['gather']] + block['lag']
+        if len(block['tied_edges']):
+            candidate[block['tied_edges']] -= durations[block['tied_nodes']]
+        early = np.maximum.reduceat(candidate, block['offsets'])
+        np.maximum(early, project_start, out=early)
+        dates[lo:hi] = early
+    else:
+        dates[lo:hi] = project_start
+    np.add(dates[lo:hi], durations[lo:hi], out=dates[n + lo:n + hi])
+
+
+def forward_pass_levels(levels, durations, project_start=0, pool=None):
+    """
+    Level-synchronous forward pass for very large graphs.
+    Each level is one vectorized step: gather the predecessors' dates over
+    the level's links, take the segment max per node (np.maximum.reduceat)
+    and add the durations. With a thread pool, the blocks of a wide level
+    run in parallel (NumPy releases the GIL). Same result as forward_pass;
+    returns (start, finish) arrays indexed like graph['ids'].
+    """
+    n = levels['n']
+    durations = np.asarray(durations, dtype=float)[levels['order']]
+    dates = np.empty(2 * n)
+    for blocks in levels['levels']:
+        if pool is not None and len(blocks) > 1:
+            list(pool.map(lambda block: _level_step(block, durations, dates, n, project_start), blocks))
+        else:
+            for block in blocks:
+                _level_step(block, durations, dates, n, project_start)
+    count('levels_swept', len(levels['levels']))
+    position = levels['position']
+    return dates[position], dates[n + position]
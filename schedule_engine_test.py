@@ -0,0 +1,218 @@
+"""
+schedule_engine_test.py
+Backend tests for the shared scheduling core (schedule_engine.py).
+Checks typed links and lags in the forward/backward passes, the
+incremental re-propagation and the vectorized Monte Carlo pass.
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import numpy as np
+
+from schedule_engine import (
+    compile_graph, forward_pass, backward_pass, update_schedule, forward_pass_batch, backward_pass_batch, parse_link,
+    compile_levels, forward_pass_levels, topological_levels, delay_response,
+)
+
+# Small block-building chain: Outfitting overlaps Assembly by starting 3 weeks in
+NODES = {
+    'Design': {'duration': 10, 'prereqs': []},
+    'Block_Assy': {'duration': 30, 'prereqs': ['Design']},
+    'Block_Out': {'duration': 25, 'prereqs': [{'id': 'Block_Assy', 'type': 'SS', 'lag': 21}]},
+    'Paint': {'duration': 5, 'prereqs': [{'id': 'Block_Out', 'type': 'FF', 'lag': 2}]},
+    'Survey': {'duration': 4, 'prereqs': [{'id': 'Paint', 'type': 'SF', 'lag': 3}]},
+    'Delivery': {'duration': 1, 'prereqs': ['Block_Out', 'Paint', 'Survey']},
+}
+
+
+def build(nodes):
+    ids = list(nodes)
+    graph = compile_graph(ids, [nodes[n]['prereqs'] for n in ids])
+    durations = [nodes[n]['duration'] for n in ids]
+    return ids, graph, durations
+
+
+def test_parse_link():
+    assert parse_link('T1') == ('T1', 'FS', 0)
+    assert parse_link({'id': 'T1', 'type': 'ss', 'lag': -2}) == ('T1', 'SS', -2)
+    try:
+        parse_link({'id': 'T1', 'type': 'XX'})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown link type accepted")
+
+
+def test_typed_links_forward_backward():
+    ids, graph, durations = build(NODES)
+    start, finish = forward_pass(graph, durations)
+    dates = dict(zip(ids, zip(start, finish)))
+
+    assert dates['Block_Assy'] == (10, 40)
+    assert dates['Block_Out'] == (31, 56)  # SS + 21: starts 3 weeks into assembly
+    assert dates['Paint'] == (53, 58)      # FF + 2: finishes 2 days after outfitting
+    assert dates['Survey'] == (52, 56)     # SF + 3: finishes 3 days after painting starts
+    assert dates['Delivery'] == (58, 59)
+
+    late_start, late_finish = backward_pass(graph, durations, finish)
+    floats = {n: late_start[i] - start[i] for i, n in enumerate(ids)}
+    assert floats['Design'] == 0 and floats['Block_Out'] == 0 and floats['Paint'] == 0
+    assert floats['Survey'] == 2
+    assert late_finish[ids.index('Delivery')] == 59
+
+
+def test_cycle_detection():
+    nodes = deepcopy(NODES)
+    nodes['Design']['prereqs'] = ['Delivery']
+    try:
+        build(nodes)
+    except ValueError as e:
+        assert 'Circular dependency' in str(e)
+    else:
+        raise AssertionError("cycle not detected")
+
+
+def test_incremental_matches_full_pass():
+    ids, graph, durations = build(NODES)
+    start, finish = forward_pass(graph, durations)
+
+    durations[ids.index('Block_Assy')] += 15
+    moved = update_schedule(graph, durations, start, finish, [ids.index('Block_Assy')])
+
+    full_start, full_finish = forward_pass(graph, durations)
+    assert start == full_start and finish == full_finish
+    assert ids.index('Design') not in moved
+
+
+def test_batch_matches_scalar_pass():
+    ids, graph, durations = build(NODES)
+    rng = np.random.default_rng(7)
+    samples = np.array(durations, dtype=float) * rng.uniform(0.8, 1.5, size=(200, len(ids)))
+
+    start, finish = forward_pass_batch(graph, samples)
+    for row in (0, 57, 199):
+        s, f = forward_pass(graph, list(samples[row]))
+        assert np.allclose(start[row], s) and np.allclose(finish[row], f)
+
+    late_start, late_finish = backward_pass_batch(graph, samples, finish)
+    for row in (0, 57, 199):
+        s, f = forward_pass(graph, list(samples[row]))
+        ls, lf = backward_pass(graph, list(samples[row]), f)
+        assert np.allclose(late_start[row], ls) and np.allclose(late_finish[row], lf)
+
+
+def test_level_pass_matches_scalar_pass():
+    ids, graph, durations = build(NODES)
+    assert topological_levels(graph) == [0, 1, 2, 3, 4, 5]
+    start, finish = forward_pass_levels(compile_levels(graph), durations, project_start=3)
+    s, f = forward_pass(graph, durations, project_start=3)
+    assert np.allclose(start, s) and np.allclose(finish, f)
+
+    # Random typed links and lags, wide levels split across threads
+    rng = random.Random(4)
+    n = 3000
+    ids = [f'N{i}' for i in range(n)]
+    prereqs = [[{'id': f'N{p}', 'type': rng.choice(['FS', 'SS', 'FF', 'SF']), 'lag': rng.randint(-2, 5)}
+                for p in rng.sample(range(i), min(i, 3))] for i in range(n)]
+    durations = [rng.randint(1, 20) for _ in range(n)]
+    graph = compile_graph(ids, prereqs)
+    s, f = forward_pass(graph, durations)
+    with ThreadPoolExecutor(4) as pool:
+        start, finish = forward_pass_levels(compile_levels(graph, parts=4, min_parallel=10), durations, pool=pool)
+    assert np.allclose(start, s) and np.allclose(finish, f)
+
+
+def test_level_pass_100k_nodes():
+    # Fleet program: 500 hulls x 200 activities, each waiting on earlier work of its hull
+    rng = random.Random(1)
+    n = 100000
+    ids = [f'N{i}' for i in range(n)]
+    prereqs = []
+    for i in range(n):
+        first, k = i - i % 200, i % 200
+        prereqs.append([f'N{first + p}' for p in rng.sample(range(max(0, k - 20), k), min(k, 2))])
+    graph = compile_graph(ids, prereqs)
+    levels = compile_levels(graph)
+    durations = np.array([rng.randint(1, 20) for _ in range(n)], dtype=float)
+
+    # timed in perf_benchmark.py ('level pass 100k nodes')
+    start, finish = forward_pass_levels(levels, durations)
+    s, f = forward_pass(graph, list(durations))
+    assert np.array_equal(start, s) and np.array_equal(finish, f)
+
+
+def test_delay_response_matches_reschedules():
+    # Every typed link kind, including FF / SF links that pull a start earlier
+    for seed in range(200):
+        rng = random.Random(seed)
+        n = rng.randint(2, 20)
+        nodes = {}
+        for j in range(n):
+            preds = rng.sample(range(j), min(j, rng.randint(0, 3)))
+            nodes[f'N{j}'] = {
+                'duration': rng.choice([0, 1, 5, 9, 20]),
+                'prereqs': [{'id': f'N{i}', 'type': rng.choice(['FS', 'SS', 'FF', 'SF']), 'lag': rng.choice([-3, 0, 4])}
+                            for i in preds],
+            }
+        ids, graph, durations = build(nodes)
+        start, finish = forward_pass(graph, durations)
+        node = rng.randrange(n)
+        target = rng.choice([None, rng.randrange(n)])
+        terms = delay_response(graph, durations, start, finish, node, target)
+        assert set(terms) <= {-1, 0, 1}
+        for d in range(30):
+            delayed = list(durations)
+            delayed[node] += d
+            _, new_finish = forward_pass(graph, delayed)
+            expected = max(new_finish) if target is None else new_finish[target]
+            assert max(offset + slope * d for slope, offset in terms.items()) == expected
+
+
+def test_delay_impact_break_even_is_float():
+    from pyramid_model import INITIAL_NODES, calculate_schedule, delay_impact
+
+    nodes = calculate_schedule(deepcopy(INITIAL_NODES))
+    impact = delay_impact(nodes, 'Pur_Pumps', 700)
+    assert impact['break_even'] == impact['total_float'] == 651
+    assert impact['end_days'][651] == 1171 and impact['end_days'][700] == 1171 + 49
+    # a dead end (no path to Delivery) never moves it, whatever its float
+    assert delay_impact(nodes, 'Aux_Mach')['break_even'] is None
+
+    # other agents' delays stay in; the agent's own delay is what the curve varies
+    nodes = deepcopy(INITIAL_NODES)
+    nodes['Fuel_Sys']['delay'] = 30
+    nodes['Pur_Pumps']['delay'] = 40
+    impact = delay_impact(calculate_schedule(nodes), 'Pur_Pumps', 700)
+    for d in (0, 40, 621, 700):
+        nodes['Pur_Pumps']['delay'] = d
+        assert impact['end_days'][d] == calculate_schedule(deepcopy(nodes))['Delivery']['end_day']
+
+
+def test_pyramid_baseline_unchanged():
+    # Same result the old fixed-point loop produced for the pyramid model
+    from pyramid_model import INITIAL_NODES, calculate_schedule
+
+    nodes = calculate_schedule(deepcopy(INITIAL_NODES))
+    assert nodes['Delivery']['end_day'] == 1171
+    assert nodes['Delivery']['total_float'] == 0
+
+
+if __name__ == "__main__":
+    print("### SCHEDULE ENGINE BACKEND TEST ###")
+
+    test_parse_link()
+    test_typed_links_forward_backward()
+    test_cycle_detection()
+    test_incremental_matches_full_pass()
+    test_batch_matches_scalar_pass()
+    test_level_pass_matches_scalar_pass()
+    test_level_pass_100k_nodes()
+    test_delay_response_matches_reschedules()
+    test_delay_impact_break_even_is_float()
+    test_pyramid_baseline_unchanged()
+
+    print("\nAll tests completed.")
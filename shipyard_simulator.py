@@ -1,9 +1,14 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-from datetime import datetime, timedelta
-import copy
+from datetime import date
+from startup_cache import lazy_import, load_or_build
+from supply_chain_model import BASELINE_TASKS, DELAY_DEFINITIONS, SUPPLY_NETWORK, calculate_simulated_plan, attribute_simulated_delay, create_sankey_chart, create_gantt_chart
+from supply_network import solve_supply_network
+from simulation_service import create_default_service
+from scenario_cache import scenario_key
+from graph_layout import LAYOUT_VERSION, sankey_layout
+from profiling import start_profiler, stage
+
+pd = lazy_import('pandas')  # first needed for the tables below the charts
 
 # --- App Configuration ---
 st.set_page_config(
@@ -12,47 +17,18 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- 1. NEW BASELINE PROJECT (with Dependencies) ---
-# We now use a dependency graph. A task can only start after all 'Prereq' tasks are finished.
-BASELINE_TASKS = [
-    # ID, Task Name, Duration (wks), Category, Prerequisite ID(s)
-    {'ID': 'T1', 'Task': '1. Ship Design', 'Duration': 20, 'Category': 'Planning', 'Prereq': []},
-    
-    # China Supply Chain (Steel)
-    {'ID': 'T2A', 'Task': '2A. Steel Production (China)', 'Duration': 15, 'Category': 'Supply Chain (Steel)', 'Prereq': ['T1']},
-    {'ID': 'T3A', 'Task': '3A. Steel Shipping (China -> FIN)', 'Duration': 6, 'Category': 'Supply Chain (Steel)', 'Prereq': ['T2A']},
+# Per-stage timers and counters for this rerun (shown in the debug panel)
+profiler = start_profiler('shipyard_simulator')
 
-    # Germany Supply Chain (Engine)
-    {'ID': 'T2B', 'Task': '2B. Engine Manufacturing (Germany)', 'Duration': 25, 'Category': 'Supply Chain (Engine)', 'Prereq': ['T1']},
-    {'ID': 'T3B', 'Task': '3B. Engine Shipping (Germany -> FIN)', 'Duration': 2, 'Category': 'Supply Chain (Engine)', 'Prereq': ['T2B']},
-    
-    # Finland Shipyard (Assembly)
-    {'ID': 'T4', 'Task': '4. Hull Fabrication (Finland)', 'Duration': 20, 'Category': 'Construction (FIN)', 'Prereq': ['T3A']}, # Needs steel
-    {'ID': 'T5', 'Task': '5. Engine Installation (Finland)', 'Duration': 8, 'Category': 'Construction (FIN)', 'Prereq': ['T3B', 'T4']}, # DOMINO EFFECT: Needs engine AND hull
-    {'ID': 'T6', 'Task': '6. Outfitting & Cabins (Finland)', 'Duration': 20, 'Category': 'Outfitting (FIN)', 'Prereq': ['T5']},
-    {'ID': 'T7', 'Task': '7. Testing & Sea Trials (Finland)', 'Duration': 10, 'Category': 'Testing (FIN)', 'Prereq': ['T6']},
-]
-
-# --- 2. NEW DELAY DEFINITIONS (Mapped to new Task IDs) ---
-DELAY_DEFINITIONS = {
-    # China Supply Chain
-    'china_prod_delay': {'name': 'Delay at China Steel Mill', 'task_id': 'T2A', 'weeks': 4},
-    'china_shipping_delay': {'name': 'Delay Shipping from China (Port Strike)', 'task_id': 'T3A', 'weeks': 3},
-
-    # Germany Supply Chain
-    'germany_prod_delay': {'name': 'Delay at German Engine Plant', 'task_id': 'T2B', 'weeks': 8},
-    'germany_intermediate_delay': {'name': 'Bottleneck in Germany (Assembly)', 'task_id': 'T2B', 'multiplier': 1.25}, # 25% longer
-    'germany_shipping_delay': {'name': 'Delay Shipping from Germany', 'task_id': 'T3B', 'weeks': 1},
-
-    # Finland Shipyard
-    'finland_labor_shortage': {'name': 'Skilled Labor Shortage (Finland)', 'task_id': ['T4', 'T5', 'T6'], 'multiplier': 1.15},
-    'finland_crane_failure': {'name': 'Gantry Crane Failure (Finland)', 'task_id': 'T4', 'weeks': 3},
-    'finland_rework': {'name': 'Rework (Quality Failure)', 'task_id': 'T4', 'weeks': 2},
-
-    # Project-Wide
-    'design_flaw': {'name': '"First-in-Class" Design Flaw', 'task_id': 'T1', 'weeks': 52},
-    'major_change_order': {'name': 'Major Design Change Order', 'task_id': 'T5', 'weeks': 8}, 
-}
+# The task model, delay rules and chart builders live in supply_chain_model.py
+
+@st.cache_resource
+def get_simulation_service():
+    # One service per server process: a delay combination any planner has
+    # already run is answered from memory instead of being recomputed
+    return create_default_service().start()
+
+service = get_simulation_service()
 
 # --- 3. NEW SIDEBAR (Reflecting new model) ---
 
@@ -70,6 +46,7 @@ with st.sidebar.form(key='delay_form'):
     inputs['germany_prod_delay'] = st.checkbox("Engine Plant Production Delay (+8 wks)")
     inputs['germany_intermediate_delay'] = st.checkbox("German Assembly Bottleneck (+25% time)")
     inputs['germany_shipping_delay'] = st.checkbox("Germany Shipping Delay (+1 wk)")
+    inputs['regional_port_strike'] = st.checkbox("Regional Port Strike, All Shipping (+2 wks)")
 
     st.sidebar.subheader("3. Finland Shipyard (Internal)")
     inputs['finland_crane_failure'] = st.checkbox("Gantry Crane Failure (+3 wks)")
@@ -79,234 +56,34 @@ with st.sidebar.form(key='delay_form'):
     st.sidebar.subheader("4. Project-Wide (Planning)")
     inputs['design_flaw'] = st.checkbox('"First-in-Class" Design Flaw (+52 wks)')
     inputs['major_change_order'] = st.checkbox("Major Design Change Order (+8 wks)")
+    inputs['design_rework'] = st.checkbox("Downstream Rework from Design Flaw (+10% Finland construction, with the flaw)")
     
     submit_button = st.form_submit_button(label='Run Simulation')
 
-# --- 4. NEW CORE SIMULATION LOGIC (Handles Dependencies) ---
-
-def calculate_simulated_plan(baseline_tasks, delay_inputs):
-    """
-    Calculates the new project timeline based on selected delays.
-    This function now processes tasks based on their prerequisites,
-    simulating the "domino effect" (critical path analysis).
-    """
-    
-    tasks_to_process = copy.deepcopy(baseline_tasks)
-    completed_tasks = {}  # Stores {task_ID: end_week}
-    simulated_plan = []   # The final list of tasks with calculated dates
-    delay_log = []
-    
-    project_start_date = datetime.now().date()
-
-    # Loop until all tasks are processed
-    while tasks_to_process:
-        processed_a_task = False
-        
-        # Iterate over remaining tasks
-        for i, task in enumerate(tasks_to_process):
-            prereqs = task['Prereq']
-            
-            # Check if all prerequisites are met
-            if all(pr_id in completed_tasks for pr_id in prereqs):
-                
-                # --- This is the "Domino Effect" logic ---
-                # A task starts only after its LATEST prerequisite is finished
-                if prereqs:
-                    start_week = max(completed_tasks[pr_id] for pr_id in prereqs)
-                else:
-                    start_week = 0  # No prerequisites, start at week 0
-                
-                task['Start_Wk'] = start_week
-                original_duration = task['Duration']
-                
-                # Apply delays (multipliers and flat weeks)
-                task_specific_delay = 0
-                task_multiplier = 1.0
-                
-                for key, active in delay_inputs.items():
-                    if active:
-                        delay = DELAY_DEFINITIONS[key]
-                        task_id = delay['task_id']
-                        
-                        if (isinstance(task_id, list) and task['ID'] in task_id) or \
-                           (isinstance(task_id, str) and task['ID'] == task_id):
-                            
-                            if 'weeks' in delay:
-                                task_specific_delay += delay['weeks']
-                                delay_log.append({
-                                    'Event': delay['name'],
-                                    'Impact': f"+{delay['weeks']} weeks",
-                                    'Stage Affected': task['Task']
-                                })
-                            elif 'multiplier' in delay:
-                                task_multiplier *= delay['multiplier']
-                                delay_log.append({
-                                    'Event': delay['name'],
-                                    'Impact': f"x{delay['multiplier']} duration",
-                                    'Stage Affected': task['Task']
-                                })
-
-                # Calculate new duration and end week
-                new_duration = (original_duration * task_multiplier) + task_specific_delay
-                task['Duration'] = round(new_duration, 1)
-                task['End_Wk'] = task['Start_Wk'] + task['Duration']
-                
-                # Add friendly dates for the Gantt chart
-                task['Start_Date'] = project_start_date + timedelta(weeks=task['Start_Wk'])
-                task['End_Date'] = project_start_date + timedelta(weeks=task['End_Wk'])
-                
-                # Mark task as complete
-                completed_tasks[task['ID']] = task['End_Wk']
-                simulated_plan.append(task)
-                
-                # Remove from processing list and mark as processed
-                tasks_to_process.pop(i)
-                processed_a_task = True
-                break # Restart loop since we modified the list
-
-        if not processed_a_task and tasks_to_process:
-            # This should not happen if dependencies are correct
-            st.error("Error: Circular dependency detected in tasks!")
-            break
-            
-    # Sort the final plan by start week for the Gantt chart
-    simulated_plan.sort(key=lambda x: x['Start_Wk'])
-    
-    # Get total delay
-    if simulated_plan:
-        total_project_weeks = max(task['End_Wk'] for task in simulated_plan)
-    else:
-        total_project_weeks = 0
-
-    return simulated_plan, delay_log, total_project_weeks
-
-# --- 5. NEW VISUAL: SANKEY FLOW DIAGRAM ---
-def create_sankey_chart(simulated_plan, baseline_plan):
-    """
-    Creates a Plotly Sankey diagram to show project flow and delays.
-    Includes manual x-positioning and SHORTENED LABELS to prevent overlap.
-    """
-    
-    sim_plan_dict = {task['ID']: task for task in simulated_plan}
-    base_plan_dict = {task['ID']: task for task in baseline_plan}
-    
-    # Sankey charts use integer indices for nodes.
-    # We need to map our Task IDs (e.g., 'T1') to indices (0, 1, 2...)
-    
-    # --- FIX: Shorten labels to prevent visual overlap ---
-    labels = []
-    for task in simulated_plan:
-        # e.g., "6. Outfitting & Cabins (Finland)" -> "6. Outfitting & Cabins"
-        label_text = task['Task'].split('(')[0].strip()
-        labels.append(label_text)
-    # --- END FIX ---
-
-    label_map = {task['ID']: i for i, task in enumerate(simulated_plan)}
-    
-    sources = []
-    targets = []
-    values = []
-    
-    # Define colors based on delay
-    node_colors = []
-    for task_id, sim_task in sim_plan_dict.items():
-        base_task = base_plan_dict[task_id]
-        if sim_task['End_Wk'] > base_task['End_Wk']:
-            node_colors.append('rgba(255, 100, 100, 0.8)') # Red for delayed
-        else:
-            node_colors.append('rgba(100, 255, 100, 0.8)') # Green for on-time
-            
-    # --- Manual X-positions for nodes to prevent overlap ---
-    # These values (0.0 to 1.0) control the horizontal placement of each node
-    
-    sorted_task_ids = [task['ID'] for task in simulated_plan]
-    node_x = [0.0] * len(labels) # Initialize with dummy values
-    
-    for i, task_id in enumerate(sorted_task_ids):
-        # Map task ID to a horizontal "lane"
-        if task_id == 'T1': node_x[i] = 0.05
-        elif task_id == 'T2A': node_x[i] = 0.25
-        elif task_id == 'T3A': node_x[i] = 0.45
-        elif task_id == 'T2B': node_x[i] = 0.25
-        elif task_id == 'T3B': node_x[i] = 0.45
-        elif task_id == 'T4': node_x[i] = 0.65
-        elif task_id == 'T5': node_x[i] = 0.75
-        elif task_id == 'T6': node_x[i] = 0.85
-        elif task_id == 'T7': node_x[i] = 0.95
-
-
-    # Create the links (edges)
-    for task_id, sim_task in sim_plan_dict.items():
-        for prereq_id in sim_task['Prereq']:
-            # Ensure both source and target exist in the labels map
-            if prereq_id in label_map and task_id in label_map:
-                sources.append(label_map[prereq_id])
-                targets.append(label_map[task_id])
-                # Use the task's duration as the "value" or "flow"
-                values.append(sim_plan_dict[prereq_id]['Duration'])
-
-    # Create the Sankey figure
-    fig = go.Figure(data=[go.Sankey(
-        node=dict(
-            pad=20, # Increased padding
-            thickness=25, # Increased thickness
-            line=dict(color="black", width=0.5),
-            label=labels, # Use the new shortened labels
-            color=node_colors,
-            x=node_x, # Apply the manual x positions
-            y=[0.1, 0.0, 0.1, 0.3, 0.4, 0.2, 0.3, 0.2, 0.3] # Add manual y to further separate
-        ),
-        link=dict(
-            source=sources,
-            target=targets,
-            value=values
-        )
-    )],
-    layout=dict(
-        # Set a fixed height to ensure y-coordinates are respected
-        height=600 
-    ))
-
-    fig.update_layout(
-        title_text="Project Flow Diagram (Sankey Diagram)", 
-        font_size=12,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-    )
-    return fig
-
-
-def create_gantt_chart(plan_data, title):
-    """Creates a Plotly Gantt chart from the plan data."""
-    df = pd.DataFrame(plan_data)
-    fig = px.timeline(
-        df,
-        x_start="Start_Date",
-        x_end="End_Date",
-        y="Task", # Use the full task name here
-        color="Category",
-        title=title,
-        text="Task"
-    )
-    fig.update_yaxes(autorange="reversed")
-    fig.update_layout(
-        title_font_size=24,
-        font_size=14,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-    )
-    return fig
-
 # --- Main Page ---
 
 st.title("🚢 Shipyard Domino Effect Simulator")
 
-# Run a "clean" simulation to get the baseline end week
-baseline_plan, _, baseline_end_week = calculate_simulated_plan(BASELINE_TASKS, {})
+# Plans are dated from today, so the date is part of the shared result key;
+# the service outlives edits to the tasks and rules, so their version is too
+plan_day = str(date.today())
+model_version = scenario_key(BASELINE_TASKS, DELAY_DEFINITIONS)
+active_keys = tuple(sorted(key for key, selected in inputs.items() if selected))
+try:
+    with stage('simulation_service'):
+        # Run a "clean" simulation to get the baseline end week
+        baseline_plan, _, baseline_end_week = service.cached_compute(
+            ('supply_plan', model_version, plan_day, ()), calculate_simulated_plan, BASELINE_TASKS, {})
+        # Run simulation with user inputs
+        simulated_plan, delay_log, simulated_end_week = service.cached_compute(
+            ('supply_plan', model_version, plan_day, active_keys), calculate_simulated_plan, BASELINE_TASKS, inputs)
+except ValueError as e:
+    # This should not happen if dependencies are correct
+    st.error(f"Error: {e}")
+    st.stop()
+
 st.write(f"This tool simulates how different supply chain events can delay a **{baseline_end_week:.0f}-week** shipbuilding project. Use the sidebar to select delays and click 'Run Simulation'.")
 
-# Run simulation with user inputs
-simulated_plan, delay_log, simulated_end_week = calculate_simulated_plan(BASELINE_TASKS, inputs)
 total_delay = simulated_end_week - baseline_end_week
 
 # --- Display Results ---
@@ -331,8 +108,15 @@ st.subheader("Project Flow Diagram (The Domino Effect)")
 st.write("This diagram shows the flow of the project. Tasks turn **red** if they are delayed past their baseline finish week. This lets you trace how a single delay (e.g., in China) flows through the system to the 'Finnish Dock'.")
 
 try:
-    sankey_fig = create_sankey_chart(simulated_plan, baseline_plan)
-    st.plotly_chart(sankey_fig, use_container_width=True)
+    # The layout depends only on the network: loaded from the on-disk startup cache.
+    # Built in BASELINE_TASKS order, since simulated_plan's order changes with the scenario
+    task_ids = [task['ID'] for task in BASELINE_TASKS]
+    task_prereqs = [task['Prereq'] for task in BASELINE_TASKS]
+    sankey_positions = load_or_build('sankey_layout', [LAYOUT_VERSION, task_ids, task_prereqs],
+                                     lambda: sankey_layout(task_ids, task_prereqs, reduce=True))
+    sankey_fig = create_sankey_chart(simulated_plan, baseline_plan, sankey_positions)
+    with stage('render_sankey'):
+        st.plotly_chart(sankey_fig, use_container_width=True)
 except Exception as e:
     st.error(f"An unexpected error occurred while rendering the flow diagram: {e}")
 
@@ -343,7 +127,8 @@ st.write("The top chart is the 'perfect world' plan. The bottom chart shows the
 # Create and display the simulated chart
 sim_fig = create_gantt_chart(simulated_plan, "Simulated Project Timeline (With Delays)")
 sim_fig.update_layout(height=400)
-st.plotly_chart(sim_fig, use_container_width=True)
+with stage('render_gantt'):
+    st.plotly_chart(sim_fig, use_container_width=True)
 
 # Show baseline chart in an expander
 with st.expander("Show Baseline Project Timeline (No Delays)"):
@@ -359,3 +144,46 @@ else:
     st.write("The following events were triggered, causing the delays shown above:")
     st.dataframe(pd.DataFrame(delay_log), use_container_width=True)
 
+if simulated_end_week > baseline_end_week:
+    with st.expander("🧩 Delay Attribution: Weeks of Slip per Selected Event"), stage('delay_attribution'):
+        st.caption("Shares add up to the total slip. Events that overlap on parallel supply lines split the weeks they cause together; triggered follow-on events count towards the event that set them off.")
+        attribution_rows = service.cached_compute(('delay_attribution', model_version, active_keys), attribute_simulated_delay, BASELINE_TASKS, inputs)
+        st.dataframe(pd.DataFrame(attribution_rows), use_container_width=True, hide_index=True)
+
+# --- Supply Network (Multi-Echelon) ---
+st.subheader("Supply Network: Critical Route & Buffers")
+st.write("Behind the steel and engine legs sits a network of tiered suppliers, alternative sources and transport legs. The solver picks the source with the earliest committed arrival for every requirement, traces the route that drives material readiness at the yard, and sizes the safety buffer each tier needs.")
+
+net_col1, net_col2 = st.columns(2)
+service_level = net_col1.slider("Service Level", min_value=0.80, max_value=0.99, value=0.95, step=0.01)
+unavailable = net_col2.multiselect(
+    "Unavailable Sources",
+    options=[node_id for node_id, node in SUPPLY_NETWORK.items() if node['kind'] != 'yard'],
+    format_func=lambda node_id: SUPPLY_NETWORK[node_id]['label'],
+)
+network = {node_id: dict(node, available=node_id not in unavailable) for node_id, node in SUPPLY_NETWORK.items()}
+supply_result = solve_supply_network(network, 'FIN_Yard', service_level)
+
+if supply_result['arrival']['FIN_Yard'] == float('inf'):
+    st.error("No available source for at least one requirement. Materials never arrive at the yard.")
+else:
+    s1, s2, s3 = st.columns(3)
+    s1.metric("Materials Ready (Mean)", f"Week {supply_result['arrival']['FIN_Yard']:.1f}")
+    s2.metric(f"Committed ({service_level:.0%} Service)", f"Week {supply_result['committed']['FIN_Yard']:.1f}")
+    s3.metric("Pooled Route Buffer", f"{supply_result['project_buffer']:.1f} Weeks")
+
+    st.write("**Delivery-critical route:** " + " <- ".join(SUPPLY_NETWORK[node_id]['label'] for node_id in supply_result['route']))
+    st.dataframe(pd.DataFrame(supply_result['tiers']), use_container_width=True)
+    if supply_result['feeding']:
+        st.write("Feeding buffers where other inputs join the critical route:")
+        st.dataframe(pd.DataFrame(supply_result['feeding']), use_container_width=True)
+
+# --- Debug Panel (stage timings for this rerun) ---
+if st.sidebar.checkbox("🐞 Show Debug Timings", key='show_debug'):
+    with st.expander("🐞 Debug: Stage Timings", expanded=True):
+        st.dataframe(pd.DataFrame(profiler.stage_totals()), use_container_width=True)
+        st.write("**Counters**")
+        st.json(profiler.counters)
+        st.write("**Shared Simulation Service**")
+        st.json(service.stats)
+
@@ -1,272 +1,73 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import networkx as nx
 import copy
+import os
+import shutil
+import tempfile
+from pyramid_model import INITIAL_NODES, DISRUPTIONS, calculate_schedule, apply_schedule, compile_nodes, compile_pyramid_hierarchy, get_pyramid_layout, build_pyramid_figure, plan_recovery, attribute_delivery_slip, plan_mitigations, delay_impact, build_delay_impact_figure, LAYOUT_VERSION
+from simulation_service import create_default_service
+from monte_carlo import run_monte_carlo, triangular_sampler
+from disruptions import compile_disruptions, disruption_sampler, disruption_rows
+from result_store import ResultStore
+from progress import ProgressTracker
+from schedule_diff import nodes_frame, diff_schedules
+from graph_validation import validate_graph
+from hierarchy import rollup_schedule, update_rollup, changed_nodes, summary_nodes
+from data_table import node_table, table_rows, table_page, page_count, SORT_COLUMNS, DELAY_STATUS
+from startup_cache import lazy_import, load_or_build
+from profiling import start_profiler, stage
+
+pd = lazy_import('pandas')  # first needed for the tables below the pyramid
 
 # --- APP CONFIG ---
 st.set_page_config(page_title="Shipyard Pyramid Simulator", layout="wide", page_icon="🏗️")
 
-# --- DATA MODEL: THE AGENTS ---
-INITIAL_NODES = {
-    # --- LEVEL 1: PROCUREMENT & SUPPLIERS (BASE OF PYRAMID) ---
-    'Pur_Weld_Eq': {'label': 'Welding Eq. Supplier', 'duration': 30, 'type': 'Procurement'},
-    'Pur_Profiles': {'label': 'Steel Profiles Supplier', 'duration': 30, 'type': 'Procurement'},
-    'Pur_Plates': {'label': 'Steel Plates Supplier', 'duration': 30, 'type': 'Procurement'},
-    'Pur_Pumps': {'label': 'Pump Supplier', 'duration': 180, 'type': 'Procurement'}, # 6 months
-    'Pur_Oil': {'label': 'Oil Supplier', 'duration': 30, 'type': 'Procurement'},
-    'Pur_FuelTanks': {'label': 'Fuel Tank Supplier', 'duration': 120, 'type': 'Procurement'}, # 4 months
-    'Pur_Engine': {'label': 'Diesel Engine Supplier', 'duration': 240, 'type': 'Procurement'}, # 8 months
-    'Pur_Gens': {'label': 'Aux Generator Supplier', 'duration': 300, 'type': 'Procurement'}, # 10 months
-    'Pur_Furniture': {'label': 'Furniture Supplier', 'duration': 300, 'type': 'Procurement'}, # 10 months
-
-    # --- LEVEL 2: PREPARATION & SUB-ASSEMBLY ---
-    'Steel_Prep': {'label': 'Steel Preparation', 'duration': 120, 'type': 'Construction', 'prereqs': ['Pur_Weld_Eq', 'Pur_Profiles', 'Pur_Plates']},
-    'Engine_Prep': {'label': 'Engine Room Prep', 'duration': 21, 'type': 'Outfitting', 'prereqs': ['Pur_Engine']}, # 3 weeks
-
-    # --- LEVEL 3: ASSEMBLY & INSTALLATION ---
-    'Panel_Assy': {'label': 'Panel Assembly', 'duration': 180, 'type': 'Construction', 'prereqs': ['Steel_Prep']},
-    'Mount_Engine': {'label': 'Mounting Engine', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Engine_Prep']},
-    'Shaft_Install': {'label': 'Shaft Installation', 'duration': 21, 'type': 'Outfitting', 'prereqs': ['Engine_Prep']},
-    
-    # --- LEVEL 4: BLOCK STAGES ---
-    'Block_Assy': {'label': 'Block Assembly', 'duration': 180, 'type': 'Construction', 'prereqs': ['Panel_Assy']},
-    'Fuel_Sys': {'label': 'Fuel System Install', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Pur_Pumps', 'Pur_Oil', 'Pur_FuelTanks']},
-    'Aux_Mach': {'label': 'Aux Machinery Install', 'duration': 21, 'type': 'Outfitting', 'prereqs': ['Pur_Gens', 'Shaft_Install']},
-
-    # --- LEVEL 5: INTEGRATION ---
-    'Block_Out': {'label': 'Block Outfitting', 'duration': 270, 'type': 'Construction', 'prereqs': ['Block_Assy']},
-    'Piping': {'label': 'Piping Installation', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Mount_Engine', 'Fuel_Sys']}, # 4 weeks
-    
-    # --- LEVEL 6: ERECTION & CABLING ---
-    'Dock_Erect': {'label': 'Dockyard Erection', 'duration': 135, 'type': 'Construction', 'prereqs': ['Block_Out']},
-    'Elec_Cable': {'label': 'Electrical Cabling', 'duration': 42, 'type': 'Outfitting', 'prereqs': ['Piping']}, # 6 weeks
-    
-    # --- LEVEL 7: HULL COMPLETION & VENTILATION ---
-    'Hull_Comp': {'label': 'Hull Completion', 'duration': 60, 'type': 'Construction', 'prereqs': ['Dock_Erect']},
-    'Ventilation': {'label': 'Ventilation Systems', 'duration': 30, 'type': 'Outfitting', 'prereqs': ['Elec_Cable']},
+MITIGATION_WORKERS = min(4, os.cpu_count() or 1)  # processes scoring portfolios in the optimizer
 
-    # --- LEVEL 8: INSULATION & OUTFITTING ---
-    'Outfitting_Hull': {'label': 'General Outfitting', 'duration': 14, 'type': 'Construction', 'prereqs': ['Hull_Comp']},
-    'Insulation': {'label': 'Insulation/Fireproofing', 'duration': 30, 'type': 'Outfitting', 'prereqs': ['Ventilation']},
+# Per-stage timers and counters for this rerun (shown in the debug panel)
+profiler = start_profiler('shipyard_simulator_2')
 
-    # --- LEVEL 9: INTERIOR ---
-    'Interior_Str': {'label': 'Interior Structure', 'duration': 30, 'type': 'Outfitting', 'prereqs': ['Insulation', 'Pur_Furniture', 'Outfitting_Hull']}, # Merges Hull and Outfitting streams
-    
-    # --- LEVEL 10: FITTINGS ---
-    'Fittings': {'label': 'Fittings & Furniture', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Interior_Str']},
-    
-    # --- LEVEL 11: PAINTING ---
-    'Painting': {'label': 'Painting', 'duration': 28, 'type': 'Outfitting', 'prereqs': ['Fittings']},
+@st.cache_resource
+def get_simulation_service():
+    # One service per server process: the compiled graph, baseline and every
+    # scenario already computed are shared by all browser sessions
+    return create_default_service().start()
 
-    # --- LEVEL 12: TESTING (START OF FINAL STAGE) ---
-    'Stage4_Start': {'label': 'Ready for Testing', 'duration': 0, 'type': 'Milestone', 'prereqs': ['Painting']},
-    'Sys_Check': {'label': 'System Check', 'duration': 21, 'type': 'Testing', 'prereqs': ['Stage4_Start']},
-    'Final_Clean': {'label': 'Final Cleaning', 'duration': 30, 'type': 'Testing', 'prereqs': ['Stage4_Start']},
-
-    # --- LEVEL 13: TRIALS ---
-    'Harbour_Trials': {'label': 'Harbour Trials', 'duration': 14, 'type': 'Testing', 'prereqs': ['Sys_Check', 'Final_Clean']}, # 2 weeks (implied)
-    
-    # --- LEVEL 14: SEA TRIALS ---
-    'Sea_Trials': {'label': 'Sea Trials', 'duration': 14, 'type': 'Testing', 'prereqs': ['Harbour_Trials']},
-    
-    # --- LEVEL 15: PERFORMANCE ---
-    'Perf_Test': {'label': 'Performance Testing', 'duration': 14, 'type': 'Testing', 'prereqs': ['Sea_Trials']},
-    
-    # --- LEVEL 16: CERTIFICATION ---
-    'Cert': {'label': 'Certification', 'duration': 14, 'type': 'Testing', 'prereqs': ['Perf_Test']},
-    
-    # --- LEVEL 17: INSPECTION ---
-    'Final_Insp': {'label': 'Final Inspection', 'duration': 5, 'type': 'Testing', 'prereqs': ['Cert']},
-    
-    # --- LEVEL 18: DELIVERY (PEAK OF PYRAMID) ---
-    'Delivery': {'label': '🚢 DELIVERY', 'duration': 5, 'type': 'Delivery', 'prereqs': ['Final_Insp']},
-}
-
-# --- HELPER FUNCTIONS ---
-
-def calculate_schedule(nodes_data):
-    """
-    Topological sort calculation to determine start/end dates for all agents.
-    """
-    for node_id in nodes_data:
-        nodes_data[node_id]['start_day'] = 0
-        nodes_data[node_id]['end_day'] = 0
-    
-    changed = True
-    while changed:
-        changed = False
-        for node_id, node in nodes_data.items():
-            max_prereq_end = 0
-            if 'prereqs' in node:
-                for prereq in node['prereqs']:
-                    if nodes_data[prereq]['end_day'] > max_prereq_end:
-                        max_prereq_end = nodes_data[prereq]['end_day']
-            
-            if node['start_day'] != max_prereq_end:
-                node['start_day'] = max_prereq_end
-                changed = True
-            
-            new_end = node['start_day'] + node['duration'] + node.get('delay', 0)
-            if node['end_day'] != new_end:
-                node['end_day'] = new_end
-                changed = True
-                
-    return nodes_data
-
-def get_pyramid_layout(nodes_data):
-    """
-    Calculates X, Y coordinates to enforce a Pyramid shape.
-    """
-    G = nx.DiGraph()
-    for node_id, node in nodes_data.items():
-        G.add_node(node_id)
-        if 'prereqs' in node:
-            for pr in node['prereqs']:
-                G.add_edge(pr, node_id)
-    
-    levels = {}
-    max_level = 0
-    for node in G.nodes():
-        try:
-            length = nx.shortest_path_length(G, source=node, target='Delivery')
-            levels[node] = length
-            if length > max_level:
-                max_level = length
-        except nx.NetworkXNoPath:
-             levels[node] = 0
-
-    nodes_by_level = {}
-    for node, level in levels.items():
-        if level not in nodes_by_level:
-            nodes_by_level[level] = []
-        nodes_by_level[level].append(node)
-        
-    pos = {}
-    for level, level_nodes in nodes_by_level.items():
-        level_nodes.sort() 
-        count = len(level_nodes)
-        y = max_level - level
-        for i, node_id in enumerate(level_nodes):
-            x = i - (count - 1) / 2
-            x *= 2.0 
-            pos[node_id] = (x, y)
-            
-    return pos
+service = get_simulation_service()
 
 # --- STATE MANAGEMENT ---
 
 if 'nodes' not in st.session_state:
     st.session_state['nodes'] = copy.deepcopy(INITIAL_NODES)
 
+# Actuals per agent: {node_id: {'actual_start', 'actual_finish', 'percent_complete'}}
+if 'progress' not in st.session_state:
+    st.session_state['progress'] = {}
+
+# Saved plan snapshots for the version compare: {name: plan frame}
+if 'versions' not in st.session_state:
+    st.session_state['versions'] = {}
+
 # Default selection if none exists
 if 'selected_agent_id' not in st.session_state:
     st.session_state['selected_agent_id'] = 'Delivery'
 
 # --- MAIN CALCULATION (Run BEFORE Sidebar) ---
 
-calculated_nodes = calculate_schedule(st.session_state['nodes'])
-baseline_nodes = calculate_schedule(copy.deepcopy(INITIAL_NODES))
+delays = {node_id: node.get('delay', 0) for node_id, node in st.session_state['nodes'].items()}
+with stage('simulation_service'):
+    scenario = service.cached_schedule('pyramid', delays)
+    baseline = service.cached_schedule('pyramid')
+calculated_nodes = apply_schedule(st.session_state['nodes'], scenario)
+baseline_nodes = apply_schedule(copy.deepcopy(INITIAL_NODES), baseline)
 
 total_duration = calculated_nodes['Delivery']['end_day']
 baseline_duration = baseline_nodes['Delivery']['end_day']
 total_delay = total_duration - baseline_duration
 
 # --- LAYOUT CALCULATION ---
-pos = get_pyramid_layout(calculated_nodes)
-
-# Create Plotly traces
-edge_x = []
-edge_y = []
-for node_id, node in calculated_nodes.items():
-    if 'prereqs' in node:
-        for pr in node['prereqs']:
-            x0, y0 = pos[pr]
-            x1, y1 = pos[node_id]
-            edge_x.extend([x0, x1, None])
-            edge_y.extend([y0, y1, None])
-
-# Node data preparation for Plotly
-ordered_node_ids = list(pos.keys()) # Keep order for click mapping
-node_x = []
-node_y = []
-node_text = []
-node_color = []
-node_size = []
-
-for node_id in ordered_node_ids:
-    x, y = pos[node_id]
-    node = calculated_nodes[node_id]
-    
-    base_end_day = baseline_nodes[node_id]['end_day']
-    actual_end_day = node['end_day']
-    
-    is_delayed_impact = actual_end_day > base_end_day
-    added_delay = node.get('delay', 0)
-    
-    node_x.append(x)
-    node_y.append(y)
-    
-    info = (f"<b>{node['label']}</b><br>"
-            f"End: Day {actual_end_day} (Plan: {base_end_day})<br>"
-            f"Direct Delay Added: {added_delay} days")
-    node_text.append(info)
-    
-    # Color logic
-    if node_id == st.session_state['selected_agent_id']:
-        node_color.append('#FFFF00') # Yellow for selected
-        node_size.append(30) # Bigger for selected
-    elif is_delayed_impact:
-        node_color.append('#FF4B4B') # Red for delayed
-        node_size.append(20)
-    elif node['type'] == 'Delivery':
-        node_color.append('#00FF00') # Green for Delivery
-        node_size.append(30)
-    elif node['type'] == 'Procurement':
-        node_color.append('#1f77b4') # Blue for Procurement
-        node_size.append(15)
-    else:
-        node_color.append('#DDDDDD') # Grey for others
-        node_size.append(15)
-
-# Draw Figure
-fig = go.Figure()
-
-# Edges (Lines)
-fig.add_trace(go.Scatter(
-    x=edge_x, y=edge_y,
-    line=dict(width=1, color='#888'),
-    hoverinfo='none',
-    mode='lines'
-))
-
-# Nodes (Dots)
-fig.add_trace(go.Scatter(
-    x=node_x, y=node_y,
-    mode='markers+text',
-    text=[calculated_nodes[nid]['label'] for nid in ordered_node_ids],
-    textposition="top center",
-    hoverinfo='text',
-    hovertext=node_text,
-    marker=dict(
-        showscale=False,
-        color=node_color,
-        size=node_size,
-        line_width=2
-    )
-))
-
-fig.update_layout(
-    title="Construction Pyramid (Click a node to Edit)",
-    showlegend=False,
-    hovermode='closest',
-    margin=dict(b=0,l=0,r=0,t=40),
-    xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-    yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-    height=700,
-    plot_bgcolor='rgba(0,0,0,0)',
-    clickmode='event+select' # Enable clicking
-)
+# Positions depend only on the network: loaded from the on-disk startup cache
+network = {node_id: node.get('prereqs', []) for node_id, node in calculated_nodes.items()}
+pos = load_or_build('pyramid_layout', [LAYOUT_VERSION, network], lambda: get_pyramid_layout(calculated_nodes))
 
 # --- DASHBOARD HEADER ---
 
@@ -282,8 +83,39 @@ m3.metric("Critical Path Agent", f"{st.session_state['nodes'][st.session_state['
 
 # --- VISUALIZATION RENDER ---
 
+# Summary view: collapsed Zones / Systems / Blocks with rolled-up dates; only
+# the visible items are laid out and drawn
+summary_view = st.toggle("🗂️ Summary View: Zones / Systems / Blocks (click a group to expand it)", key='summary_view')
+if summary_view:
+    with stage('summary_view'):
+        hierarchy = service.cached_compute(('pyramid_hierarchy',), compile_pyramid_hierarchy, INITIAL_NODES)
+        rollup_state = st.session_state.get('rollup')
+        if rollup_state is None:
+            rollup_state = {'schedule': scenario, 'rollup': rollup_schedule(hierarchy, scenario)}
+        elif rollup_state['schedule'] is not scenario:
+            # delay edits: only the groups above the agents that moved are recomputed
+            update_rollup(hierarchy, rollup_state['rollup'], scenario, changed_nodes(rollup_state['schedule'], scenario))
+            rollup_state['schedule'] = scenario
+        st.session_state['rollup'] = rollup_state
+        baseline_rollup = service.cached_compute(('pyramid_rollup', 'baseline'), rollup_schedule, hierarchy, baseline)
+
+        expanded = st.session_state.get('expanded_groups', [])
+        view_nodes = summary_nodes(hierarchy, calculated_nodes, rollup_state['rollup'], expanded)
+        view_baseline = summary_nodes(hierarchy, baseline_nodes, baseline_rollup, expanded)
+        view_network = {node_id: node['prereqs'] for node_id, node in view_nodes.items()}
+        view_pos = load_or_build('pyramid_layout', [LAYOUT_VERSION, view_network], lambda: get_pyramid_layout(view_nodes))
+        fig, ordered_node_ids = build_pyramid_figure(view_nodes, view_baseline, view_pos, st.session_state['selected_agent_id'])
+else:
+    fig, ordered_node_ids = build_pyramid_figure(
+        calculated_nodes, baseline_nodes, pos, st.session_state['selected_agent_id']
+    )
+
 # Render Chart and Capture Click Events
-event = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points")
+with stage('render_pyramid'):
+    # in the summary view a new chart (and selection) per set of expanded groups,
+    # so a click is never read against the points of the previous view
+    chart_key = 'pyramid_' + '|'.join(expanded) if summary_view else None
+    event = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key=chart_key)
 
 # Handle Click Event
 if event and event['selection']['points']:
@@ -292,17 +124,47 @@ if event and event['selection']['points']:
     # Map index back to Node ID using the ordered list we used for plotting
     clicked_node_id = ordered_node_ids[clicked_point_index]
     
+    # A summary group opens up instead of being selected
+    if summary_view and clicked_node_id in hierarchy['index'] and clicked_node_id not in expanded:
+        st.session_state['expanded_groups'] = st.session_state.get('expanded_groups', []) + [clicked_node_id]
+        st.rerun()
+
     # Update Session State if different
     if clicked_node_id != st.session_state['selected_agent_id']:
         st.session_state['selected_agent_id'] = clicked_node_id
         st.rerun()
 
+if summary_view:
+    st.multiselect("Expanded Groups", hierarchy['group_ids'], key='expanded_groups',
+                   format_func=lambda group_id: hierarchy['groups'][group_id]['label'],
+                   help="Remove a group to collapse it again.")
+
+# --- RECOVERY PLAN (EXPEDITING) ---
+# Cheapest set of duration reductions that brings Delivery back to the baseline day
+if total_delay > 0:
+    with st.expander(f"🛠️ Recovery Plan: Cheapest Way to Win Back {total_delay} Days", expanded=True):
+        recovery_rows, recovery = plan_recovery(st.session_state['nodes'], baseline_duration)
+        if recovery['met']:
+            st.success(f"Delivery back on Day {baseline_duration} by expediting {len(recovery_rows)} agents for a total of {recovery['cost']:,.0f}.")
+        else:
+            st.warning(f"Expediting limits reached: best achievable Delivery is Day {recovery['end']} (cost {recovery['cost']:,.0f}).")
+        if recovery_rows:
+            st.dataframe(pd.DataFrame(recovery_rows), use_container_width=True)
+
+# --- DELAY ATTRIBUTION ---
+# Which of the added delays the Delivery slip is actually due to
+if total_delay > 0:
+    with st.expander(f"🧩 Delay Attribution: Who Is Responsible for the {total_delay} Days?"), stage('delay_attribution'):
+        st.caption("Shares add up to the total slip. Delays that overlap on parallel paths split the days they cause together; delays absorbed by float get none.")
+        st.dataframe(pd.DataFrame(attribute_delivery_slip(st.session_state['nodes'])), use_container_width=True, hide_index=True)
+
 # --- SIDEBAR: AGENT EDITOR ---
 
 st.sidebar.title("🛠️ Agent Editor")
 
 if st.sidebar.button("⚠️ Reset All Agents"):
     st.session_state['nodes'] = copy.deepcopy(INITIAL_NODES)
+    st.session_state['progress'] = {}
     st.rerun()
 
 st.sidebar.markdown("### Selected Agent")
@@ -347,16 +209,245 @@ if new_delay != current_delay:
     st.session_state['nodes'][selected_id]['delay'] = new_delay
     st.rerun()
 
+# What-if curve: Delivery day for every added delay on this agent at once
+st.sidebar.markdown("##### 📈 Delivery Impact")
+impact_range = st.sidebar.slider("Preview Range (Days)", 30, 360, 120, step=30, key='impact_range')
+with stage('delay_impact'):
+    impact = service.cached_compute(('delay_impact', delays, selected_id, impact_range),
+                                    delay_impact, calculated_nodes, selected_id, impact_range)
+st.sidebar.plotly_chart(build_delay_impact_figure(impact, current_delay), use_container_width=True,
+                        config={'displayModeBar': False})
+if impact['break_even'] is None:
+    st.sidebar.caption("Delays on this agent never reach Delivery.")
+elif impact['break_even'] > impact_range:
+    st.sidebar.caption(f"Absorbs more than {impact_range} days (break-even: {impact['break_even']} days).")
+else:
+    st.sidebar.caption(f"Break-even: {impact['break_even']} days. Every day beyond that pushes Delivery.")
+
+# Input: Progress (actuals recorded for this agent)
+st.sidebar.markdown("##### 📅 Progress")
+agent_progress = st.session_state['progress'].get(selected_id, {})
+col_p1, col_p2 = st.sidebar.columns(2)
+actual_start = col_p1.number_input("Actual Start (Day)", min_value=0, value=agent_progress.get('actual_start'), step=1,
+                                   placeholder="not started", key=f"actual_start_{selected_id}")
+actual_finish = col_p2.number_input("Actual Finish (Day)", min_value=0, value=agent_progress.get('actual_finish'), step=1,
+                                    placeholder="open", key=f"actual_finish_{selected_id}")
+percent_complete = st.sidebar.slider("% Complete", 0, 100, agent_progress.get('percent_complete', 0), step=5,
+                                     key=f"percent_{selected_id}")
+new_progress = {key: value for key, value in (('actual_start', actual_start), ('actual_finish', actual_finish))
+                if value is not None}
+if percent_complete:
+    new_progress['percent_complete'] = percent_complete
+if new_progress:
+    st.session_state['progress'][selected_id] = new_progress
+else:
+    st.session_state['progress'].pop(selected_id, None)
+
 # Reset Agent Button
 if st.sidebar.button("Reset Agent", key=f"btn_reset_{selected_id}"):
     st.session_state['nodes'][selected_id]['delay'] = 0
+    st.session_state['progress'].pop(selected_id, None)
     st.rerun()
 
+# --- PROGRESS & RE-FORECAST ---
+# Finished work keeps its actual dates; the rest is re-planned from the status day
+with st.expander("📅 Progress & Re-forecast from Status Day"), stage('progress_forecast'):
+    status_day = st.number_input("Status Day", min_value=0, step=7, key='status_day')
+    progress_ids, progress_graph, progress_durations = compile_nodes(st.session_state['nodes'])
+    progress = st.session_state['progress']
+    tracked = st.session_state.get('progress_tracker')
+    if (tracked is None or tracked['durations'] != progress_durations
+            or any(not set(values) <= set(progress.get(node_id, {})) for node_id, values in tracked['applied'].items())):
+        # first run, a delay edit or cleared actuals: start again from the plan
+        tracked = {'tracker': ProgressTracker(progress_graph, progress_durations, status_day),
+                   'durations': progress_durations, 'applied': {}}
+    tracker = tracked['tracker']
+    if tracker.status_date != status_day:
+        tracker.set_status_date(status_day)
+    # only the agents whose actuals changed since the last rerun are re-pinned
+    new_events = [{'node': node_id, **values} for node_id, values in progress.items() if tracked['applied'].get(node_id) != values]
+    if new_events:
+        tracker.apply_events(new_events)
+    tracked['applied'] = {node_id: dict(values) for node_id, values in progress.items()}
+    st.session_state['progress_tracker'] = tracked
+    forecast = tracker.forecast()
+
+    statuses = [tracker.status(i) for i in range(len(progress_ids))]
+    f1, f2, f3 = st.columns(3)
+    f1.metric("Forecast Delivery", f"Day {forecast['end']:.0f}", delta=f"{forecast['end'] - total_duration:.0f} Days vs Plan", delta_color="inverse")
+    f2.metric("Agents Finished", statuses.count('Finished'))
+    f3.metric("Agents In Progress", statuses.count('In Progress'))
+
+    df_forecast = pd.DataFrame({
+        'Agent': [st.session_state['nodes'][node_id]['label'] for node_id in progress_ids],
+        'Status': statuses,
+        '% Complete': [st.session_state['progress'].get(node_id, {}).get('percent_complete', 0) for node_id in progress_ids],
+        'Forecast Start': forecast['start'],
+        'Forecast Finish': forecast['finish'],
+        'Total Float': [ls - es for ls, es in zip(forecast['late_start'], forecast['start'])],
+    }).sort_values('Forecast Finish')
+    st.dataframe(df_forecast.round(1), use_container_width=True, hide_index=True)
+
+# --- VERSION COMPARE (SCHEDULE DIFF) ---
+# Saved snapshots of the plan can be diffed against each other or the baseline
+with st.expander("🔀 Compare Plan Versions"), stage('schedule_diff'):
+    v1, v2 = st.columns([3, 1])
+    version_name = v1.text_input("Version Name", value=f"Version {len(st.session_state['versions']) + 1}")
+    if v2.button("💾 Save Current Plan"):
+        st.session_state['versions'][version_name] = nodes_frame(calculated_nodes)
+        st.toast(f"Saved '{version_name}'")
+
+    versions = {'Baseline': nodes_frame(baseline_nodes), 'Current Plan': nodes_frame(calculated_nodes), **st.session_state['versions']}
+    c1, c2 = st.columns(2)
+    old_version = c1.selectbox("Compare From", list(versions), index=0)
+    new_version = c2.selectbox("Compare To", list(versions), index=1)
+    diff, diff_summary = diff_schedules(versions[old_version], versions[new_version])
+
+    d1, d2, d3, d4 = st.columns(4)
+    d1.metric("Delivery", f"Day {diff_summary['end_new']:.0f}", delta=f"{diff_summary['end_delta']:.0f} Days", delta_color="inverse")
+    d2.metric("Agents Moved", diff_summary['moved'])
+    d3.metric("Float Lost / Gained", f"{diff_summary['float_lost']} / {diff_summary['float_gained']}")
+    d4.metric("Critical Path In / Out", f"{diff_summary['became_critical']} / {diff_summary['left_critical']}")
+
+    show_changes = st.multiselect("Show Changes", ['Moved', 'Changed Duration', 'Added', 'Removed', 'Unchanged'],
+                                  default=['Moved', 'Changed Duration', 'Added', 'Removed'])
+    view = diff[diff['change'].isin(show_changes)]
+    if st.checkbox("Only Critical Path Changes"):
+        view = view[view['critical_change'] != '']
+    st.dataframe(view[['label', 'change', 'critical_change', 'start_old', 'start_new', 'start_delta',
+                       'finish_old', 'finish_new', 'finish_delta', 'total_float_delta']].round(1), use_container_width=True)
+
+# --- GRAPH CHECK (VALIDATION & NORMALIZATION) ---
+# Structural problems in the network and the links the service could drop
+with st.expander("🧹 Graph Check: Network Validation"), stage('graph_check'):
+    node_ids = list(st.session_state['nodes'])
+    graph_report = validate_graph(node_ids, [st.session_state['nodes'][nid].get('prereqs', []) for nid in node_ids], targets=['Delivery'])
+    normalization = service.projects['pyramid']['normalization']
+    g1, g2, g3 = st.columns(3)
+    g1.metric("Links", graph_report['links'])
+    g2.metric("Redundant Links Removed", normalization['duplicates_removed'] + normalization['redundant_removed'],
+              delta=f"-{normalization['saved_pct']:.0f}% Links", delta_color="off")
+    g3.metric("Schedulable", "Yes" if graph_report['ok'] else "No")
+
+    issues = [
+        ("Circular dependencies", [' -> '.join(group) for group in graph_report['cycles']]),
+        ("Unknown prerequisites", [f"{node} needs {pred}" for node, pred in graph_report['unknown']]),
+        ("Duplicate links", [f"{node} <- {pred}" for node, pred in graph_report['duplicates']]),
+        ("Orphan agents", graph_report['orphans']),
+        ("End points other than Delivery", graph_report['unreachable_sinks']),
+        ("Agents that never reach Delivery", graph_report['dead_ends']),
+    ]
+    found = False
+    for title, items in issues:
+        if items:
+            found = True
+            st.warning(f"**{title}:** {', '.join(items)}")
+    if not found:
+        st.success("No structural issues found.")
+
 # --- DETAILED DATA VIEW ---
-with st.expander("📊 View Detailed Data Table"):
-    df_nodes = pd.DataFrame.from_dict(calculated_nodes, orient='index')
-    if 'delay' not in df_nodes.columns:
-        df_nodes['delay'] = 0
-    df_nodes = df_nodes[['label', 'type', 'duration', 'delay', 'start_day', 'end_day']]
-    df_nodes = df_nodes.sort_values(by='end_day')
-    st.dataframe(df_nodes, use_container_width=True)
\ No newline at end of file
+# Built only while switched on (once per scenario, shared through the
+# service); sorting, filtering and paging run server-side, so only the rows
+# of one page are sent to the browser
+if st.toggle("📊 Show Detailed Data Table", key='show_table'):
+    with st.container(border=True), stage('detailed_table'):
+        table = service.cached_compute(('node_table', delays), node_table, calculated_nodes)
+        t1, t2, t3, t4 = st.columns(4)
+        sort_by = t1.selectbox("Sort By", SORT_COLUMNS, key='table_sort')
+        descending = t1.checkbox("Descending", key='table_descending')
+        types = t2.multiselect("Type", sorted(table['frame']['type'].unique()), key='table_types')
+        delay_status = t3.radio("Delay", DELAY_STATUS, horizontal=True, key='table_delay')
+        max_float = t4.number_input("Max Total Float (Days)", min_value=0, value=None, step=7, key='table_float')
+        rows = table_rows(table, sort_by, descending, types or None, delay_status, max_float)
+
+        p1, p2, p3 = st.columns([1, 1, 2])
+        page_size = p1.selectbox("Rows per Page", [25, 100, 500], index=1, key='table_page_size')
+        pages = page_count(rows, page_size)
+        st.session_state['table_page'] = min(st.session_state.get('table_page', 1), pages)
+        page = p2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key='table_page')
+        p3.caption(f"{len(rows)} of {len(table['frame'])} agents match the filters")
+        st.dataframe(table_page(table, rows, page, page_size), use_container_width=True)
+
+# --- RISK RUN (MONTE CARLO) ---
+# Samples go to a memory-mapped store on disk; only the summaries and the
+# rows on screen are read back into memory
+with st.expander("🎲 Risk Run: Monte Carlo Delivery Forecast"):
+    rc1, rc2 = st.columns(2)
+    iterations = rc1.select_slider("Iterations", options=[1000, 10000, 50000, 100000], value=10000)
+    overrun_tail = rc2.slider("Overrun Tail (% of Duration)", 0, 100, 30)
+    include_disruptions = st.checkbox("Include Supplier Disruptions (strikes, shutdowns, rejects)", key='risk_disruptions')
+    if st.button("Run Risk Analysis"):
+        old_store = st.session_state.pop('risk_store', None)
+        if old_store:
+            shutil.rmtree(old_store, ignore_errors=True)
+        risk_path = tempfile.mkdtemp(prefix='shipyard_risk_')
+        risk_ids, risk_graph, risk_durations = compile_nodes(st.session_state['nodes'])
+        sampler = triangular_sampler(0.1, overrun_tail / 100)
+        if include_disruptions:
+            disruption_model = compile_disruptions(DISRUPTIONS, risk_graph, risk_durations,
+                                                   [st.session_state['nodes'][node_id] for node_id in risk_ids])
+            tally = {}
+            sampler = disruption_sampler(disruption_model, sampler, tally)
+        run_monte_carlo(risk_graph, risk_durations, iterations, store_path=risk_path, sampler=sampler)
+        st.session_state['risk_store'] = risk_path
+        st.session_state['risk_disruption_rows'] = disruption_rows(disruption_model, tally) if include_disruptions else []
+
+    if 'risk_store' in st.session_state:
+        with stage('risk_summary'):
+            store = ResultStore(st.session_state['risk_store'])
+            labels = [st.session_state['nodes'][node_id]['label'] for node_id in store.node_ids]
+            p50, p80, p90 = store.percentiles('finish', [50, 80, 90], nodes=['Delivery'])[:, 0]
+            k1, k2, k3 = st.columns(3)
+            k1.metric("P50 Delivery", f"Day {p50:.0f}")
+            k2.metric("P80 Delivery", f"Day {p80:.0f}", delta=f"{p80 - baseline_duration:.0f} Days vs Baseline", delta_color="inverse")
+            k3.metric("P90 Delivery", f"Day {p90:.0f}")
+            if st.session_state.get('risk_disruption_rows'):
+                st.write("**Sampled Supplier Disruptions** (time lost in days, before float absorbs it)")
+                st.dataframe(pd.DataFrame(st.session_state['risk_disruption_rows']), use_container_width=True, hide_index=True)
+
+            counts, lower, width = store.histograms('finish', nodes=['Delivery'], bins=40)
+            st.bar_chart(pd.DataFrame({'Delivery Day': lower[0] + (pd.RangeIndex(40) + 0.5) * width[0],
+                                       'Iterations': counts[:, 0]}), x='Delivery Day', y='Iterations')
+
+            st.write("**Most Often Critical Agents**")
+            df_risk = pd.DataFrame({
+                'Agent': labels,
+                'Critical (% of Runs)': (store.criticality() * 100).round(1),
+                'P80 Finish': store.percentiles('finish', [80])[0].round(0),
+            }).sort_values('Critical (% of Runs)', ascending=False)
+            st.dataframe(df_risk.head(10), use_container_width=True, hide_index=True)
+
+            st.write(f"**Sampled Finish Days** ({store.rows:,} iterations on disk)")
+            first_row = st.number_input("First Iteration", min_value=0, max_value=store.rows - 1, value=0, step=20)
+            sample = store.read('finish', rows=slice(first_row, first_row + 20))
+            st.dataframe(pd.DataFrame(sample, columns=labels, index=range(first_row, first_row + len(sample))).round(1),
+                         use_container_width=True)
+
+# --- MITIGATION PLANNER ---
+# Which risk responses to buy within a budget for the earliest P80 delivery,
+# on the same overrun tail as the risk run
+with st.expander("🛡️ Mitigation Planner: Best Risk Responses for a Budget"):
+    budget = st.slider("Mitigation Budget", 0, 2_500_000, 500_000, step=50_000)
+    if st.button("Optimize Portfolio"):
+        with stage('mitigation_optimizer'):
+            st.session_state['mitigation_plan'] = plan_mitigations(st.session_state['nodes'], budget, overrun_tail / 100,
+                                                                    workers=MITIGATION_WORKERS)
+
+    if 'mitigation_plan' in st.session_state:
+        mitigation_rows, mitigation = st.session_state['mitigation_plan']
+        o1, o2, o3 = st.columns(3)
+        o1.metric("P80 Delivery", f"Day {mitigation['value']:.0f}",
+                  delta=f"{mitigation['value'] - mitigation['baseline']:.0f} Days", delta_color="inverse")
+        o2.metric("P80 Without Mitigations", f"Day {mitigation['baseline']:.0f}")
+        o3.metric("Portfolio Cost", f"{mitigation['cost']:,.0f}")
+        st.dataframe(pd.DataFrame(mitigation_rows), use_container_width=True, hide_index=True)
+        st.caption(f"{mitigation['evaluated']} portfolios scored on the same sampled overruns ({mitigation['method'].replace('_', ' ')}).")
+
+# --- DEBUG PANEL (stage timings for this rerun) ---
+if st.sidebar.checkbox("🐞 Show Debug Timings", key='show_debug'):
+    with st.expander("🐞 Debug: Stage Timings", expanded=True):
+        st.dataframe(pd.DataFrame(profiler.stage_totals()), use_container_width=True)
+        st.write("**Counters**")
+        st.json(profiler.counters)
+        st.write("**Shared Simulation Service**")
+        st.json(service.stats)
\ No newline at end of file
@@ -0,0 +1,348 @@
+"""
+simulation_service.py
+Shared asyncio simulation service for the Shipyard simulators (no Streamlit).
+
+Every Streamlit browser session reruns its whole script on each click, so
+without sharing, N planners cost N times the CPU. One SimulationService per
+server process holds:
+
+  - compiled project graphs and their base durations (compiled once,
+    optionally with redundant links removed; big, wide projects also get
+    their topological levels, so a schedule runs forward_pass_levels),
+  - finished results in a bounded LRU ScenarioCache keyed by a hash of
+    (project, graph version, scenario), so a scenario any user has already
+    run is answered from memory,
+  - in-flight requests, so identical scenarios asked for at the same time
+    are computed once and every caller awaits the same task,
+  - a process pool for heavy Monte Carlo / what-if sweeps.
+
+The apps reach it through a st.cache_resource singleton and use the
+cached_*() methods from their script threads: a cache hit is returned right
+there, a miss is handed to the service's event loop, which runs in its own
+background thread. It can also run stand-alone and answer JSON-lines requests over TCP:
+
+    python simulation_service.py serve --port 8765
+    python simulation_service.py schedule --delay Engine_Prep=10
+    python simulation_service.py sweep --samples 5000 --max-delay 20
+    python simulation_service.py stats
+
+Shared results are returned as-is to every caller: treat them as read-only.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from schedule_engine import compile_graph, compile_levels, forward_pass, forward_pass_levels, backward_pass, forward_pass_batch
+from scenario_cache import ScenarioCache, scenario_key, MISSING
+from graph_validation import normalize_prereqs
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+SWEEP_CHUNK = 2000  # scenarios per worker job
+LEVEL_PASS_NODES = 5000  # projects from this size schedule one topological level per vectorized step...
+LEVEL_PASS_WIDTH = 16  # ...if their levels average this many nodes (long chains stay on the scalar pass)
+MAX_REQUEST_BYTES = 64 * 1024 * 1024  # one JSON line; sweeps can carry many scenarios
+
+
+def _sweep_chunk(graph, durations):
+    """Worker-pool job: project end for each row of a (scenarios, nodes) duration block."""
+    _, finish = forward_pass_batch(graph, durations)
+    return finish.max(axis=1)
+
+
+class SimulationService:
+    """Compiled projects, shared results and request de-duplication for all sessions."""
+
+    def __init__(self, workers=None, cache_entries=512, cache_bytes=256 * 1024 * 1024):
+        self.projects = {}
+        self.cache = ScenarioCache(cache_entries, cache_bytes)
+        self._stats = {'deduplicated': 0, 'computed': 0}
+        self._inflight = {}
+        self._workers = workers
+        self._pool = None
+        self._loop = None
+        self._thread = None
+
+    # --- PROJECTS ---
+
+    def register_project(self, name, nodes, normalize=False, level_pass=None):
+        """
+        Compiles a project once. `nodes` uses the pyramid format:
+        {node_id: {'duration': ..., 'delay': ..., 'prereqs': [...]}}.
+        normalize=True drops duplicate and redundant links first
+        (graph_validation); the report is kept as the project's
+        'normalization'. level_pass=True / False forces the level-by-level
+        forward pass on or off; by default it is used from LEVEL_PASS_NODES
+        nodes with levels of LEVEL_PASS_WIDTH nodes on average. Returns the
+        graph version hash (part of every result key, so re-registering a
+        changed project never serves stale results).
+        """
+        node_ids = list(nodes)
+        prereqs = [nodes[nid].get('prereqs', []) for nid in node_ids]
+        normalization = None
+        if normalize:
+            prereqs, normalization = normalize_prereqs(node_ids, prereqs)
+        durations = [nodes[nid]['duration'] + nodes[nid].get('delay', 0) for nid in node_ids]
+        graph = compile_graph(node_ids, prereqs)
+        version = scenario_key(node_ids, prereqs, durations)
+        levels = None
+        if level_pass or (level_pass is None and len(node_ids) >= LEVEL_PASS_NODES):
+            levels = compile_levels(graph)
+            if level_pass is None and len(node_ids) < LEVEL_PASS_WIDTH * len(levels['levels']):
+                levels = None  # one step per level would cost more than the scalar pass
+        self.projects[name] = {'graph': graph, 'durations': durations, 'version': version,
+                               'normalization': normalization, 'levels': levels}
+        return version
+
+    def _project(self, name):
+        if name not in self.projects:
+            raise ValueError(f"Unknown project '{name}'")
+        return self.projects[name]
+
+    @property
+    def stats(self):
+        return {**self._stats, **self.cache.stats()}
+
+    def _schedule_request(self, name, delays):
+        """(project, non-zero delays, result key) for a schedule request."""
+        project = self._project(name)
+        delays = {node_id: days for node_id, days in (delays or {}).items() if days}
+        for node_id in delays:
+            if node_id not in project['graph']['index']:
+                raise ValueError(f"Unknown node '{node_id}'")
+        return project, delays, scenario_key('schedule', name, project['version'], delays)
+
+    def _delay_matrix(self, project, delay_rows):
+        """(scenarios, nodes) array of added delays from an array or a list of {node: days} dicts."""
+        index = project['graph']['index']
+        if isinstance(delay_rows, np.ndarray):
+            return delay_rows.astype(float)
+        matrix = np.zeros((len(delay_rows), len(index)))
+        for row, delays in enumerate(delay_rows):
+            for node_id, days in delays.items():
+                if node_id not in index:
+                    raise ValueError(f"Unknown node '{node_id}'")
+                matrix[row, index[node_id]] = days
+        return matrix
+
+    # --- REQUESTS ---
+
+    async def schedule(self, name, delays=None):
+        """
+        Early/late dates for one scenario ({node_id: added delay}).
+        Returns a dict of lists in node order ('start', 'finish',
+        'late_start', 'late_finish') plus the project 'end'.
+        """
+        project, delays, key = self._schedule_request(name, delays)
+        return await self._get_or_compute(key, self._in_thread, self._run_schedule, project, delays)
+
+    async def sweep(self, name, delay_rows):
+        """
+        Project end for many scenarios at once (Monte Carlo / what-if grids).
+        `delay_rows` is a (scenarios, nodes) array or a list of {node_id: days}.
+        The batch forward pass runs in the worker pool, in chunks.
+        """
+        project = self._project(name)
+        matrix = self._delay_matrix(project, delay_rows)
+        key = scenario_key('sweep', name, project['version'], matrix.shape, hashlib.sha1(matrix.tobytes()).hexdigest())
+        return await self._get_or_compute(key, self._run_sweep, project, matrix)
+
+    async def compute(self, key, func, *args):
+        """
+        Shared, de-duplicated func(*args) for results that are not a plain
+        schedule (e.g. the supply chain plan). `key` must identify the result.
+        """
+        return await self._get_or_compute(scenario_key('call', *key), self._in_thread, func, *args)
+
+    def _run_schedule(self, project, delays):
+        graph = project['graph']
+        durations = list(project['durations'])
+        for node_id, days in delays.items():
+            durations[graph['index'][node_id]] += days
+        if project['levels'] is not None:
+            start, finish = forward_pass_levels(project['levels'], durations)
+            start, finish = start.tolist(), finish.tolist()
+        else:
+            start, finish = forward_pass(graph, durations)
+        late_start, late_finish = backward_pass(graph, durations, finish)
+        return {'start': start, 'finish': finish, 'late_start': late_start, 'late_finish': late_finish,
+                'end': max(finish, default=0)}
+
+    async def _run_sweep(self, project, matrix):
+        durations = np.asarray(project['durations'], dtype=float) + matrix
+        loop = asyncio.get_running_loop()
+        pool = self._process_pool()
+        jobs = [loop.run_in_executor(pool, _sweep_chunk, project['graph'], durations[i:i + SWEEP_CHUNK])
+                for i in range(0, len(durations), SWEEP_CHUNK)]
+        ends = await asyncio.gather(*jobs)
+        return np.concatenate(ends).tolist() if ends else []
+
+    async def _in_thread(self, func, *args):
+        """Runs CPU work off the event loop so other requests keep being accepted."""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _get_or_compute(self, key, make, *args):
+        """Cached result, else join the identical in-flight request, else start it."""
+        cached = self.cache.get(key, MISSING)
+        if cached is not MISSING:
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, make, *args))
+            self._inflight[key] = task
+        else:
+            self._stats['deduplicated'] += 1
+        # shield: one caller giving up must not cancel the work for the others
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, make, *args):
+        try:
+            result = await make(*args)
+            self._stats['computed'] += 1
+            self.cache.put(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def _process_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._workers)
+        return self._pool
+
+    # --- THREAD BRIDGE (Streamlit sessions, scripts) ---
+
+    def start(self):
+        """Starts the event loop in a background thread (once). Returns self."""
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='simulation-service', daemon=True)
+            self._thread.start()
+        return self
+
+    def call(self, coro, timeout=None):
+        """Runs a service coroutine from an ordinary thread and waits for the result."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def cached_schedule(self, name, delays=None):
+        """schedule() for ordinary threads; a cache hit never leaves the calling thread."""
+        _, _, key = self._schedule_request(name, delays)
+        cached = self.cache.get(key, MISSING, record_miss=False)
+        if cached is not MISSING:
+            return cached
+        return self.call(self.schedule(name, delays))
+
+    def cached_compute(self, key, func, *args):
+        """compute() for ordinary threads; a cache hit never leaves the calling thread."""
+        cached = self.cache.get(scenario_key('call', *key), MISSING, record_miss=False)
+        if cached is not MISSING:
+            return cached
+        return self.call(self.compute(key, func, *args))
+
+    def close(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # --- TCP SERVER (JSON lines) ---
+
+    async def dispatch(self, request):
+        """One request dict: {'op': 'schedule' | 'sweep' | 'stats', 'project': ..., 'delays': ...}."""
+        op = request.get('op')
+        if op == 'schedule':
+            return await self.schedule(request.get('project', 'pyramid'), request.get('delays'))
+        if op == 'sweep':
+            return await self.sweep(request.get('project', 'pyramid'), request.get('delays', []))
+        if op == 'stats':
+            return self.stats
+        raise ValueError(f"Unknown op '{op}'")
+
+    async def handle_client(self, reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                response = {'ok': True, 'result': await self.dispatch(json.loads(line))}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+        writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_REQUEST_BYTES)
+        async with server:
+            await server.serve_forever()
+
+
+def create_default_service(workers=None, cache_mb=256):
+    """Service with the pyramid project registered (used by the apps and `serve`)."""
+    from pyramid_model import INITIAL_NODES
+
+    service = SimulationService(workers=workers, cache_bytes=cache_mb * 1024 * 1024)
+    service.register_project('pyramid', INITIAL_NODES, normalize=True)
+    return service
+
+
+def request(payload, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Sends one request to a running service and returns its result."""
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(payload) + '\n').encode())
+        response = json.loads(sock.makefile().readline())
+    if not response['ok']:
+        raise ValueError(response['error'])
+    return response['result']
+
+
+def main(argv=None):
+    from headless_runner import parse_delays
+
+    parser = argparse.ArgumentParser(description="Shared Shipyard simulation service.")
+    parser.add_argument('command', choices=['serve', 'schedule', 'sweep', 'stats'])
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, help="serve: worker processes for sweeps")
+    parser.add_argument('--cache-mb', type=int, default=256, help="serve: memory cap for cached results")
+    parser.add_argument('--project', default='pyramid')
+    parser.add_argument('--delay', action='append', default=[], metavar='NODE=DAYS',
+                        help="schedule: added delay for a node (repeatable)")
+    parser.add_argument('--samples', type=int, default=1000, help="sweep: number of random scenarios")
+    parser.add_argument('--max-delay', type=float, default=10, help="sweep: uniform delay per node, 0..max")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        service = create_default_service(args.workers, args.cache_mb)
+        print(f"Simulation service listening on {args.host}:{args.port}")
+        asyncio.run(service.serve(args.host, args.port))
+    elif args.command == 'schedule':
+        result = request({'op': 'schedule', 'project': args.project, 'delays': parse_delays(args.delay)}, args.host, args.port)
+        print(f"Delivery: {result['end']}")
+    elif args.command == 'sweep':
+        from pyramid_model import INITIAL_NODES
+
+        rng = np.random.default_rng(args.seed)
+        rows = [{node_id: float(days) for node_id, days in zip(INITIAL_NODES, rng.uniform(0, args.max_delay, len(INITIAL_NODES)))}
+                for _ in range(args.samples)]
+        ends = np.array(request({'op': 'sweep', 'project': args.project, 'delays': rows}, args.host, args.port))
+        print(f"{len(ends)} scenarios: mean end {ends.mean():.1f}, P80 {np.percentile(ends, 80):.1f}, max {ends.max():.1f}")
+    else:
+        for name, value in request({'op': 'stats'}, args.host, args.port).items():
+            print(f"  {name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+simulation_service_test.py
+Backend tests for the shared simulation service (simulation_service.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import asyncio
+import copy
+import random
+import threading
+import time
+
+import numpy as np
+
+from simulation_service import SimulationService, create_default_service, request
+from pyramid_model import INITIAL_NODES, calculate_schedule
+
+
+def test_schedule_matches_calculate_schedule():
+    service = create_default_service()
+    result = asyncio.run(service.schedule('pyramid', {'Panel_Assy': 40}))
+
+    nodes = copy.deepcopy(INITIAL_NODES)
+    nodes['Panel_Assy']['delay'] = 40
+    expected = calculate_schedule(nodes)
+    assert result['end'] == expected['Delivery']['end_day'] == 1211
+    assert result['late_start'] == [node['late_start'] for node in expected.values()]
+
+
+def test_identical_requests_are_deduplicated_and_cached():
+    service = SimulationService()
+    service.register_project('p', {'A': {'duration': 5}, 'B': {'duration': 3, 'prereqs': ['A']}})
+    calls = []
+
+    def slow_plan(days):
+        calls.append(days)
+        time.sleep(0.1)
+        return days * 2
+
+    async def many_users():
+        return await asyncio.gather(*[service.compute(('plan', 7), slow_plan, 7) for _ in range(30)])
+
+    assert asyncio.run(many_users()) == [14] * 30
+    assert calls == [7]
+    assert service.stats['deduplicated'] == 29
+
+    # Later sessions get the cached answer; {} and zero delays are the same scenario
+    first = asyncio.run(service.schedule('p'))
+    assert asyncio.run(service.schedule('p', {'A': 0})) is first
+    assert service.stats['cache_hits'] == 1 and first['end'] == 8
+
+
+def test_normalized_project_gives_same_schedule():
+    nodes = {'A': {'duration': 5}, 'B': {'duration': 3, 'prereqs': ['A']}, 'C': {'duration': 1, 'prereqs': ['A', 'B', 'B']}}
+    service = SimulationService()
+    service.register_project('full', nodes)
+    service.register_project('lean', nodes, normalize=True)
+    assert service.projects['lean']['normalization']['links_after'] == 2
+    assert asyncio.run(service.schedule('lean', {'A': 2}))['finish'] == asyncio.run(service.schedule('full', {'A': 2}))['finish']
+
+
+def test_large_projects_use_the_level_pass():
+    # 50 hulls x 200 activities with typed links, each waiting on earlier work of its hull
+    rng = random.Random(5)
+    nodes = {}
+    for i in range(10000):
+        first, k = i - i % 200, i % 200
+        nodes[f'N{i}'] = {'duration': rng.randint(1, 20), 'prereqs': [
+            {'id': f'N{first + p}', 'type': rng.choice(['FS', 'SS', 'FF']), 'lag': rng.randint(-2, 5)}
+            for p in rng.sample(range(max(0, k - 20), k), min(k, 2))]}
+    service = SimulationService()
+    service.register_project('fleet', nodes)
+    service.register_project('scalar', nodes, level_pass=False)
+    assert service.projects['fleet']['levels'] is not None and service.projects['scalar']['levels'] is None
+    fleet = asyncio.run(service.schedule('fleet', {'N7': 30}))
+    scalar = asyncio.run(service.schedule('scalar', {'N7': 30}))
+    for field in ('start', 'finish', 'late_start', 'late_finish'):
+        assert np.allclose(fleet[field], scalar[field]), field
+    assert fleet['end'] == scalar['end']
+
+    # a long chain has one node per level: it stays on the scalar pass
+    chain = {f'N{i}': {'duration': 1, 'prereqs': [f'N{i - 1}'] if i else []} for i in range(6000)}
+    service.register_project('chain', chain)
+    assert service.projects['chain']['levels'] is None
+    assert asyncio.run(service.schedule('chain'))['end'] == 6000
+
+
+def test_sweep_in_worker_pool():
+    service = SimulationService(workers=2)
+    service.register_project('p', {'A': {'duration': 5}, 'B': {'duration': 3}, 'C': {'duration': 1, 'prereqs': ['A', 'B']}})
+    try:
+        ends = asyncio.run(service.sweep('p', [{'A': 0}, {'B': 4}, {'C': 2.5}]))
+        assert ends == [6, 8, 8.5]
+        matrix = np.random.default_rng(0).uniform(0, 3, (5000, 3))
+        ends = asyncio.run(service.sweep('p', matrix))
+        assert len(ends) == 5000 and min(ends) >= 6
+    finally:
+        service.close()
+
+
+def test_threads_and_tcp_clients_share_one_service():
+    service = create_default_service().start()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.call(service.schedule('pyramid', {'Engine_Prep': 10}))))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(result) for result in results}) == 1
+
+    async def start_server():
+        return await asyncio.start_server(service.handle_client, '127.0.0.1', 0)
+
+    server = service.call(start_server())
+    port = server.sockets[0].getsockname()[1]
+    try:
+        result = request({'op': 'schedule', 'delays': {'Engine_Prep': 10}}, port=port)
+        assert result['end'] == results[0]['end']
+        assert request({'op': 'stats'}, port=port)['computed'] == 1
+    finally:
+        server.close()
+        service.close()
+
+
+if __name__ == "__main__":
+    print("### SIMULATION SERVICE BACKEND TEST ###")
+
+    test_schedule_matches_calculate_schedule()
+    test_identical_requests_are_deduplicated_and_cached()
+    test_normalized_project_gives_same_schedule()
+    test_large_projects_use_the_level_pass()
+    test_sweep_in_worker_pool()
+    test_threads_and_tcp_clients_share_one_service()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,112 @@
+"""
+startup_benchmark.py
+Cold-start benchmark for the apps and the backend modules (no browser).
+
+Every measurement runs in a fresh Python process, so nothing is already
+imported: the backend imports (what the apps, the simulation service and
+its pool workers pay first) and each app's complete first run through
+Streamlit's AppTest (imports plus the first script run, without
+Streamlit's own import). The median of `--repeat` runs is checked against
+a budget in milliseconds; the exit status is 1 if any target is over.
+
+    python startup_benchmark.py
+    python startup_benchmark.py --repeat 10 --output bench_output.txt
+    python startup_benchmark.py --cold-cache    # empty startup cache every run
+
+See startup_cache.py for the lazy imports and the on-disk layout cache.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+APP_SNIPPET = """
+import time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+at = AppTest.from_file({path!r}, default_timeout=120).run()
+elapsed = time.perf_counter() - started
+if at.exception:
+    raise SystemExit(at.exception[0].message)
+print(elapsed)
+"""
+
+# target -> (code run in a fresh process, budget in ms)
+TARGETS = {
+    'import pyramid_model': (IMPORT_SNIPPET.format(module='pyramid_model'), 400),
+    'import supply_chain_model': (IMPORT_SNIPPET.format(module='supply_chain_model'), 400),
+    'import simulation_service': (IMPORT_SNIPPET.format(module='simulation_service'), 400),
+    'pyramid app first run': (APP_SNIPPET.format(path=os.path.join(HERE, 'shipyard_simulator_2.py')), 4000),
+    'supply app first run': (APP_SNIPPET.format(path=os.path.join(HERE, 'shipyard_simulator.py')), 4000),
+}
+
+
+def measure(code, repeat=5, cold_cache=False):
+    """Wall times (ms) of `code` in `repeat` fresh processes; the code prints its own seconds."""
+    times = []
+    for _ in range(repeat):
+        env = dict(os.environ)
+        with tempfile.TemporaryDirectory() as cache:
+            if cold_cache:
+                env['SHIPYARD_CACHE_DIR'] = cache
+            done = subprocess.run([sys.executable, '-c', code], cwd=HERE, env=env,
+                                  capture_output=True, text=True)
+        if done.returncode != 0:
+            raise RuntimeError(done.stderr.strip().splitlines()[-1] if done.stderr.strip() else done.stdout)
+        times.append(float(done.stdout.strip().splitlines()[-1]) * 1000)
+    return times
+
+
+def run_benchmark(targets=None, repeat=5, cold_cache=False, budget_scale=1.0):
+    """Rows with 'Target', 'Median (ms)', 'Min (ms)', 'Budget (ms)' and 'OK'."""
+    rows = []
+    for name in targets or TARGETS:
+        code, budget = TARGETS[name]
+        times = measure(code, repeat, cold_cache)
+        median = statistics.median(times)
+        rows.append({'Target': name, 'Median (ms)': median, 'Min (ms)': min(times),
+                     'Budget (ms)': budget * budget_scale, 'OK': median <= budget * budget_scale})
+    return rows
+
+
+def format_rows(rows):
+    lines = [f"{'Target':<28}{'Median ms':>11}{'Min ms':>9}{'Budget ms':>11}  Status"]
+    for row in rows:
+        lines.append(f"{row['Target']:<28}{row['Median (ms)']:>11.0f}{row['Min (ms)']:>9.0f}"
+                     f"{row['Budget (ms)']:>11.0f}  {'ok' if row['OK'] else 'OVER BUDGET'}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the Shipyard apps.")
+    parser.add_argument('--target', action='append', choices=list(TARGETS), metavar='NAME',
+                        help="measure only this target (repeatable)")
+    parser.add_argument('--repeat', type=int, default=5, help="fresh processes per target")
+    parser.add_argument('--cold-cache', action='store_true', help="start every run with an empty startup cache")
+    parser.add_argument('--budget-scale', type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    parser.add_argument('--output', metavar='PATH', help="also write the table to this file")
+    args = parser.parse_args(argv)
+
+    rows = run_benchmark(args.target, args.repeat, args.cold_cache, args.budget_scale)
+    text = format_rows(rows)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    return rows
+
+
+if __name__ == "__main__":
+    sys.exit(0 if all(row['OK'] for row in main()) else 1)
@@ -0,0 +1,107 @@
+"""
+startup_cache.py
+Cold-start helpers for the apps, the service and its workers (no Streamlit).
+
+lazy_import returns a module that is only executed on first attribute
+access, so pandas and plotly.express cost nothing until a table or Gantt
+chart is actually built, and process pool workers that only schedule never
+load them at all. The first access runs the module under a per-module lock:
+other threads (Streamlit sessions, pool threads) wait for it instead of
+seeing a half-executed module, which importlib.util.LazyLoader allows
+before Python 3.12.
+
+load_or_build keeps precomputed results that depend only on a project's
+structure (pyramid and Sankey layouts) in an on-disk cache, keyed by a hash
+of their inputs, so a fresh process loads them at boot instead of
+recomputing them. Callers put a version of the code that builds the value
+in the key (e.g. graph_layout.LAYOUT_VERSION), so a changed algorithm does
+not load stale results. The cache lives in $SHIPYARD_CACHE_DIR (default
+~/.cache/shipyard); entries are written atomically and a corrupt or
+unreadable entry is simply rebuilt.
+"""
+
+import importlib.util
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import types
+
+from scenario_cache import scenario_key
+from profiling import count, stage
+
+CACHE_ENV = 'SHIPYARD_CACHE_DIR'
+_MEMORY = {}  # this process: file name -> value
+_LOCKS = {}  # lazy module name -> lock held while it is executed
+_LOADING = set()  # lazy modules being executed (by the thread holding their lock)
+
+
+class _LazyModule(types.ModuleType):
+    """A module that is executed on its first attribute access, by one thread."""
+
+    def __getattribute__(self, attr):
+        spec = types.ModuleType.__getattribute__(self, '__spec__')
+        with _LOCKS[spec.name]:
+            # the module's own code reads its namespace while it runs
+            if type(self) is _LazyModule and spec.name not in _LOADING:
+                _LOADING.add(spec.name)
+                try:
+                    spec.loader.exec_module(self)
+                    self.__class__ = types.ModuleType
+                finally:
+                    _LOADING.discard(spec.name)
+        return types.ModuleType.__getattribute__(self, attr)
+
+
+def lazy_import(name):
+    """
+    Module `name`, imported on first attribute access. A module that is
+    already imported is returned as it is.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    if not hasattr(spec.loader, 'exec_module'):
+        raise ImportError(f"Module '{name}' cannot be imported lazily")
+    _LOCKS.setdefault(name, threading.RLock())
+    module = importlib.util.module_from_spec(spec)
+    module.__class__ = _LazyModule
+    sys.modules[name] = module
+    return module
+
+
+def cache_dir():
+    return os.environ.get(CACHE_ENV) or os.path.join(os.path.expanduser('~'), '.cache', 'shipyard')
+
+
+def load_or_build(name, key_parts, build, directory=None):
+    """
+    build() once per distinct `key_parts` (any JSON-able inputs), across
+    processes: from this process's memory, else from disk, else built and
+    saved. Results are shared; treat them as read-only.
+    """
+    file_name = f"{name}-{scenario_key(*key_parts)}.pkl"
+    if file_name in _MEMORY:
+        return _MEMORY[file_name]
+
+    directory = directory or cache_dir()
+    path = os.path.join(directory, file_name)
+    try:
+        with open(path, 'rb') as f, stage('startup_cache_load'):
+            value = pickle.load(f)
+        count('startup_cache_hits')
+    except (OSError, pickle.PickleError, EOFError, AttributeError, ImportError):
+        value = build()
+        count('startup_cache_misses')
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as f:
+                pickle.dump(value, f)
+            os.replace(f.name, path)
+        except OSError:
+            pass  # read-only or full disk: keep working without the cache
+    _MEMORY[file_name] = value
+    return value
@@ -0,0 +1,141 @@
+"""
+startup_cache_test.py
+Backend tests for lazy imports, the on-disk startup cache (startup_cache.py)
+and the cold-start benchmark (startup_benchmark.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import startup_cache
+from startup_cache import lazy_import, load_or_build
+from startup_benchmark import run_benchmark
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# modules the backends must not execute at import time
+HEAVY = ['networkx', 'pandas', 'plotly.express', 'plotly.graph_objects']
+
+LOADED_SNIPPET = """
+import sys, startup_cache
+import {module}
+loaded = [name for name in {heavy!r}
+          if name in sys.modules and not isinstance(sys.modules[name], startup_cache._LazyModule)]
+print(','.join(loaded))
+"""
+
+
+def test_lazy_import_defers_loading():
+    code = ("import sys\nfrom startup_cache import lazy_import\n"
+            "mod = lazy_import('fractions')\nprint(type(sys.modules['fractions']).__name__)\n"
+            "print(mod.Fraction(1, 2) + mod.Fraction(1, 2), type(sys.modules['fractions']).__name__)")
+    out = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, check=True).stdout
+    # registered but not executed until first use
+    assert out.split() == ['_LazyModule', '1', 'module']
+    # an already imported module comes back as it is
+    assert lazy_import('os') is os
+    try:
+        lazy_import('no_such_module_here')
+        assert False, "expected ImportError"
+    except ImportError:
+        pass
+
+
+def test_lazy_import_is_thread_safe():
+    # a module that takes a while to run: threads arriving during the first
+    # load must wait for it rather than see a half-executed module
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, 'slow_module.py'), 'w') as f:
+            f.write("import time\ntime.sleep(0.2)\nVALUE = 42\n")
+        code = ("import sys, threading\nfrom startup_cache import lazy_import\n"
+                "mod = lazy_import('slow_module')\nseen = []\nbarrier = threading.Barrier(8)\n"
+                "def read():\n    barrier.wait()\n    try:\n        seen.append(mod.VALUE)\n"
+                "    except AttributeError as e:\n        seen.append(repr(e))\n"
+                "threads = [threading.Thread(target=read) for _ in range(8)]\n"
+                "[t.start() for t in threads]\n[t.join() for t in threads]\nprint(seen)")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([HERE, directory]))
+        out = subprocess.run([sys.executable, '-c', code], cwd=directory, env=env, capture_output=True, text=True,
+                             check=True).stdout
+    assert out.strip() == str([42] * 8)
+
+
+def test_backends_import_without_heavy_modules():
+    for module in ['pyramid_model', 'supply_chain_model', 'simulation_service']:
+        code = LOADED_SNIPPET.format(module=module, heavy=HEAVY)
+        done = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, check=True)
+        assert done.stdout.strip() == '', f"importing {module} loaded {done.stdout.strip()}"
+
+
+def test_lazy_modules_work_on_first_use():
+    code = ("from supply_chain_model import BASELINE_TASKS, calculate_simulated_plan, create_gantt_chart\n"
+            "plan, _, end = calculate_simulated_plan(BASELINE_TASKS, {})\n"
+            "print(len(create_gantt_chart(plan, 'Plan').data) > 0)")
+    out = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == 'True'
+
+
+def test_load_or_build_round_trip():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {'A': (0.0, 1.0)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        key = ['test_round_trip', {'A': []}]
+        assert load_or_build('layout', key, build, directory) == {'A': (0.0, 1.0)}
+        assert len(os.listdir(directory)) == 1
+        # the same process answers from memory
+        assert load_or_build('layout', key, build, directory) == {'A': (0.0, 1.0)}
+        assert len(calls) == 1
+
+        # a fresh process (empty memory) loads the file instead of building
+        startup_cache._MEMORY.clear()
+        assert load_or_build('layout', key, build, directory) == {'A': (0.0, 1.0)}
+        assert len(calls) == 1
+
+        # other inputs, other entry
+        load_or_build('layout', ['test_round_trip', {'A': ['B']}], build, directory)
+        assert len(calls) == 2 and len(os.listdir(directory)) == 2
+
+
+def test_corrupt_entry_is_rebuilt():
+    with tempfile.TemporaryDirectory() as directory:
+        key = ['test_corrupt']
+        load_or_build('layout', key, lambda: [1, 2, 3], directory)
+        (path,) = [os.path.join(directory, name) for name in os.listdir(directory)]
+        with open(path, 'wb') as f:
+            f.write(b'not a pickle')
+        startup_cache._MEMORY.clear()
+        assert load_or_build('layout', key, lambda: [4, 5], directory) == [4, 5]
+        startup_cache._MEMORY.clear()
+        assert load_or_build('layout', key, lambda: [6], directory) == [4, 5]
+
+    # an unwritable cache directory still returns the value
+    startup_cache._MEMORY.clear()
+    assert load_or_build('layout', ['test_unwritable'], lambda: 'ok', os.devnull) == 'ok'
+
+
+def test_import_budgets():
+    rows = run_benchmark(['import pyramid_model', 'import supply_chain_model'], repeat=3, budget_scale=2.0)
+    for row in rows:
+        print(f"  {row['Target']}: {row['Median (ms)']:.0f} ms (budget {row['Budget (ms)']:.0f} ms)")
+        assert row['OK'], f"{row['Target']} took {row['Median (ms)']:.0f} ms"
+
+
+if __name__ == "__main__":
+    print("### STARTUP CACHE BACKEND TEST ###")
+
+    test_lazy_import_defers_loading()
+    test_lazy_import_is_thread_safe()
+    test_backends_import_without_heavy_modules()
+    test_lazy_modules_work_on_first_use()
+    test_load_or_build_round_trip()
+    test_corrupt_entry_is_rebuilt()
+    test_import_budgets()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,305 @@
+"""
+supply_chain_model.py
+Data model, simulation logic and charts for the Shipyard Delay Simulator
+(no Streamlit). Shared by the Streamlit app (shipyard_simulator.py) and the
+headless runner.
+"""
+
+from datetime import datetime, timedelta
+import copy
+import functools
+from schedule_engine import compile_graph, forward_pass, backward_pass
+from delay_rules import compile_rules, selection_matrix, resolve_active, scenario_durations, effect_log, SELECTOR_FIELDS
+from scenario_cache import scenario_key
+from graph_layout import sankey_layout
+from attribution import attribute_rule_delays
+from profiling import timed
+from startup_cache import lazy_import
+
+# Only needed to draw charts; loaded on first use
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+pd = lazy_import('pandas')
+
+# --- 1. NEW BASELINE PROJECT (with Dependencies) ---
+# We now use a dependency graph. A task can only start after all 'Prereq' tasks are finished.
+BASELINE_TASKS = [
+    # ID, Task Name, Duration (wks), Category, Prerequisite ID(s)
+    {'ID': 'T1', 'Task': '1. Ship Design', 'Duration': 20, 'Category': 'Planning', 'Prereq': []},
+    
+    # China Supply Chain (Steel)
+    {'ID': 'T2A', 'Task': '2A. Steel Production (China)', 'Duration': 15, 'Category': 'Supply Chain (Steel)', 'Prereq': ['T1']},
+    {'ID': 'T3A', 'Task': '3A. Steel Shipping (China -> FIN)', 'Duration': 6, 'Category': 'Supply Chain (Steel)', 'Prereq': ['T2A']},
+
+    # Germany Supply Chain (Engine)
+    {'ID': 'T2B', 'Task': '2B. Engine Manufacturing (Germany)', 'Duration': 25, 'Category': 'Supply Chain (Engine)', 'Prereq': ['T1']},
+    {'ID': 'T3B', 'Task': '3B. Engine Shipping (Germany -> FIN)', 'Duration': 2, 'Category': 'Supply Chain (Engine)', 'Prereq': ['T2B']},
+    
+    # Finland Shipyard (Assembly)
+    {'ID': 'T4', 'Task': '4. Hull Fabrication (Finland)', 'Duration': 20, 'Category': 'Construction (FIN)', 'Prereq': ['T3A']}, # Needs steel
+    {'ID': 'T5', 'Task': '5. Engine Installation (Finland)', 'Duration': 8, 'Category': 'Construction (FIN)', 'Prereq': ['T3B', 'T4']}, # DOMINO EFFECT: Needs engine AND hull
+    {'ID': 'T6', 'Task': '6. Outfitting & Cabins (Finland)', 'Duration': 20, 'Category': 'Outfitting (FIN)', 'Prereq': ['T5']},
+    {'ID': 'T7', 'Task': '7. Testing & Sea Trials (Finland)', 'Duration': 10, 'Category': 'Testing (FIN)', 'Prereq': ['T6']},
+]
+
+# --- 2. NEW DELAY DEFINITIONS (Mapped to new Task IDs) ---
+# Each entry is a rule (see delay_rules.py): it selects tasks by 'task_id',
+# 'category' or a regex 'match' on IDs, and can trigger / require other rules.
+DELAY_DEFINITIONS = {
+    # China Supply Chain
+    'china_prod_delay': {'name': 'Delay at China Steel Mill', 'task_id': 'T2A', 'weeks': 4},
+    'china_shipping_delay': {'name': 'Delay Shipping from China (Port Strike)', 'task_id': 'T3A', 'weeks': 3},
+
+    # Germany Supply Chain
+    'germany_prod_delay': {'name': 'Delay at German Engine Plant', 'task_id': 'T2B', 'weeks': 8},
+    'germany_intermediate_delay': {'name': 'Bottleneck in Germany (Assembly)', 'task_id': 'T2B', 'multiplier': 1.25}, # 25% longer
+    'germany_shipping_delay': {'name': 'Delay Shipping from Germany', 'task_id': 'T3B', 'weeks': 1},
+
+    # Correlated: one strike hits every shipping leg (T3A, T3B, ...) at once
+    'regional_port_strike': {'name': 'Regional Port Strike (All Shipping Legs)', 'match': r'^T3', 'weeks': 2},
+
+    # Finland Shipyard
+    'finland_labor_shortage': {'name': 'Skilled Labor Shortage (Finland)', 'task_id': ['T4', 'T5', 'T6'], 'multiplier': 1.15},
+    'finland_crane_failure': {'name': 'Gantry Crane Failure (Finland)', 'task_id': 'T4', 'weeks': 3},
+    'finland_rework': {'name': 'Rework (Quality Failure)', 'task_id': 'T4', 'weeks': 2},
+
+    # Project-Wide
+    'design_flaw': {'name': '"First-in-Class" Design Flaw', 'task_id': 'T1', 'weeks': 52},
+    'major_change_order': {'name': 'Major Design Change Order', 'task_id': 'T5', 'weeks': 8}, 
+
+    # Conditional chain: opt-in, and only fires together with the design flaw
+    'design_rework': {'name': 'Downstream Rework from Design Flaw', 'category': 'Construction (FIN)', 'multiplier': 1.1, 'requires': ['design_flaw']},
+}
+
+# --- 2B. MULTI-ECHELON SUPPLY NETWORK (behind the T2/T3 legs) ---
+# Tiers, alternative sources (inner lists), transport legs and safety buffers.
+# Solved by supply_network.solve_supply_network; times are in weeks.
+SUPPLY_NETWORK = {
+    # Tier 0: the Finnish yard needs steel AND the engine (each via one of its legs)
+    'FIN_Yard': {'label': 'Finland Yard (Materials Ready)', 'kind': 'yard', 'tier': 0, 'lead_time': 1, 'lead_time_sd': 0.2,
+                 'needs': [['Sea_CN_FI', 'Sea_KR_FI'], ['Truck_DE_FI', 'Sea_DE_FI']]},
+
+    # Tier 1: direct suppliers and their outbound transport legs
+    'Sea_CN_FI': {'label': 'Sea Freight China -> FIN', 'kind': 'transport', 'tier': 1, 'lead_time': 6, 'lead_time_sd': 1.5, 'needs': ['Steel_Mill_CN']},
+    'Sea_KR_FI': {'label': 'Sea Freight Korea -> FIN', 'kind': 'transport', 'tier': 1, 'lead_time': 7, 'lead_time_sd': 1.0, 'needs': ['Steel_Mill_KR']},
+    'Truck_DE_FI': {'label': 'Truck Germany -> FIN', 'kind': 'transport', 'tier': 1, 'lead_time': 2, 'lead_time_sd': 0.5, 'needs': ['Engine_Plant_DE']},
+    'Sea_DE_FI': {'label': 'Ro-Ro Germany -> FIN', 'kind': 'transport', 'tier': 1, 'lead_time': 3, 'lead_time_sd': 0.3, 'needs': ['Engine_Plant_DE']},
+    'Steel_Mill_CN': {'label': 'Steel Mill (China)', 'kind': 'supplier', 'tier': 1, 'lead_time': 15, 'lead_time_sd': 3, 'buffer': 1,
+                      'needs': [['Ore_AU', 'Ore_BR'], 'Coke_CN']},
+    'Steel_Mill_KR': {'label': 'Steel Mill (Korea)', 'kind': 'supplier', 'tier': 1, 'lead_time': 16, 'lead_time_sd': 1.5,
+                      'needs': [['Ore_AU', 'Ore_BR']]},
+    'Engine_Plant_DE': {'label': 'Engine Plant (Germany)', 'kind': 'supplier', 'tier': 1, 'lead_time': 25, 'lead_time_sd': 4, 'buffer': 2,
+                        'needs': ['Crankshaft_Forge', ['Turbo_CH', 'Turbo_JP']]},
+
+    # Tier 2: sub-suppliers
+    'Ore_AU': {'label': 'Iron Ore (Australia)', 'kind': 'supplier', 'tier': 2, 'lead_time': 4, 'lead_time_sd': 1},
+    'Ore_BR': {'label': 'Iron Ore (Brazil)', 'kind': 'supplier', 'tier': 2, 'lead_time': 6, 'lead_time_sd': 2},
+    'Coke_CN': {'label': 'Coking Coal (China)', 'kind': 'supplier', 'tier': 2, 'lead_time': 3, 'lead_time_sd': 0.5},
+    'Crankshaft_Forge': {'label': 'Crankshaft Forge', 'kind': 'supplier', 'tier': 2, 'lead_time': 12, 'lead_time_sd': 3, 'needs': ['Billet_SE']},
+    'Turbo_CH': {'label': 'Turbocharger (Switzerland)', 'kind': 'supplier', 'tier': 2, 'lead_time': 10, 'lead_time_sd': 2},
+    'Turbo_JP': {'label': 'Turbocharger (Japan)', 'kind': 'supplier', 'tier': 2, 'lead_time': 14, 'lead_time_sd': 1},
+
+    # Tier 3: raw material for the forge
+    'Billet_SE': {'label': 'Steel Billet (Sweden)', 'kind': 'supplier', 'tier': 3, 'lead_time': 4, 'lead_time_sd': 1},
+}
+
+# --- 4. NEW CORE SIMULATION LOGIC (Handles Dependencies) ---
+
+COMPILED_RULES_CACHE = 32  # distinct task lists whose compiled rules are kept (least recently used dropped)
+
+
+@functools.lru_cache(maxsize=COMPILED_RULES_CACHE)
+def _compile_delay_rules(rules_key, task_ids, selected_on):
+    """compile_rules for one task list; `rules_key` changes when DELAY_DEFINITIONS is edited."""
+    records = [dict(zip(SELECTOR_FIELDS.values(), values)) for values in selected_on]
+    return compile_rules(DELAY_DEFINITIONS, list(task_ids), records, unit='weeks')
+
+
+def compiled_delay_rules(tasks):
+    """
+    DELAY_DEFINITIONS compiled against `tasks`, once per distinct task list
+    (IDs and the fields the rules select on). Shared: treat as read-only.
+    """
+    task_ids = tuple(task['ID'] for task in tasks)
+    selected_on = tuple(tuple(task.get(field) for field in SELECTOR_FIELDS.values()) for task in tasks)
+    return _compile_delay_rules(scenario_key(DELAY_DEFINITIONS), task_ids, selected_on)
+
+
+@timed('calculate_simulated_plan')
+def calculate_simulated_plan(baseline_tasks, delay_inputs, start_date=None):
+    """
+    Calculates the new project timeline based on selected delays.
+    This function now processes tasks based on their prerequisites,
+    simulating the "domino effect" (critical path analysis).
+    Dates count from `start_date` (a datetime.date; default: today).
+    """
+    
+    tasks = copy.deepcopy(baseline_tasks)
+    
+    project_start_date = start_date or datetime.now().date()
+
+    # Apply delays (multipliers and flat weeks) to each task's duration.
+    # Durations do not depend on dates, so this runs before scheduling.
+    # Rules are matched to tasks once per task list (compiled_delay_rules); a
+    # scenario is then just a vector of active rules (including triggered /
+    # correlated ones).
+    task_ids = [task['ID'] for task in tasks]
+    compiled_rules = compiled_delay_rules(tasks)
+    active = resolve_active(compiled_rules, selection_matrix(compiled_rules, delay_inputs))
+    new_durations = scenario_durations(compiled_rules, [task['Duration'] for task in tasks], active)[0]
+    delay_log = effect_log(compiled_rules, active[0], [task['Task'] for task in tasks])
+
+    for task, new_duration in zip(tasks, new_durations):
+        task['Duration'] = round(float(new_duration), 1)
+
+    # --- This is the "Domino Effect" logic ---
+    # A task starts only after its prerequisites allow it. 'Prereq' entries are
+    # plain IDs (finish-to-start) or typed links such as
+    # {'id': 'T4', 'type': 'SS', 'lag': 5} (see schedule_engine.py).
+    # Raises ValueError on a circular dependency (should not happen if dependencies are correct)
+    graph = compile_graph(task_ids, [task['Prereq'] for task in tasks])
+
+    durations = [task['Duration'] for task in tasks]
+    start_weeks, end_weeks = forward_pass(graph, durations)
+    late_starts, _ = backward_pass(graph, durations, end_weeks)
+
+    simulated_plan = []
+    for i in graph['order']:
+        task = tasks[i]
+        task['Start_Wk'] = start_weeks[i]
+        task['End_Wk'] = end_weeks[i]
+        task['Total_Float'] = late_starts[i] - start_weeks[i]
+        
+        # Add friendly dates for the Gantt chart
+        task['Start_Date'] = project_start_date + timedelta(weeks=task['Start_Wk'])
+        task['End_Date'] = project_start_date + timedelta(weeks=task['End_Wk'])
+        simulated_plan.append(task)
+            
+    # Sort the final plan by start week for the Gantt chart
+    simulated_plan.sort(key=lambda x: x['Start_Wk'])
+    
+    # Get total delay
+    if simulated_plan:
+        total_project_weeks = max(task['End_Wk'] for task in simulated_plan)
+    else:
+        total_project_weeks = 0
+
+    return simulated_plan, delay_log, total_project_weeks
+
+# --- 4B. DELAY ATTRIBUTION (who is responsible for the slip) ---
+def attribute_simulated_delay(baseline_tasks, delay_inputs):
+    """
+    Splits the simulated delivery slip between the selected delay events
+    (Shapley shares; triggered events count towards the event that set
+    them off). Returns table rows sorted by share, largest first.
+    """
+    task_ids = [task['ID'] for task in baseline_tasks]
+    compiled_rules = compiled_delay_rules(baseline_tasks)
+    graph = compile_graph(task_ids, [task['Prereq'] for task in baseline_tasks])
+    keys = [key for key in compiled_rules['keys'] if delay_inputs.get(key)]
+    result = attribute_rule_delays(compiled_rules, graph, [task['Duration'] for task in baseline_tasks], keys, decimals=1)
+
+    rows = [
+        {
+            'Event': DELAY_DEFINITIONS[key]['name'],
+            'Weeks If Alone': round(float(alone), 1),
+            'Share of Slip (Weeks)': round(float(share), 1),
+            'Share (%)': round(100 * float(share) / result['slip'], 1) if result['slip'] else 0.0,
+        }
+        for key, alone, share in zip(result['sources'], result['standalone'], result['contribution'])
+    ]
+    rows.sort(key=lambda row: -row['Share of Slip (Weeks)'])
+    return rows
+
+# --- 5. NEW VISUAL: SANKEY FLOW DIAGRAM ---
+@timed('create_sankey_chart')
+def create_sankey_chart(simulated_plan, baseline_plan, layout=None):
+    """
+    Creates a Plotly Sankey diagram to show project flow and delays.
+    Node positions come from sankey_layout (columns by dependency depth,
+    rows by barycenter; redundant links are left out), or from `layout` if
+    a cached one for the same network is passed in (its tasks may be in any
+    order, e.g. BASELINE_TASKS order); labels are SHORTENED to prevent overlap.
+    """
+    
+    # Sankey charts use integer indices for nodes; the layout returns
+    # positions and links (edges) in the index space of its 'ids', so the
+    # nodes are listed in that order
+    if layout is None:
+        layout = sankey_layout([task['ID'] for task in simulated_plan],
+                               [task['Prereq'] for task in simulated_plan], reduce=True)
+    plan_by_id = {task['ID']: task for task in simulated_plan}
+    simulated_plan = [plan_by_id[task_id] for task_id in layout['ids']]
+    task_ids = layout['ids']
+    base_end_by_id = {task['ID']: task['End_Wk'] for task in baseline_plan}
+    # Link "flow" is the prerequisite's duration, looked up from this dict (built once)
+    duration_by_id = {task['ID']: task['Duration'] for task in simulated_plan}
+    
+    # --- FIX: Shorten labels to prevent visual overlap ---
+    # e.g., "6. Outfitting & Cabins (Finland)" -> "6. Outfitting & Cabins"
+    labels = [task['Task'].split('(')[0].strip() for task in simulated_plan]
+    
+    # Define colors based on delay
+    node_colors = []
+    for task in simulated_plan:
+        if task['End_Wk'] > base_end_by_id.get(task['ID'], task['End_Wk']):
+            node_colors.append('rgba(255, 100, 100, 0.8)') # Red for delayed
+        else:
+            node_colors.append('rgba(100, 255, 100, 0.8)') # Green for on-time
+            
+    sources = layout['sources']
+    targets = layout['targets']
+    values = [duration_by_id[task_ids[s]] for s in sources]
+
+    # Create the Sankey figure
+    fig = go.Figure(data=[go.Sankey(
+        node=dict(
+            pad=20, # Increased padding
+            thickness=25, # Increased thickness
+            line=dict(color="black", width=0.5),
+            label=labels, # Use the new shortened labels
+            color=node_colors,
+            x=layout['x'], # Column = dependency depth
+            y=layout['y'] # Row = barycenter order within the column
+        ),
+        link=dict(
+            source=sources,
+            target=targets,
+            value=values
+        )
+    )],
+    layout=dict(
+        # Set a fixed height to ensure y-coordinates are respected
+        height=600 
+    ))
+
+    fig.update_layout(
+        title_text="Project Flow Diagram (Sankey Diagram)", 
+        font_size=12,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
+
+
+@timed('create_gantt_chart')
+def create_gantt_chart(plan_data, title):
+    """Creates a Plotly Gantt chart from the plan data."""
+    df = pd.DataFrame(plan_data)
+    fig = px.timeline(
+        df,
+        x_start="Start_Date",
+        x_end="End_Date",
+        y="Task", # Use the full task name here
+        color="Category",
+        title=title,
+        text="Task"
+    )
+    fig.update_yaxes(autorange="reversed")
+    fig.update_layout(
+        title_font_size=24,
+        font_size=14,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
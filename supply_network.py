@@ -0,0 +1,141 @@
+"""
+supply_network.py
+Multi-echelon supplier network model and solver (no Streamlit).
+
+A network is a dict of nodes (suppliers, transport legs and the yard):
+
+    'Steel_Mill_CN': {
+        'label': 'Steel Mill (China)',
+        'kind': 'supplier',          # 'supplier', 'transport' or 'yard'
+        'tier': 1,                   # 0 = yard, 1 = direct suppliers, 2 = their suppliers...
+        'lead_time': 15,             # mean lead / transit time
+        'lead_time_sd': 3,           # variability of that time
+        'buffer': 1,                 # safety buffer already held at this node
+        'needs': [['Ore_AU', 'Ore_BR'], 'Coke_CN'],
+        'available': True,           # False = source is out (strike, insolvency...)
+    }
+
+Each entry in 'needs' is required (AND); a list inside it is a set of
+alternative sources (OR). solve_supply_network picks, for every
+requirement, the source with the earliest committed arrival
+(mean + z * sigma at the chosen service level). It then follows the binding
+requirement from the root down to trace the delivery-critical route, and
+sizes the safety buffer each tier needs along it. One pass in topological
+order is enough, so this stays interactive on networks with thousands of
+supplier nodes.
+"""
+
+from math import sqrt
+from statistics import NormalDist
+
+from schedule_engine import compile_graph
+from profiling import count, timed
+
+
+def _requirement_groups(node):
+    """'needs' as a list of alternative lists, e.g. [['A', 'B'], ['C']]."""
+    return [list(need) if isinstance(need, (list, tuple)) else [need] for need in node.get('needs', [])]
+
+
+@timed('solve_supply_network')
+def solve_supply_network(network, root, service_level=0.95):
+    """
+    Returns a dict with:
+      'arrival'   mean ready time per node (with the chosen sources)
+      'sigma'     standard deviation of that ready time
+      'committed' mean + z * sigma, the date that can be promised
+      'chosen'    node -> list of the source picked for each requirement
+      'route'     delivery-critical route, root first
+      'tiers'     per-tier buffer needs along the route
+      'feeding'   buffers needed where a non-critical input joins the route
+      'project_buffer'  pooled buffer for the whole route at the root
+    Unavailable nodes can never be chosen; if a requirement has no available
+    source its arrival is infinite.
+    """
+    z = NormalDist().inv_cdf(service_level)
+    ids = list(network)
+    groups = {node_id: _requirement_groups(network[node_id]) for node_id in ids}
+    graph = compile_graph(ids, [[source for group in groups[node_id] for source in group] for node_id in ids])
+
+    arrival, variance, committed = {}, {}, {}
+    chosen, binding = {}, {}
+    for i in graph['order']:
+        node_id = ids[i]
+        node = network[node_id]
+        if not node.get('available', True):
+            arrival[node_id] = variance[node_id] = committed[node_id] = float('inf')
+            chosen[node_id], binding[node_id] = [], None
+            continue
+
+        picks = []
+        latest, latest_source = 0.0, None
+        for group in groups[node_id]:
+            source = min(group, key=lambda s: committed[s])
+            picks.append(source)
+            if latest_source is None or committed[source] > latest:
+                latest, latest_source = committed[source], source
+
+        own_variance = node.get('lead_time_sd', 0) ** 2
+        upstream_mean = arrival[latest_source] if latest_source else 0.0
+        upstream_variance = variance[latest_source] if latest_source else 0.0
+        arrival[node_id] = upstream_mean + node.get('lead_time', 0)
+        variance[node_id] = upstream_variance + own_variance
+        committed[node_id] = arrival[node_id] + z * sqrt(variance[node_id]) if arrival[node_id] != float('inf') else float('inf')
+        chosen[node_id], binding[node_id] = picks, latest_source
+    count('supply_nodes_solved', len(ids))
+
+    # Delivery-critical route: follow the binding requirement from the root
+    route = []
+    node_id = root
+    while node_id is not None:
+        route.append(node_id)
+        node_id = binding[node_id]
+
+    # Buffer per tier: z * sqrt(variance of the route nodes in that tier)
+    by_tier = {}
+    for node_id in route:
+        node = network[node_id]
+        tier = by_tier.setdefault(node.get('tier', 0), {'nodes': [], 'lead_time': 0.0, 'variance': 0.0, 'held': 0.0})
+        tier['nodes'].append(node_id)
+        tier['lead_time'] += node.get('lead_time', 0)
+        tier['variance'] += node.get('lead_time_sd', 0) ** 2
+        tier['held'] += node.get('buffer', 0)
+    tiers = []
+    for tier in sorted(by_tier):
+        needed = z * sqrt(by_tier[tier]['variance'])
+        tiers.append({
+            'Tier': tier,
+            'Route Nodes': ', '.join(by_tier[tier]['nodes']),
+            'Lead Time': by_tier[tier]['lead_time'],
+            'Buffer Needed': round(needed, 2),
+            'Buffer Held': by_tier[tier]['held'],
+            'Shortfall': round(max(0.0, needed - by_tier[tier]['held']), 2),
+        })
+
+    # Feeding buffers: a non-binding input into a route node is safe only if
+    # its slack covers its own variability
+    feeding = []
+    for node_id in route:
+        for source in chosen[node_id]:
+            if source == binding[node_id]:
+                continue
+            slack = arrival[binding[node_id]] - arrival[source]
+            needed = max(0.0, z * sqrt(variance[source]) - slack)
+            feeding.append({
+                'Input': source,
+                'Joins': node_id,
+                'Tier': network[source].get('tier', 0),
+                'Slack': round(slack, 2),
+                'Buffer Needed': round(needed, 2),
+            })
+
+    return {
+        'arrival': arrival,
+        'sigma': {node_id: sqrt(v) for node_id, v in variance.items()},
+        'committed': committed,
+        'chosen': chosen,
+        'route': route,
+        'tiers': tiers,
+        'feeding': feeding,
+        'project_buffer': z * sqrt(variance[root]) if variance[root] != float('inf') else float('inf'),
+    }
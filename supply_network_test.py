@@ -0,0 +1,70 @@
+"""
+supply_network_test.py
+Backend tests for the multi-echelon supply network solver (supply_network.py).
+
+This is a standalone test (no Streamlit). Run directly or with pytest.
+"""
+
+import copy
+import random
+import time
+
+from supply_network import solve_supply_network
+from supply_chain_model import SUPPLY_NETWORK
+
+
+def test_sample_network_route_and_buffers():
+    result = solve_supply_network(SUPPLY_NETWORK, 'FIN_Yard', service_level=0.95)
+
+    assert result['route'] == ['FIN_Yard', 'Truck_DE_FI', 'Engine_Plant_DE', 'Crankshaft_Forge', 'Billet_SE']
+    assert result['arrival']['FIN_Yard'] == 44
+    assert result['committed']['FIN_Yard'] > result['arrival']['FIN_Yard']
+    # Lower-variance Korean route is preferred for steel at 95% service
+    assert result['chosen']['FIN_Yard'][0] == 'Sea_KR_FI'
+
+    tiers = {row['Tier']: row for row in result['tiers']}
+    assert tiers[1]['Buffer Held'] == 2 and tiers[1]['Shortfall'] > 0
+    # Pooled buffer is smaller than the sum of per-tier buffers
+    assert result['project_buffer'] < sum(row['Buffer Needed'] for row in result['tiers'])
+
+
+def test_unavailable_source_switches_route():
+    network = copy.deepcopy(SUPPLY_NETWORK)
+    network['Truck_DE_FI']['available'] = False
+    result = solve_supply_network(network, 'FIN_Yard')
+    assert result['route'][1] == 'Sea_DE_FI'
+
+    network['Sea_DE_FI']['available'] = False
+    result = solve_supply_network(network, 'FIN_Yard')
+    assert result['arrival']['FIN_Yard'] == float('inf')
+
+
+def test_thousands_of_suppliers():
+    rng = random.Random(5)
+    network = {}
+    tiers = [[f'T{t}_{i}' for i in range(1000)] for t in range(5)]
+    for t, names in enumerate(tiers):
+        for name in names:
+            needs = []
+            if t + 1 < len(tiers):
+                for _ in range(2):
+                    needs.append(rng.sample(tiers[t + 1], 3))
+            network[name] = {'tier': t + 1, 'lead_time': rng.uniform(1, 10), 'lead_time_sd': rng.uniform(0, 2), 'needs': needs}
+    network['Yard'] = {'tier': 0, 'lead_time': 1, 'needs': [tiers[0]]}
+
+    started = time.perf_counter()
+    result = solve_supply_network(network, 'Yard')
+    elapsed = time.perf_counter() - started
+
+    assert len(result['route']) == 6
+    assert elapsed < 1.0, f"solver took {elapsed:.2f}s on {len(network)} nodes"
+
+
+if __name__ == "__main__":
+    print("### SUPPLY NETWORK BACKEND TEST ###")
+
+    test_sample_network_route_and_buffers()
+    test_unavailable_source_switches_route()
+    test_thousands_of_suppliers()
+
+    print("\nAll tests completed.")